@@ -0,0 +1,1038 @@
+#!/usr/bin/env python3
+"""
+Backends de cache das páginas da API
+- BackendCacheJSON: um arquivo <chave>.json por página (formato original de cache_api/)
+- BackendCacheSQLite: um único banco SQLite (WAL) com payload comprimido, gravação em lote,
+  limite de tamanho em disco e itens deduplicados entre páginas
+- CacheMemoriaLRU: camada em memória (LRU limitado em bytes) na frente de qualquer backend
+- EscritorCache: gravação em segundo plano (write-behind) com fila limitada e lotes
+- CodecCache: compressão dos payloads (zstd com dicionário treinado opcional, zlib ou nenhuma)
+
+Uso como ferramenta:
+    python cache_paginas.py importar cache_api cache_api.sqlite3 --inicio 2025-11-06 --fim 2025-11-10
+    python cache_paginas.py treinar cache_api.sqlite3 cache_api.zdict
+    python cache_paginas.py estatisticas cache_api.sqlite3
+    python cache_paginas.py podar cache_api.sqlite3 --max-mb 2048
+    python cache_paginas.py compactar cache_api.sqlite3
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+EXTENSOES_CACHE = {"nenhum": ".json", "zlib": ".json.zz", "zstd": ".json.zst"}
+TAMANHO_DICIONARIO = 112 * 1024
+# (dias, TTL em segundos): páginas cuja janela termina há menos de `dias` dias expiram após o TTL;
+# janelas mais antigas que a última regra (dias já fechados) não expiram
+REGRAS_TTL_PADRAO = [(2, 30 * 60), (7, 6 * 3600), (30, 24 * 3600)]
+CAMPO_REFERENCIAS = "_itens_ref"  # Lista de chaves dos itens no lugar de "items" (páginas com dedup)
+
+
+# ===== COMPRESSÃO =====
+
+class CodecCache:
+    """
+    Comprime/descomprime os payloads do cache.
+    tipo = "zstd" (com dicionário opcional), "zlib" ou "nenhum". A leitura detecta o
+    formato pelo cabeçalho, então entradas gravadas com outro codec continuam legíveis.
+    Sem o pacote zstandard, "zstd" cai para zlib.
+    """
+
+    def __init__(self, tipo="zlib", nivel=None, dicionario=None):
+        if tipo == "zstd" and zstandard is None:
+            print("[⚠️] Pacote zstandard não instalado - cache usando zlib (pip install zstandard)")
+            tipo = "zlib"
+        if tipo not in EXTENSOES_CACHE:
+            raise ValueError(f"Compressão de cache desconhecida: {tipo}")
+        self.tipo = tipo
+        self.nivel = nivel
+        self.dicionario = None
+        if dicionario and zstandard is not None:
+            self.dicionario = zstandard.ZstdCompressionDict(dicionario)
+        # Compressores zstd não podem ser compartilhados entre threads
+        self.local = threading.local()
+
+    @property
+    def extensao(self):
+        return EXTENSOES_CACHE[self.tipo]
+
+    def _compressor(self):
+        compressor = getattr(self.local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.nivel or 3, dict_data=self.dicionario)
+            self.local.compressor = compressor
+        return compressor
+
+    def _descompressor(self):
+        descompressor = getattr(self.local, "descompressor", None)
+        if descompressor is None:
+            descompressor = zstandard.ZstdDecompressor(dict_data=self.dicionario)
+            self.local.descompressor = descompressor
+        return descompressor
+
+    def comprimir(self, conteudo):
+        if self.tipo == "zstd":
+            return self._compressor().compress(conteudo)
+        if self.tipo == "zlib":
+            return zlib.compress(conteudo, self.nivel if self.nivel is not None else -1)
+        return conteudo
+
+    def descomprimir(self, payload):
+        """Bytes do JSON original; levanta ValueError se o payload não puder ser lido"""
+        payload = bytes(payload)
+        if payload[:4] == ZSTD_MAGIC:
+            if zstandard is None:
+                raise ValueError("payload zstd sem o pacote zstandard instalado")
+            try:
+                return self._descompressor().decompress(payload)
+            except zstandard.ZstdError as e:
+                # Ex.: gravado com outro dicionário
+                raise ValueError(str(e))
+        if payload[:1] == b"x":
+            try:
+                return zlib.decompress(payload)
+            except zlib.error as e:
+                raise ValueError(str(e))
+        return payload
+
+
+def carregar_codec(tipo, nivel=None, arquivo_dicionario=None):
+    """Cria o codec, usando o dicionário zstd treinado se o arquivo existir"""
+    dicionario = None
+    if tipo == "zstd" and arquivo_dicionario and Path(arquivo_dicionario).is_file():
+        dicionario = Path(arquivo_dicionario).read_bytes()
+    return CodecCache(tipo, nivel=nivel, dicionario=dicionario)
+
+
+def treinar_dicionario(amostras, tamanho=TAMANHO_DICIONARIO):
+    """Treina um dicionário zstd a partir de JSONs de páginas (lista de bytes)"""
+    if zstandard is None:
+        raise RuntimeError("Treinar dicionário requer o pacote zstandard (pip install zstandard)")
+    return zstandard.train_dictionary(tamanho, amostras).as_bytes()
+
+
+# ===== BACKENDS =====
+
+
+class BackendCacheJSON:
+    """
+    Cache original: um arquivo por página dentro de um diretório.
+    Sem compressão grava <chave>.json; com codec grava <chave>.json.zst / .json.zz
+    e ainda lê os <chave>.json antigos.
+    """
+
+    def __init__(self, diretorio, codec=None):
+        self.diretorio = Path(diretorio)
+        self.codec = codec or CodecCache("nenhum")
+
+    def ler(self, chave):
+        for extensao in dict.fromkeys((self.codec.extensao, ".json")):
+            arquivo = self.diretorio / f"{chave}{extensao}"
+            try:
+                with open(arquivo, "rb") as f:
+                    return json.loads(self.codec.descomprimir(f.read()))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def gravar(self, chave, dados, params=None):
+        self.gravar_lote([(chave, dados, params)])
+
+    def gravar_lote(self, paginas):
+        """Grava [(chave, dados, params)]; cada arquivo é escrito em temporário e renomeado"""
+        self.diretorio.mkdir(exist_ok=True)
+        for chave, dados, _ in paginas:
+            conteudo = self.codec.comprimir(json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+            arquivo = self.diretorio / f"{chave}{self.codec.extensao}"
+            temporario = arquivo.with_name(f"{arquivo.name}.{threading.get_ident()}.tmp")
+            try:
+                with open(temporario, "wb") as f:
+                    f.write(conteudo)
+                os.replace(temporario, arquivo)
+            except OSError:
+                pass
+
+    def fechar(self):
+        pass
+
+
+class BackendCacheSQLite:
+    """
+    Cache em um único arquivo SQLite (modo WAL).
+    Payload = JSON comprimido pelo codec (zlib por padrão); as gravações ficam em um buffer e são
+    confirmadas em uma transação a cada `lote` páginas.
+
+    Cada página guarda metadados (gravado_em, tamanho, janela consultada, último acesso)
+    e uma expiração calculada pelas regras_ttl a partir do fim da janela: dias recentes
+    expiram rápido, dias históricos fechados não expiram. Quando o banco passa de
+    max_bytes, saem primeiro as páginas expiradas e depois as menos acessadas (LRU)
+    até voltar a 90% do limite.
+
+    Com dedup_itens, cada item é guardado uma única vez na tabela itens (chave = SHA-256
+    do conteúdo) e a página guarda só a lista de chaves; consultas sobrepostas compartilham
+    os itens e um item alterado vira uma entrada nova. Itens sem nenhuma página
+    referenciando são apagados.
+    """
+
+    def __init__(self, caminho, max_bytes=None, lote=50, codec=None, dedup_itens=True, max_itens_memoria=20000,
+                 regras_ttl=REGRAS_TTL_PADRAO, ignorar_expiracao=False):
+        self.caminho = str(caminho)
+        self.codec = codec or CodecCache("zlib")
+        self.max_bytes = max_bytes
+        self.lote = lote
+        self.dedup_itens = dedup_itens
+        self.regras_ttl = regras_ttl
+        self.ignorar_expiracao = ignorar_expiracao  # Replay offline: página vencida ainda é melhor que nenhuma
+        self.lock = threading.Lock()          # buffer e acessos
+        self.lock_escrita = threading.Lock()  # conexão de escrita e total_bytes
+        self.local = threading.local()
+        self.buffer = {}
+        self.acessos = {}  # chave -> último acesso, gravado junto com a próxima transação
+        # Itens já descomprimidos e parseados, reaproveitados entre páginas
+        self.max_itens_memoria = max_itens_memoria
+        self.itens_memoria = OrderedDict()
+        self.lock_itens = threading.Lock()
+
+        self.conexao_escrita = sqlite3.connect(self.caminho, check_same_thread=False)
+        self.conexao_escrita.execute("PRAGMA journal_mode=WAL")
+        self.conexao_escrita.execute("PRAGMA synchronous=NORMAL")
+        self.conexao_escrita.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                chave TEXT PRIMARY KEY,
+                params TEXT,
+                payload BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                gravado_em REAL NOT NULL
+            )
+        """)
+        self._migrar_metadados()
+        self.conexao_escrita.execute("CREATE INDEX IF NOT EXISTS idx_paginas_gravado_em ON paginas (gravado_em)")
+        self.conexao_escrita.execute("CREATE INDEX IF NOT EXISTS idx_paginas_acessado_em ON paginas (acessado_em)")
+        self.conexao_escrita.execute("CREATE INDEX IF NOT EXISTS idx_paginas_expira_em ON paginas (expira_em)")
+        self.conexao_escrita.execute("""
+            CREATE TABLE IF NOT EXISTS itens (
+                chave TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                tamanho INTEGER NOT NULL,
+                refs INTEGER NOT NULL
+            )
+        """)
+        self.conexao_escrita.commit()
+        self.total_bytes = self.conexao_escrita.execute(
+            "SELECT (SELECT COALESCE(SUM(tamanho), 0) FROM paginas) + (SELECT COALESCE(SUM(tamanho), 0) FROM itens)"
+        ).fetchone()[0]
+
+    def _migrar_metadados(self):
+        """Acrescenta as colunas de metadados em bancos antigos e preenche a partir dos params gravados"""
+        colunas = {linha[1] for linha in self.conexao_escrita.execute("PRAGMA table_info(paginas)")}
+        if "acessado_em" in colunas:
+            return
+        with self.conexao_escrita:
+            for coluna in ("janela_inicio TEXT", "janela_fim TEXT", "expira_em REAL", "acessado_em REAL"):
+                if coluna.split()[0] not in colunas:
+                    self.conexao_escrita.execute(f"ALTER TABLE paginas ADD COLUMN {coluna}")
+            linhas = self.conexao_escrita.execute("SELECT chave, params, gravado_em FROM paginas").fetchall()
+            atualizacoes = []
+            for chave, params, gravado_em in linhas:
+                inicio, fim = janela_dos_params(json.loads(params) if params else None)
+                atualizacoes.append((inicio, fim, calcular_expiracao(fim, gravado_em, self.regras_ttl), gravado_em, chave))
+            self.conexao_escrita.executemany(
+                "UPDATE paginas SET janela_inicio = ?, janela_fim = ?, expira_em = ?, acessado_em = ? WHERE chave = ?",
+                atualizacoes,
+            )
+
+    def _conexao_leitura(self):
+        # Uma conexão por thread: no modo WAL as leituras não bloqueiam a escrita
+        conexao = getattr(self.local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            self.local.conexao = conexao
+        return conexao
+
+    def ler(self, chave):
+        with self.lock:
+            pendente = self.buffer.get(chave)
+        if pendente is not None:
+            return pendente[0]
+
+        linha = self._conexao_leitura().execute(
+            "SELECT payload, expira_em FROM paginas WHERE chave = ?", (chave,)
+        ).fetchone()
+        agora = time.time()
+        if linha is None or (not self.ignorar_expiracao and linha[1] is not None and linha[1] <= agora):
+            return None
+        with self.lock:
+            self.acessos[chave] = agora
+        try:
+            dados = json.loads(self.codec.descomprimir(linha[0]))
+        except ValueError:
+            return None
+        if isinstance(dados, dict) and CAMPO_REFERENCIAS in dados:
+            itens = self._ler_itens(dados.pop(CAMPO_REFERENCIAS))
+            if itens is None:
+                return None
+            dados["items"] = itens
+        return dados
+
+    def _ler_itens(self, chaves):
+        """Itens na ordem das chaves (None se algum sumiu do banco)"""
+        encontrados = {}
+        with self.lock_itens:
+            for chave in chaves:
+                item = self.itens_memoria.get(chave)
+                if item is not None:
+                    self.itens_memoria.move_to_end(chave)
+                    encontrados[chave] = item
+        faltando = list({chave for chave in chaves if chave not in encontrados})
+
+        conexao = self._conexao_leitura()
+        lidos = {}
+        for i in range(0, len(faltando), 500):
+            bloco = faltando[i:i + 500]
+            consulta = f"SELECT chave, payload FROM itens WHERE chave IN ({','.join('?' * len(bloco))})"
+            for chave, payload in conexao.execute(consulta, bloco):
+                try:
+                    lidos[chave] = json.loads(self.codec.descomprimir(payload))
+                except ValueError:
+                    return None
+        if len(lidos) < len(faltando):
+            return None
+
+        if lidos:
+            with self.lock_itens:
+                self.itens_memoria.update(lidos)
+                while len(self.itens_memoria) > self.max_itens_memoria:
+                    self.itens_memoria.popitem(last=False)
+        encontrados.update(lidos)
+        return [encontrados[chave] for chave in chaves]
+
+    def gravar(self, chave, dados, params=None):
+        with self.lock:
+            self.buffer[chave] = (dados, params)
+            if len(self.buffer) < self.lote:
+                return
+        self._descarregar()
+
+    def gravar_lote(self, paginas):
+        """Grava [(chave, dados, params)] em uma transação, sem passar pelo buffer"""
+        agora = time.time()
+        linhas = [self._preparar(chave, dados, params, agora) for chave, dados, params in paginas]
+        with self.lock_escrita:
+            self._inserir(linhas)
+
+    def _descarregar(self):
+        # Confirma o buffer: a transação roda fora do lock do buffer, as leituras não esperam o disco
+        with self.lock_escrita:
+            with self.lock:
+                pendentes = self.buffer
+                self.buffer = {}
+            if pendentes:
+                agora = time.time()
+                self._inserir([self._preparar(chave, dados, params, agora) for chave, (dados, params) in pendentes.items()])
+
+    def _preparar(self, chave, dados, params, agora):
+        """Linha a inserir: página comprimida, metadados e itens separados da página"""
+        itens = []
+        if self.dedup_itens:
+            dados, itens = separar_itens(dados)
+        inicio, fim = janela_dos_params(params)
+        return {
+            "chave": chave,
+            "params": json.dumps(params, ensure_ascii=False, sort_keys=True) if params else None,
+            "payload": self.codec.comprimir(json.dumps(dados, ensure_ascii=False).encode("utf-8")),
+            "gravado_em": agora,
+            "janela_inicio": inicio,
+            "janela_fim": fim,
+            "expira_em": calcular_expiracao(fim, agora, self.regras_ttl),
+            "itens": itens,
+        }
+
+    def _inserir(self, linhas):
+        with self.conexao_escrita:
+            # Substituições não podem inflar o total nem deixar itens órfãos
+            referencias_antigas = []
+            for linha in linhas:
+                anterior = self.conexao_escrita.execute(
+                    "SELECT tamanho, payload FROM paginas WHERE chave = ?", (linha["chave"],)
+                ).fetchone()
+                if anterior:
+                    self.total_bytes -= anterior[0]
+                    referencias_antigas.extend(self._referencias(anterior[1]))
+
+            self._inserir_itens([item for linha in linhas for item in linha["itens"]])
+            self.conexao_escrita.executemany(
+                "INSERT OR REPLACE INTO paginas (chave, params, payload, tamanho, gravado_em, janela_inicio, "
+                "janela_fim, expira_em, acessado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(l["chave"], l["params"], l["payload"], len(l["payload"]), l["gravado_em"], l["janela_inicio"],
+                  l["janela_fim"], l["expira_em"], l["gravado_em"]) for l in linhas],
+            )
+            self.total_bytes += sum(len(linha["payload"]) for linha in linhas)
+            self._liberar_itens(referencias_antigas)
+            self._registrar_acessos()
+        if self.max_bytes and self.total_bytes > self.max_bytes:
+            self._despejar()
+
+    def _registrar_acessos(self):
+        """Grava os últimos acessos acumulados pelas leituras (usados pelo LRU)"""
+        with self.lock:
+            acessos, self.acessos = self.acessos, {}
+        if acessos:
+            self.conexao_escrita.executemany(
+                "UPDATE paginas SET acessado_em = ? WHERE chave = ?", [(t, c) for c, t in acessos.items()]
+            )
+
+    def _inserir_itens(self, itens):
+        """Soma uma referência por ocorrência; só comprime e grava os itens ainda não guardados"""
+        if not itens:
+            return
+        chaves = list({chave for chave, _ in itens})
+        existentes = set()
+        for i in range(0, len(chaves), 500):
+            bloco = chaves[i:i + 500]
+            consulta = f"SELECT chave FROM itens WHERE chave IN ({','.join('?' * len(bloco))})"
+            existentes.update(chave for (chave,) in self.conexao_escrita.execute(consulta, bloco))
+
+        novos = {}
+        referencias = {}
+        for chave, conteudo in itens:
+            referencias[chave] = referencias.get(chave, 0) + 1
+            if chave not in existentes and chave not in novos:
+                novos[chave] = self.codec.comprimir(conteudo)
+
+        self.conexao_escrita.executemany(
+            "INSERT INTO itens (chave, payload, tamanho, refs) VALUES (?, ?, ?, 0)",
+            [(chave, payload, len(payload)) for chave, payload in novos.items()],
+        )
+        self.conexao_escrita.executemany(
+            "UPDATE itens SET refs = refs + ? WHERE chave = ?",
+            [(quantidade, chave) for chave, quantidade in referencias.items()],
+        )
+        self.total_bytes += sum(len(payload) for payload in novos.values())
+
+    def _liberar_itens(self, chaves):
+        """Tira uma referência por chave e apaga os itens que ficaram sem página"""
+        if not chaves:
+            return
+        self.conexao_escrita.executemany("UPDATE itens SET refs = refs - 1 WHERE chave = ?", [(c,) for c in chaves])
+        # Só as chaves que acabaram de perder referência podem ter ficado órfãs (sem varrer a tabela)
+        distintas = list(set(chaves))
+        orfaos = []
+        for i in range(0, len(distintas), 500):
+            bloco = distintas[i:i + 500]
+            consulta = f"SELECT chave, tamanho FROM itens WHERE chave IN ({','.join('?' * len(bloco))}) AND refs <= 0"
+            orfaos.extend(self.conexao_escrita.execute(consulta, bloco))
+        if orfaos:
+            self.conexao_escrita.executemany("DELETE FROM itens WHERE chave = ?", [(c,) for c, _ in orfaos])
+            self.total_bytes -= sum(tamanho for _, tamanho in orfaos)
+            with self.lock_itens:
+                for chave, _ in orfaos:
+                    self.itens_memoria.pop(chave, None)
+
+    def _referencias(self, payload):
+        try:
+            dados = json.loads(self.codec.descomprimir(payload))
+        except ValueError:
+            return []
+        return dados.get(CAMPO_REFERENCIAS, []) if isinstance(dados, dict) else []
+
+    def _remover_paginas(self, chaves):
+        """Apaga páginas (dentro de uma transação) e libera os itens que ficarem órfãos"""
+        for i in range(0, len(chaves), 10):
+            # Em blocos: os bytes dos itens liberados só são conhecidos depois de soltar as referências
+            bloco = chaves[i:i + 10]
+            consulta = f"SELECT tamanho, payload FROM paginas WHERE chave IN ({','.join('?' * len(bloco))})"
+            linhas = self.conexao_escrita.execute(consulta, bloco).fetchall()
+            self.conexao_escrita.executemany("DELETE FROM paginas WHERE chave = ?", [(c,) for c in bloco])
+            self.total_bytes -= sum(tamanho for tamanho, _ in linhas)
+            self._liberar_itens([ref for _, payload in linhas for ref in self._referencias(payload)])
+
+    def _remover_expiradas(self):
+        chaves = [c for (c,) in self.conexao_escrita.execute("SELECT chave FROM paginas WHERE expira_em <= ?", (time.time(),))]
+        self._remover_paginas(chaves)
+        return len(chaves)
+
+    def _reduzir_para(self, alvo):
+        ordem = [c for (c,) in self.conexao_escrita.execute("SELECT chave FROM paginas ORDER BY acessado_em")]
+        removidas = 0
+        for i in range(0, len(ordem), 10):
+            if self.total_bytes <= alvo:
+                break
+            self._remover_paginas(ordem[i:i + 10])
+            removidas += len(ordem[i:i + 10])
+        return removidas
+
+    def podar(self, max_bytes=None):
+        """Remove as páginas expiradas e, com max_bytes, as menos acessadas (LRU) até caber; (expiradas, lru)"""
+        with self.lock_escrita:
+            with self.conexao_escrita:
+                self._registrar_acessos()
+                expiradas = self._remover_expiradas()
+                removidas = self._reduzir_para(max_bytes) if max_bytes else 0
+        return expiradas, removidas
+
+    def _despejar(self):
+        """Chamado com lock_escrita: expiradas primeiro, depois LRU até 90% de max_bytes"""
+        with self.conexao_escrita:
+            expiradas = self._remover_expiradas()
+            removidas = self._reduzir_para(self.max_bytes * 0.9)
+        if expiradas or removidas:
+            print(f"\n[cache] Limite de {self.max_bytes / 1024**2:.0f} MB atingido: {expiradas} páginas expiradas "
+                  f"e {removidas} menos acessadas removidas")
+
+    def estatisticas(self):
+        """Contagens e tamanhos por consultas indexadas (sem varrer os payloads)"""
+        conexao = self._conexao_leitura()
+        agora = time.time()
+        paginas, bytes_paginas, mais_antiga, mais_nova = conexao.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), MIN(gravado_em), MAX(gravado_em) FROM paginas"
+        ).fetchone()
+        expiradas = conexao.execute("SELECT COUNT(*) FROM paginas WHERE expira_em <= ?", (agora,)).fetchone()[0]
+        com_ttl = conexao.execute("SELECT COUNT(*) FROM paginas WHERE expira_em > ?", (agora,)).fetchone()[0]
+        itens, bytes_itens = conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM itens").fetchone()
+        tamanho_pagina = conexao.execute("PRAGMA page_size").fetchone()[0]
+        livres = conexao.execute("PRAGMA freelist_count").fetchone()[0] * tamanho_pagina
+        arquivo = os.path.getsize(self.caminho) if os.path.exists(self.caminho) else 0
+        return {
+            "paginas": paginas,
+            "paginas_expiradas": expiradas,
+            "paginas_com_ttl": com_ttl,
+            "paginas_permanentes": paginas - expiradas - com_ttl,
+            "bytes_paginas": bytes_paginas,
+            "itens": itens,
+            "bytes_itens": bytes_itens,
+            "gravada_mais_antiga": mais_antiga,
+            "gravada_mais_nova": mais_nova,
+            "bytes_arquivo": arquivo,
+            "bytes_livres": livres,
+        }
+
+    def compactar(self):
+        """Checkpoint do WAL e VACUUM: devolve ao disco o espaço das páginas removidas"""
+        self._descarregar()
+        # Leituras abertas nesta thread seguram o WAL; no modo WAL o VACUUM só encolhe o arquivo no checkpoint
+        conexao = getattr(self.local, "conexao", None)
+        if conexao is not None:
+            conexao.close()
+            self.local.conexao = None
+        with self.lock_escrita:
+            with self.conexao_escrita:
+                self._registrar_acessos()
+            self.conexao_escrita.execute("VACUUM")
+            self.conexao_escrita.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def amostras(self, quantidade):
+        """
+        JSONs (bytes) de até `quantidade` registros sorteados, para treinar dicionário:
+        os itens, que são o que o codec mais comprime neste backend, ou as páginas se não houver itens
+        """
+        conexao = self._conexao_leitura()
+        linhas = conexao.execute("SELECT payload FROM itens ORDER BY RANDOM() LIMIT ?", (quantidade,)).fetchall()
+        if not linhas:
+            linhas = conexao.execute("SELECT payload FROM paginas ORDER BY RANDOM() LIMIT ?", (quantidade,)).fetchall()
+        amostras = []
+        for (payload,) in linhas:
+            try:
+                amostras.append(self.codec.descomprimir(payload))
+            except ValueError:
+                continue
+        return amostras
+
+    def vazio(self):
+        with self.lock:
+            if self.buffer:
+                return False
+        return self._conexao_leitura().execute("SELECT 1 FROM paginas LIMIT 1").fetchone() is None
+
+    def fechar(self):
+        self._descarregar()
+        with self.lock_escrita:
+            with self.conexao_escrita:
+                self._registrar_acessos()
+            self.conexao_escrita.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def janela_dos_params(params):
+    """(inicio, fim) da janela consultada, a partir dos parâmetros da requisição"""
+    if not params:
+        return None, None
+    return params.get("dataDisponibilizacaoInicio"), params.get("dataDisponibilizacaoFim")
+
+
+def calcular_expiracao(janela_fim, gravado_em, regras):
+    """
+    Momento em que a página expira, pela idade (em dias) do fim da janela na hora da
+    gravação: a primeira regra (dias, ttl_segundos) com idade < dias vale; nenhuma = não expira
+    """
+    if not janela_fim or not regras:
+        return None
+    try:
+        fim = date.fromisoformat(str(janela_fim)[:10])
+    except ValueError:
+        return None
+    idade = (date.fromtimestamp(gravado_em) - fim).days
+    for dias, ttl in sorted(regras):
+        if idade < dias:
+            return gravado_em + ttl
+    return None
+
+
+def chave_item(conteudo):
+    """
+    Chave do item no cache: o SHA-256 do JSON canônico. O `hash` da API não basta, porque um
+    item alterado pode voltar com o mesmo hash e a versão antiga continuaria sendo servida.
+    """
+    return "s:" + hashlib.sha256(conteudo).hexdigest()
+
+
+def separar_itens(dados):
+    """Separa os itens da página: (página com a lista de chaves, [(chave, JSON do item)])"""
+    itens = dados.get("items") if isinstance(dados, dict) else None
+    if not isinstance(itens, list) or not itens:
+        return dados, []
+    pagina = {campo: valor for campo, valor in dados.items() if campo != "items"}
+    separados = []
+    for item in itens:
+        conteudo = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        separados.append((chave_item(conteudo), conteudo))
+    pagina[CAMPO_REFERENCIAS] = [chave for chave, _ in separados]
+    return pagina, separados
+
+
+# ===== CAMADA EM MEMÓRIA =====
+
+class CacheMemoriaLRU:
+    """
+    LRU em memória, compartilhado entre threads, na frente de um backend em disco.
+    O limite é em bytes (tamanho do JSON serializado), não em número de páginas;
+    páginas maiores que o limite inteiro não ficam em memória. Demais atributos
+    (codec, podar...) são os do backend.
+    """
+
+    def __init__(self, backend, max_bytes):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entradas = OrderedDict()  # chave -> (dados, tamanho)
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def __getattr__(self, nome):
+        return getattr(self.backend, nome)
+
+    def ler(self, chave):
+        with self.lock:
+            entrada = self.entradas.get(chave)
+            if entrada is not None:
+                self.entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            self.faltas += 1
+
+        dados = self.backend.ler(chave)
+        if dados is not None:
+            self._guardar(chave, dados)
+        return dados
+
+    def gravar(self, chave, dados, params=None):
+        # Não mede/guarda na gravação (isso custaria um json.dumps na thread do worker):
+        # a página recém-gravada é servida pela camada de baixo e entra aqui na próxima leitura
+        with self.lock:
+            anterior = self.entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior[1]
+        self.backend.gravar(chave, dados, params)
+
+    def _guardar(self, chave, dados):
+        tamanho = len(json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+        with self.lock:
+            anterior = self.entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior[1]
+            if tamanho > self.max_bytes:
+                return
+            self.entradas[chave] = (dados, tamanho)
+            self.bytes_usados += tamanho
+            while self.bytes_usados > self.max_bytes:
+                _, (_, tamanho_antigo) = self.entradas.popitem(last=False)
+                self.bytes_usados -= tamanho_antigo
+                self.despejos += 1
+
+    def estatisticas(self):
+        with self.lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "despejos": self.despejos,
+                "paginas": len(self.entradas),
+                "bytes": self.bytes_usados,
+                "max_bytes": self.max_bytes,
+            }
+
+    def fechar(self):
+        with self.lock:
+            self.entradas.clear()
+            self.bytes_usados = 0
+        self.backend.fechar()
+
+
+# ===== GRAVAÇÃO EM SEGUNDO PLANO =====
+
+class EscritorCache:
+    """
+    Write-behind: gravar() só enfileira; uma thread dedicada serializa, comprime e
+    grava em lotes de até `lote` páginas (uma transação no SQLite, temporário+rename
+    no JSON). Páginas na fila continuam visíveis para ler(). Com a fila cheia a página
+    é descartada do cache (contada em "descartadas") em vez de segurar o worker.
+    fechar() esvazia a fila antes de fechar o backend.
+    """
+
+    FIM = object()
+
+    def __init__(self, backend, max_fila=500, lote=50, espera_lote=0.2):
+        self.backend = backend
+        self.lote = lote
+        self.espera_lote = espera_lote
+        self.fila = queue.Queue(maxsize=max_fila)
+        self.lock = threading.Lock()
+        self.pendentes = {}  # chave -> dados ainda não gravados
+        self.gravadas = 0
+        self.lotes = 0
+        self.descartadas = 0
+        self.falhas = 0
+        self.thread = threading.Thread(target=self._executar, name="escritor-cache", daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, nome):
+        return getattr(self.backend, nome)
+
+    def ler(self, chave):
+        with self.lock:
+            dados = self.pendentes.get(chave)
+        if dados is not None:
+            return dados
+        return self.backend.ler(chave)
+
+    def gravar(self, chave, dados, params=None):
+        with self.lock:
+            self.pendentes[chave] = dados
+        try:
+            self.fila.put_nowait((chave, dados, params))
+        except queue.Full:
+            with self.lock:
+                if self.pendentes.get(chave) is dados:
+                    del self.pendentes[chave]
+                self.descartadas += 1
+
+    def _executar(self):
+        fim = False
+        while not fim:
+            primeiro = self.fila.get()
+            if primeiro is self.FIM:
+                break
+            lote = [primeiro]
+            # Junta o que chegar em seguida (ou em até espera_lote segundos) numa única gravação
+            while len(lote) < self.lote:
+                try:
+                    proximo = self.fila.get(timeout=self.espera_lote)
+                except queue.Empty:
+                    break
+                if proximo is self.FIM:
+                    fim = True
+                    break
+                lote.append(proximo)
+            self._gravar(lote)
+
+    def _gravar(self, lote):
+        erro = None
+        try:
+            self.backend.gravar_lote(lote)
+        except Exception as e:
+            erro = e
+            print(f"\n[cache] Falha gravando lote de {len(lote)} páginas: {e}")
+        with self.lock:
+            for chave, dados, _ in lote:
+                if self.pendentes.get(chave) is dados:
+                    del self.pendentes[chave]
+            if erro is None:
+                self.gravadas += len(lote)
+                self.lotes += 1
+            else:
+                self.falhas += len(lote)
+
+    def estatisticas(self):
+        with self.lock:
+            return {
+                "gravadas": self.gravadas,
+                "lotes": self.lotes,
+                "descartadas": self.descartadas,
+                "falhas": self.falhas,
+                "na_fila": len(self.pendentes),
+            }
+
+    def fechar(self):
+        if self.thread.is_alive():
+            self.fila.put(self.FIM)
+            self.thread.join()
+        self.backend.fechar()
+
+
+def camada_cache(backend, tipo):
+    """Procura uma camada (CacheMemoriaLRU, EscritorCache...) na pilha de backends"""
+    while backend is not None:
+        if isinstance(backend, tipo):
+            return backend
+        backend = backend.__dict__.get("backend")
+    return None
+
+
+def criar_backend(tipo, diretorio, arquivo_sqlite, max_bytes=None, lote=50, codec=None, dedup_itens=True,
+                  regras_ttl=REGRAS_TTL_PADRAO, ignorar_expiracao=False):
+    if tipo == "sqlite":
+        return BackendCacheSQLite(arquivo_sqlite, max_bytes=max_bytes, lote=lote, codec=codec, dedup_itens=dedup_itens,
+                                  regras_ttl=regras_ttl, ignorar_expiracao=ignorar_expiracao)
+    if tipo == "json":
+        return BackendCacheJSON(diretorio, codec=codec)
+    raise ValueError(f"Backend de cache desconhecido: {tipo}")
+
+
+def arquivos_cache_json(diretorio):
+    """Gera (chave, caminho) para cada arquivo de página de um diretório de cache"""
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            if not entrada.is_file():
+                continue
+            for extensao in EXTENSOES_CACHE.values():
+                if entrada.name.endswith(extensao):
+                    yield entrada.name[:-len(extensao)], entrada.path
+                    break
+
+
+def ler_arquivo_cache(caminho, codec):
+    """Bytes do JSON de um arquivo de cache (validado); ValueError se estiver corrompido"""
+    with open(caminho, "rb") as f:
+        conteudo = codec.descomprimir(f.read())
+    json.loads(conteudo)
+    return conteudo
+
+
+def chave_legada(sigla, pagina, itens_por_pagina, inicio, fim):
+    """Nome (md5) do arquivo de uma página no cache_api/ da versão original do scraper"""
+    return hashlib.md5(f"{sigla}_{pagina}_{itens_por_pagina}_{inicio}_{fim}".encode()).hexdigest()
+
+
+def arquivo_legado(diretorio, chave):
+    for extensao in EXTENSOES_CACHE.values():
+        caminho = Path(diretorio) / f"{chave}{extensao}"
+        if caminho.is_file():
+            return caminho
+    return None
+
+
+def importar_diretorio_json(diretorio, backend, siglas, janela, chave_nova, itens_por_pagina, lote=1000):
+    """
+    Importa um cache_api/ antigo para o backend. O nome de cada arquivo é o md5 de
+    (tribunal, página, itens por página, janela), sem os parâmetros guardados: a chave é
+    recalculada para cada tribunal e página da janela com que o cache foi gerado (a página 1
+    diz quantas existem) e a página é gravada sob chave_nova(sigla, pagina), com os parâmetros
+    da requisição (janela e expiração corretas). Páginas de outras janelas não são encontradas.
+    Retorna (importadas, ilegíveis).
+    """
+    inicio, fim = janela["dataDisponibilizacaoInicio"], janela["dataDisponibilizacaoFim"]
+    importadas = 0
+    ilegiveis = 0
+    pendentes = []
+    for sigla in siglas:
+        total = None  # sem a página 1, segue enquanto houver arquivos
+        pagina = 0
+        while total is None or pagina < total:
+            pagina += 1
+            caminho = arquivo_legado(diretorio, chave_legada(sigla, pagina, itens_por_pagina, inicio, fim))
+            if caminho is None:
+                if total is None:
+                    break
+                continue
+            try:
+                dados = json.loads(ler_arquivo_cache(caminho, backend.codec))
+            except (OSError, ValueError):
+                ilegiveis += 1
+                continue
+            if pagina == 1 and isinstance(dados, dict) and isinstance(dados.get("count"), int):
+                total = max(1, math.ceil(dados["count"] / itens_por_pagina))
+            params = {"pagina": pagina, "itensPorPagina": itens_por_pagina, "siglaTribunal": sigla, **janela}
+            pendentes.append((chave_nova(sigla, pagina), dados, params))
+            importadas += 1
+            if len(pendentes) >= lote:
+                backend.gravar_lote(pendentes)
+                pendentes = []
+                print(f"  [cache] {importadas:,} páginas importadas...", end="\r")
+    if pendentes:
+        backend.gravar_lote(pendentes)
+    return importadas, ilegiveis
+
+
+def amostras_diretorio(diretorio, quantidade, codec):
+    amostras = []
+    for _, caminho in arquivos_cache_json(diretorio):
+        try:
+            amostras.append(ler_arquivo_cache(caminho, codec))
+        except (OSError, ValueError):
+            continue
+        if len(amostras) >= quantidade:
+            break
+    return amostras
+
+
+def amostras_origem(origem, quantidade, codec):
+    """JSONs (bytes) de até `quantidade` páginas de um diretório de cache JSON ou de um banco SQLite"""
+    if Path(origem).is_dir():
+        return amostras_diretorio(origem, quantidade, codec)
+    backend = BackendCacheSQLite(origem, codec=codec)
+    amostras = backend.amostras(quantidade)
+    backend.fechar()
+    return amostras
+
+
+def treinar_de_origem(origem, arquivo_dicionario, quantidade=2000, tamanho=TAMANHO_DICIONARIO):
+    """
+    Treina um dicionário zstd a partir de um diretório de cache JSON ou de um banco SQLite.
+    Se arquivo_dicionario já existe, ele é usado para ler as páginas antes de ser substituído.
+    """
+    amostras = amostras_origem(origem, quantidade, carregar_codec("zstd", arquivo_dicionario=arquivo_dicionario))
+    if len(amostras) < 10:
+        raise ValueError(f"Amostras insuficientes em {origem} ({len(amostras)})")
+    dicionario = treinar_dicionario(amostras, tamanho)
+    Path(arquivo_dicionario).write_bytes(dicionario)
+    return len(amostras), len(dicionario)
+
+
+def formatar_bytes(valor):
+    return f"{valor / 1024**2:,.1f} MB"
+
+
+def formatar_data(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else "-"
+
+
+def imprimir_estatisticas(arquivo, estatisticas):
+    print(f"[📊] Cache {arquivo}")
+    print(f"    Arquivo: {formatar_bytes(estatisticas['bytes_arquivo'])} "
+          f"({formatar_bytes(estatisticas['bytes_livres'])} livres, recuperáveis com 'compactar')")
+    print(f"    Páginas: {estatisticas['paginas']:,} ({formatar_bytes(estatisticas['bytes_paginas'])})")
+    print(f"      - permanentes (dias fechados): {estatisticas['paginas_permanentes']:,}")
+    print(f"      - com TTL ainda válido:        {estatisticas['paginas_com_ttl']:,}")
+    print(f"      - expiradas:                   {estatisticas['paginas_expiradas']:,}")
+    print(f"    Itens deduplicados: {estatisticas['itens']:,} ({formatar_bytes(estatisticas['bytes_itens'])})")
+    print(f"    Gravadas entre {formatar_data(estatisticas['gravada_mais_antiga'])} "
+          f"e {formatar_data(estatisticas['gravada_mais_nova'])}")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Ferramentas do cache de páginas da API")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    importar = comandos.add_parser("importar", help="Importa um diretório cache_api/ antigo para o SQLite")
+    importar.add_argument("diretorio")
+    importar.add_argument("arquivo")
+    importar.add_argument("--inicio", help="Início da janela com que o cache foi gerado (padrão: SEARCH_PARAMS)")
+    importar.add_argument("--fim", help="Fim da janela com que o cache foi gerado (padrão: SEARCH_PARAMS)")
+    importar.add_argument("--dicionario", default="cache_api.zdict",
+                          help="Dicionário zstd usado na gravação (padrão: cache_api.zdict, se existir)")
+
+    treinar = comandos.add_parser("treinar", help="Treina um dicionário zstd com páginas do cache")
+    treinar.add_argument("origem", help="Diretório de cache JSON ou arquivo SQLite")
+    treinar.add_argument("saida")
+    treinar.add_argument("amostras", nargs="?", type=int, default=2000)
+
+    for nome, ajuda in (("estatisticas", "Resumo do cache (consultas indexadas, sem varrer o banco)"),
+                        ("podar", "Remove páginas expiradas e, com --max-mb, as menos acessadas"),
+                        ("compactar", "Poda as expiradas e devolve o espaço livre ao disco (VACUUM)")):
+        comando = comandos.add_parser(nome, help=ajuda)
+        comando.add_argument("arquivo", help="Arquivo SQLite do cache")
+        comando.add_argument("--dicionario", default="cache_api.zdict",
+                             help="Dicionário zstd usado na gravação (padrão: cache_api.zdict, se existir)")
+        if nome == "podar":
+            comando.add_argument("--max-mb", type=float, help="Tamanho máximo do cache após a poda")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    inicio = time.time()
+
+    if args.comando == "importar":
+        # A chave nova (URL, parâmetros, versão do esquema) e a lista de tribunais são as do scraper
+        import main_api_otimizado as scraper
+        from tribunais import TODOS_TRIBUNAIS
+
+        janela = {"dataDisponibilizacaoInicio": args.inicio or scraper.SEARCH_PARAMS["dataDisponibilizacaoInicio"],
+                  "dataDisponibilizacaoFim": args.fim or scraper.SEARCH_PARAMS["dataDisponibilizacaoFim"]}
+        backend = BackendCacheSQLite(args.arquivo, codec=carregar_codec("zstd", arquivo_dicionario=args.dicionario))
+        importadas, ilegiveis = importar_diretorio_json(
+            args.diretorio, backend, [t["sigla"] for t in TODOS_TRIBUNAIS], janela,
+            lambda sigla, pagina: scraper.gerar_cache_key(sigla, pagina, scraper.ITEMS_POR_PAGINA, janela),
+            scraper.ITEMS_POR_PAGINA,
+        )
+        backend.fechar()
+        print(f"\n[✅] {importadas:,} páginas de {janela['dataDisponibilizacaoInicio']} a "
+              f"{janela['dataDisponibilizacaoFim']} importadas de {args.diretorio} para {args.arquivo} "
+              f"({ilegiveis:,} arquivos ilegíveis ignorados) em {time.time() - inicio:.1f}s")
+        return 0
+
+    if args.comando == "treinar":
+        try:
+            usadas, tamanho = treinar_de_origem(args.origem, args.saida, args.amostras)
+        except (RuntimeError, ValueError) as e:
+            print(f"[❌] {e}")
+            return 1
+        print(f"[✅] Dicionário de {tamanho / 1024:.0f} KB treinado com {usadas:,} páginas de {args.origem} "
+              f"em {time.time() - inicio:.1f}s -> {args.saida}")
+        print("    Páginas gravadas com outro dicionário deixam de ser lidas (viram cache miss)")
+        return 0
+
+    if not Path(args.arquivo).is_file():
+        print(f"[❌] {args.arquivo} não existe")
+        return 1
+    # O codec precisa do mesmo dicionário da gravação para achar os itens referenciados pelas páginas
+    backend = BackendCacheSQLite(args.arquivo, codec=carregar_codec("zstd", arquivo_dicionario=args.dicionario))
+    antes = backend.estatisticas()
+
+    if args.comando == "podar":
+        max_bytes = int(args.max_mb * 1024**2) if args.max_mb else None
+        expiradas, removidas = backend.podar(max_bytes)
+        print(f"[✅] {expiradas:,} páginas expiradas e {removidas:,} menos acessadas removidas")
+    elif args.comando == "compactar":
+        expiradas, _ = backend.podar()
+        backend.compactar()
+        print(f"[✅] {expiradas:,} páginas expiradas removidas; arquivo: {formatar_bytes(antes['bytes_arquivo'])} -> "
+              f"{formatar_bytes(backend.estatisticas()['bytes_arquivo'])} em {time.time() - inicio:.1f}s")
+
+    imprimir_estatisticas(args.arquivo, backend.estatisticas())
+    backend.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Circuit breaker (disjuntor) por tribunal usado pelo main_api_otimizado.py
+- fechado: requisições passam; resultados entram numa janela deslizante
+- aberto: taxa de erro alta (ou falhas seguidas) -> nenhuma requisição ao tribunal até o fim do resfriamento
+- meio-aberto: depois do resfriamento, uma requisição de sonda por vez; sondas bem-sucedidas
+  fecham o circuito, uma sonda com falha reabre com resfriamento dobrado
+Só 5xx, timeouts e erros de rede contam como falha (429 é assunto do rate limiter).
+"""
+
+import threading
+import time
+from collections import deque
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio-aberto"
+
+SONDAS_PARA_FECHAR = 2       # sondas seguidas com sucesso para fechar o circuito
+VALIDADE_SONDA = 60.0        # sonda sem veredito após tantos segundos libera a vaga (ex.: erro inesperado)
+
+
+class CircuitoAberto(Exception):
+    """Requisição recusada sem ir à rede: o circuito do tribunal está aberto"""
+
+    def __init__(self, sigla):
+        super().__init__(f"Circuito aberto para {sigla}")
+        self.sigla = sigla
+
+
+class Disjuntor:
+    def __init__(self, sigla, janela_s=30.0, min_amostras=8, limiar_erros=0.5, falhas_seguidas=5,
+                 tempo_aberto=15.0, tempo_aberto_max=120.0, max_aberturas=5):
+        self.sigla = sigla
+        self.janela_s = janela_s
+        self.min_amostras = min_amostras
+        self.limiar_erros = limiar_erros
+        self.limite_falhas_seguidas = falhas_seguidas
+        self.tempo_aberto = tempo_aberto
+        self.tempo_aberto_max = tempo_aberto_max
+        self.max_aberturas = max_aberturas
+        self.lock = threading.Lock()
+        self.estado = FECHADO
+        self.resultados = deque()       # (instante, sucesso) dentro da janela
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.aberturas = 0              # aberturas seguidas sem voltar a fechar
+        self.aberturas_total = 0
+        self.sondas_em_voo = 0
+        self.sonda_iniciada_em = 0.0
+        self.sucessos_sonda = 0
+
+    def _atualizar(self, agora):
+        """Com o lock: passa de aberto a meio-aberto quando o resfriamento acaba"""
+        if self.estado == ABERTO and agora >= self.aberto_ate:
+            self.estado = MEIO_ABERTO
+            self.sondas_em_voo = 0
+            self.sucessos_sonda = 0
+
+    def _sonda_livre(self, agora):
+        return self.sondas_em_voo == 0 or agora - self.sonda_iniciada_em > VALIDADE_SONDA
+
+    def permitir(self):
+        """Reserva a passagem de uma requisição (no meio-aberto, a vaga de sonda)"""
+        with self.lock:
+            agora = time.time()
+            self._atualizar(agora)
+            if self.estado == FECHADO:
+                return True
+            if self.estado == MEIO_ABERTO and self._sonda_livre(agora):
+                self.sondas_em_voo = 1
+                self.sonda_iniciada_em = agora
+                return True
+            return False
+
+    def liberar_sonda(self):
+        """A sonda terminou sem veredito (ex.: 429): libera a vaga para a próxima tentativa"""
+        with self.lock:
+            self.sondas_em_voo = 0
+
+    def aceita_unidade(self):
+        """Se vale a pena entregar uma página do tribunal a um worker agora (sem reservar nada)"""
+        with self.lock:
+            agora = time.time()
+            self._atualizar(agora)
+            return self.estado == FECHADO or (self.estado == MEIO_ABERTO and self._sonda_livre(agora))
+
+    def segundos_para_sonda(self):
+        with self.lock:
+            return max(0.0, self.aberto_ate - time.time()) if self.estado == ABERTO else 0.0
+
+    @property
+    def desistiu(self):
+        """Abriu max_aberturas vezes seguidas sem se recuperar: tribunal tratado como indisponível"""
+        return self.aberturas >= self.max_aberturas
+
+    def registrar(self, sucesso):
+        with self.lock:
+            agora = time.time()
+            self._atualizar(agora)
+            if self.estado == MEIO_ABERTO:
+                self.sondas_em_voo = 0
+                if not sucesso:
+                    self._abrir(agora, "sonda falhou")
+                    return
+                self.sucessos_sonda += 1
+                if self.sucessos_sonda >= SONDAS_PARA_FECHAR:
+                    self._fechar()
+                return
+            if self.estado == ABERTO:
+                return  # resposta de requisição que saiu antes de abrir
+
+            self.resultados.append((agora, sucesso))
+            while self.resultados and agora - self.resultados[0][0] > self.janela_s:
+                self.resultados.popleft()
+            self.falhas_seguidas = 0 if sucesso else self.falhas_seguidas + 1
+
+            if self.falhas_seguidas >= self.limite_falhas_seguidas:
+                self._abrir(agora, f"{self.falhas_seguidas} falhas seguidas")
+                return
+            if len(self.resultados) >= self.min_amostras:
+                erros = sum(1 for _, ok in self.resultados if not ok)
+                if erros / len(self.resultados) >= self.limiar_erros:
+                    self._abrir(agora, f"{erros}/{len(self.resultados)} falhas em {self.janela_s:.0f}s")
+
+    def _abrir(self, agora, motivo):
+        self.aberturas += 1
+        self.aberturas_total += 1
+        duracao = min(self.tempo_aberto_max, self.tempo_aberto * 2 ** (self.aberturas - 1))
+        self.estado = ABERTO
+        self.aberto_ate = agora + duracao
+        self.resultados.clear()
+        self.falhas_seguidas = 0
+        print(f"\n  [🔌] {self.sigla}: circuito ABERTO por {duracao:.0f}s ({motivo})")
+
+    def _fechar(self):
+        self.estado = FECHADO
+        self.aberturas = 0
+        self.resultados.clear()
+        self.falhas_seguidas = 0
+        print(f"\n  [🔌] {self.sigla}: circuito FECHADO (sondas ok)")
+
+
+class Disjuntores:
+    """Um Disjuntor por tribunal, criado na primeira requisição; a configuração vale para todos"""
+
+    def __init__(self, **config):
+        self.config = config
+        self.disjuntores = {}
+        self.lock = threading.Lock()
+
+    def de(self, sigla):
+        with self.lock:
+            disjuntor = self.disjuntores.get(sigla)
+            if disjuntor is None:
+                disjuntor = Disjuntor(sigla, **self.config)
+                self.disjuntores[sigla] = disjuntor
+            return disjuntor
+
+    def permitir(self, sigla):
+        return self.de(sigla).permitir()
+
+    def registrar(self, sigla, sucesso):
+        self.de(sigla).registrar(sucesso)
+
+    def liberar_sonda(self, sigla):
+        self.de(sigla).liberar_sonda()
+
+    def resumo(self):
+        """{sigla: {...}} dos tribunais cujo circuito abriu pelo menos uma vez"""
+        with self.lock:
+            disjuntores = list(self.disjuntores.values())
+        return {
+            d.sigla: {"aberturas": d.aberturas_total, "estado_final": d.estado, "desistiu": d.desistiu}
+            for d in disjuntores if d.aberturas_total
+        }
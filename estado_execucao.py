@@ -0,0 +1,249 @@
+"""
+Estado persistido entre execuções do scraper
+- Marcas d'água do modo incremental: último dia completo e maior id visto por tribunal
+- Journal de unidades concluídas para retomar execuções interrompidas (--resume)
+- Perfis de taxa aprendidos por tribunal (warm start do rate limiter)
+- Páginas com falha definitiva (dead letter) para reprocessar com --retry-failed
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+
+def gravar_json_atomico(caminho, dados):
+    """Escreve JSON em arquivo temporário e renomeia (nunca deixa o arquivo pela metade)"""
+    caminho = Path(caminho)
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+# ===== MARCAS D'ÁGUA (MODO INCREMENTAL) =====
+
+def carregar_marcas(caminho):
+    """Lê as marcas d'água por tribunal ({} se o arquivo não existir ou estiver corrompido)"""
+    if not Path(caminho).exists():
+        return {}
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[⚠️] Estado incremental ilegível ({caminho}): {e} - começando do zero")
+        return {}
+
+
+def salvar_marcas(caminho, marcas):
+    gravar_json_atomico(caminho, marcas)
+
+
+def atualizar_marca(marcas, sigla, ultima_data_completa, max_id=None):
+    """Avança a marca do tribunal (nunca retrocede a data nem o id)"""
+    anterior = marcas.get(sigla, {})
+    ultima = anterior.get("ultima_data_completa")
+    if ultima and ultima > ultima_data_completa:
+        ultima_data_completa = ultima
+
+    ids = [i for i in (anterior.get("max_id"), max_id) if i is not None]
+    marcas[sigla] = {
+        "ultima_data_completa": ultima_data_completa,
+        "max_id": max(ids) if ids else None,
+        "atualizado_em": datetime.now().isoformat(),
+    }
+
+
+def janela_incremental(marca, inicio_padrao, fim, lookback_dias):
+    """
+    Calcula (inicio, fim) a buscar para um tribunal: os dias após a marca d'água,
+    recuando lookback_dias para pegar publicações tardias. None se não há nada a buscar.
+    """
+    fim = date.fromisoformat(fim)
+    if marca and marca.get("ultima_data_completa"):
+        ultima = date.fromisoformat(marca["ultima_data_completa"])
+        inicio = ultima + timedelta(days=1) - timedelta(days=lookback_dias)
+    else:
+        inicio = date.fromisoformat(inicio_padrao)
+
+    if inicio > fim:
+        return None
+    return inicio.isoformat(), fim.isoformat()
+
+
+# ===== PERFIS DE TAXA POR TRIBUNAL =====
+
+def carregar_perfis(caminho):
+    """Lê os perfis por tribunal ({} se o arquivo não existir ou estiver corrompido)"""
+    if not Path(caminho).exists():
+        return {}
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            perfis = json.load(f)
+        return perfis if isinstance(perfis, dict) else {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[⚠️] Perfis de taxa ilegíveis ({caminho}): {e} - usando as taxas padrão")
+        return {}
+
+
+def salvar_perfis(caminho, novos):
+    """Atualiza os perfis dos tribunais desta execução e mantém os demais como estavam"""
+    perfis = carregar_perfis(caminho)
+    perfis.update(novos)
+    gravar_json_atomico(caminho, dict(sorted(perfis.items())))
+    return perfis
+
+
+# ===== PÁGINAS COM FALHA (DEAD LETTER) =====
+
+def carregar_falhas(caminho, assinatura):
+    """Lê as unidades com falha definitiva ([] se o arquivo não existir, estiver corrompido ou for de outra configuração)"""
+    if not Path(caminho).exists():
+        return []
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[⚠️] Arquivo de falhas ilegível ({caminho}): {e}")
+        return []
+    if dados.get("assinatura") != assinatura:
+        print(f"[⚠️] Arquivo de falhas {caminho} é de outra configuração (API/filtros/paginação) - ignorando")
+        return []
+    return dados.get("unidades", [])
+
+
+def salvar_falhas(caminho, assinatura, unidades):
+    """Grava as unidades com falha da execução; sem falhas, remove o arquivo anterior"""
+    caminho = Path(caminho)
+    if not unidades:
+        if caminho.exists():
+            caminho.unlink()
+        return
+    gravar_json_atomico(caminho, {"assinatura": assinatura, "criado_em": datetime.now().isoformat(), "unidades": unidades})
+
+
+# ===== JOURNAL DE EXECUÇÃO (CHECKPOINT / RESUME) =====
+
+def chave_unidade(sigla, inicio, fim, pagina):
+    """Identificador estável de uma unidade (tribunal, shard, página)"""
+    return f"{sigla}|{inicio}|{fim}|{pagina}"
+
+
+class JournalExecucao:
+    """
+    Journal append-only (JSONL) das unidades concluídas com seus resultados filtrados.
+    A primeira linha é um cabeçalho com a assinatura da execução (filtros, paginação...);
+    as demais são unidades. O fsync é feito em lotes de fsync_lote entradas.
+    Ao continuar (--resume), só as chaves e a posição de cada linha no arquivo ficam em
+    memória; os registros de uma unidade são lidos do disco quando ela é retomada.
+    """
+
+    def __init__(self, caminho, assinatura, continuar=False, fsync_lote=50):
+        self.caminho = Path(caminho)
+        self.assinatura = assinatura
+        self.fsync_lote = fsync_lote
+        self.pendentes_fsync = 0
+        self.lock = threading.Lock()
+        self.lock_leitura = threading.Lock()
+        self.leitor = None
+        self.concluidas = carregar_journal(self.caminho, assinatura) if continuar else {}  # chave -> posição
+
+        if continuar and self.concluidas:
+            self.leitor = open(self.caminho, "rb")
+            self.arquivo = open(self.caminho, "a", encoding="utf-8")
+            if not termina_com_quebra(self.caminho):
+                # Última linha truncada por uma interrupção: isola antes de continuar escrevendo
+                self.arquivo.write("\n")
+        else:
+            self.arquivo = open(self.caminho, "w", encoding="utf-8")
+            self._escrever({"tipo": "cabecalho", "assinatura": assinatura, "criado_em": datetime.now().isoformat()})
+            self._sincronizar()
+
+    def _escrever(self, entrada):
+        self.arquivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+
+    def _sincronizar(self):
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+        self.pendentes_fsync = 0
+
+    def retirar(self, chave):
+        """Posição da unidade no journal, se já concluída (None se não); cada unidade é retomada uma vez"""
+        with self.lock:
+            return self.concluidas.pop(chave, None)
+
+    def ler(self, posicao):
+        """Entrada gravada na posição devolvida por retirar() (resultados, count, max_id, max_data)"""
+        with self.lock_leitura:
+            self.leitor.seek(posicao)
+            return json.loads(self.leitor.readline())
+
+    def registrar(self, sigla, inicio, fim, pagina, resultado):
+        """Grava uma unidade concluída com sucesso"""
+        entrada = {
+            "tipo": "unidade",
+            "chave": chave_unidade(sigla, inicio, fim, pagina),
+            "resultados": resultado["resultados"],
+            "count": resultado.get("count", 0),
+            "max_id": resultado.get("max_id"),
+            "max_data": resultado.get("max_data"),
+        }
+        with self.lock:
+            self._escrever(entrada)
+            self.pendentes_fsync += 1
+            if self.pendentes_fsync >= self.fsync_lote:
+                self._sincronizar()
+
+    def fechar(self):
+        with self.lock:
+            if not self.arquivo.closed:
+                self._sincronizar()
+                self.arquivo.close()
+        with self.lock_leitura:
+            if self.leitor is not None:
+                self.leitor.close()
+
+
+def carregar_journal(caminho, assinatura):
+    """
+    Índice das unidades já concluídas de um journal ({chave: posição da linha no arquivo}),
+    sem guardar os registros. Ignora o journal se a assinatura não bater e descarta linhas
+    truncadas. Com a mesma chave gravada mais de uma vez, vale a última.
+    """
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return {}
+
+    concluidas = {}
+    with open(caminho, "rb") as f:
+        linha = f.readline()
+        try:
+            cabecalho = json.loads(linha)
+        except json.JSONDecodeError:
+            cabecalho = {}
+        if cabecalho.get("tipo") != "cabecalho" or cabecalho.get("assinatura") != assinatura:
+            print(f"[⚠️] Journal {caminho} é de outra configuração - ignorando")
+            return {}
+
+        posicao = len(linha)
+        for linha in f:
+            try:
+                entrada = json.loads(linha)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                entrada = None
+            if isinstance(entrada, dict) and entrada.get("tipo") == "unidade":
+                concluidas[entrada["chave"]] = posicao
+            posicao += len(linha)
+    return concluidas
+
+
+def termina_com_quebra(caminho):
+    with open(caminho, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
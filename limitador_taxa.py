@@ -0,0 +1,545 @@
+"""
+Limitadores de taxa (token bucket) usados pelo main_api_otimizado.py
+- AdaptiveRateLimiter: um bucket com taxa adaptativa; com tempos de resposta, controle de
+  congestionamento estilo AIMD/Vegas (acelera com latência estável, recua quando ela infla,
+  429/5xx são sinais fortes); sem eles, cai a cada 429 e sobe devagar com sucessos
+- LimitadorHierarquico: bucket global + um bucket filho por tribunal, cada um com sua própria
+  taxa adaptativa; um tribunal recebendo 429 desacelera sozinho enquanto os outros seguem
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# ===== CONTROLE POR LATÊNCIA =====
+PERIODO_CONTROLE = 1.0           # segundos entre ajustes da taxa pela latência
+TOLERANCIA_LATENCIA = 1.5        # latência até 1.5x a base é tolerada sem recuo
+DERIVA_LATENCIA_BASE = 0.05      # por período, quanto a base (mínimo) sobe em direção à latência atual
+SUAVIZACAO = 0.5                 # peso do novo alvo a cada ajuste (evita oscilação)
+RECUO_MAXIMO_LATENCIA = 0.5      # um período de latência alta corta no máximo metade da taxa
+FATOR_RECUO_ERRO = 0.7           # recuo quando 5xx/timeouts passam do limiar no período (o 429 usa 0.6^n)
+LIMIAR_ERROS = 0.05              # fração de 5xx/timeouts no período que conta como sobrecarga
+PAUSA_APOS_ERRO = 10.0           # segundos sem acelerar depois de um 429/5xx
+
+# ===== PAUSA (429 / Retry-After) =====
+DURACAO_RAMPA = 5.0              # segundos para voltar à taxa cheia depois de uma pausa
+FRACAO_INICIAL_RAMPA = 0.2       # a retomada começa com 20% da taxa
+
+# ===== PERFIS (WARM START) =====
+AMOSTRAS_PERFIL = 2000           # latências guardadas por bucket para os percentis do perfil
+PESO_TAXA_ESTAVEL = 0.02         # peso de cada sucesso na média da taxa (taxa "de regime")
+
+
+class _Espera:
+    """Vaga na fila do limitador: um Event de thread, ou um asyncio.Event acordado pelo loop dono"""
+    __slots__ = ("evento", "loop")
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.evento = asyncio.Event() if loop is not None else threading.Event()
+
+    def acordar(self):
+        if self.loop is None:
+            self.evento.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.evento.set)
+        except RuntimeError:
+            pass  # loop já fechado: ninguém mais espera nessa vaga
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket com taxa adaptativa e fila FIFO de espera.
+
+    Quem chega com a fila vazia e token disponível passa direto. Os demais entram na fila
+    e dormem no próprio Event; só o primeiro da fila acorda por tempo (exatamente quando o
+    próximo token fica pronto), pega o token e passa a vez ao seguinte. Assim os tokens saem
+    na ordem de chegada, sem polling e sem todas as threads acordando juntas.
+    Threads e corrotinas (acquire_async) podem dividir o mesmo limitador e a mesma fila.
+    """
+
+    def __init__(self, initial_rate=5, min_rate=1, max_rate=20, nome=None, controle_latencia=True):
+        self.nome = nome
+        self.controle_latencia = controle_latencia
+        self.rate = float(initial_rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.tokens = self.rate
+        self.capacity = float(max_rate)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        self.fila = deque()  # _Espera na ordem de chegada
+        self.consecutive_429 = 0
+        self.last_429_time = 0.0
+        self.pausado_ate = float("-inf")  # instante (monotonic) até o qual ninguém recebe token
+        self.tempo_pausado = 0.0          # soma das pausas, sem contar sobreposição
+        # Estatísticas para o perfil salvo ao fim da execução
+        self.sucessos = 0
+        self.respostas_429 = 0
+        self.erros = 0
+        self.taxa_estavel = None          # média da taxa ponderada pelo tráfego
+        self.latencias = deque(maxlen=AMOSTRAS_PERFIL)
+        self.latencia_base = None       # menor latência recente (servidor sem fila)
+        self.latencia_media = None      # média do último período de controle
+        self.soma_periodo = 0.0
+        self.amostras_periodo = 0
+        self.erros_periodo = 0
+        self.ultimo_recuo = -PERIODO_CONTROLE  # instante (monotonic) do último recuo por 429
+        self.ultimo_ajuste = time.monotonic()
+        self.saturado = False           # alguém esperou token desde o último ajuste
+
+    def _refill(self):
+        now = time.monotonic()
+        if now < self.pausado_ate:
+            self.last_refill = now  # pausado: nada acumula
+            return
+        elapsed = now - max(self.last_refill, self.pausado_ate)
+        if elapsed > 0:
+            add = elapsed * self._taxa_efetiva(now)
+            self.tokens = min(self.capacity, self.tokens + add)
+        self.last_refill = now
+
+    def _taxa_efetiva(self, agora):
+        """A taxa, reduzida durante a rampa de retomada depois de uma pausa"""
+        decorrido = agora - self.pausado_ate
+        if decorrido >= DURACAO_RAMPA:
+            return self.rate
+        return self.rate * (FRACAO_INICIAL_RAMPA + (1 - FRACAO_INICIAL_RAMPA) * decorrido / DURACAO_RAMPA)
+
+    def _tentar(self, vaga):
+        """
+        Chamado com o lock. Retorna None se a vaga levou o token (e saiu da fila),
+        senão quantos segundos esperar (0 = só até ser acordada)
+        """
+        if self.fila[0] is not vaga:
+            return 0
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.fila.popleft()
+            if self.fila:
+                self.fila[0].acordar()
+            return None
+        agora = time.monotonic()
+        if agora < self.pausado_ate:
+            return self.pausado_ate - agora
+        taxa = self._taxa_efetiva(agora)
+        return (1.0 - self.tokens) / (taxa if taxa > 0 else 1.0)
+
+    def _entrar(self, loop=None):
+        """Token imediato (retorna None) ou uma vaga no fim da fila"""
+        with self.lock:
+            if not self.fila:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return None
+            self.saturado = True
+            vaga = _Espera(loop)
+            self.fila.append(vaga)
+            return vaga
+
+    def _sair(self, vaga):
+        """Remove uma vaga abandonada (corrotina cancelada, timeout); se era a primeira, acorda a próxima"""
+        with self.lock:
+            if vaga not in self.fila:
+                return
+            primeira = self.fila[0] is vaga
+            self.fila.remove(vaga)
+            if primeira and self.fila:
+                self.fila[0].acordar()
+
+    def devolver(self):
+        """Devolve um token tirado e não usado (ex.: o bucket global não liberou a requisição a tempo)"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + 1.0)
+            self._acordar_primeira()
+
+    def segundos_para_token(self):
+        """Quanto quem chegasse agora esperaria por um token (0 = passa direto), sem tirar nenhum"""
+        with self.lock:
+            self._refill()
+            agora = time.monotonic()
+            if agora < self.pausado_ate:
+                return self.pausado_ate - agora
+            falta = len(self.fila) + 1.0 - self.tokens  # os que já esperam vêm antes
+            if falta <= 0:
+                return 0.0
+            taxa = self._taxa_efetiva(agora)
+            return falta / (taxa if taxa > 0 else 1.0)
+
+    def _acordar_primeira(self):
+        """Com o lock: a taxa mudou, o primeiro da fila recalcula a espera"""
+        if self.fila:
+            self.fila[0].acordar()
+
+    def acquire(self, timeout=None):
+        """
+        Espera um token e retorna True. Com timeout (segundos), desiste quando ele acaba:
+        sai da fila sem token e retorna False.
+        """
+        vaga = self._entrar()
+        if vaga is None:
+            return True
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            vaga.evento.clear()
+            with self.lock:
+                espera = self._tentar(vaga)
+            if espera is None:
+                return True
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._sair(vaga)
+                    return False
+                espera = min(espera, restante) if espera else restante
+            vaga.evento.wait(espera or None)
+
+    async def acquire_async(self, timeout=None):
+        """Mesmo que acquire(), mas cede o event loop enquanto espera"""
+        vaga = self._entrar(asyncio.get_running_loop())
+        if vaga is None:
+            return True
+        limite = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                vaga.evento.clear()
+                with self.lock:
+                    espera = self._tentar(vaga)
+                if espera is None:
+                    vaga = None
+                    return True
+                if limite is not None:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return False
+                    espera = min(espera, restante) if espera else restante
+                try:
+                    await asyncio.wait_for(vaga.evento.wait(), espera or None)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if vaga is not None:
+                self._sair(vaga)
+
+    def _definir_taxa(self, taxa):
+        """Com o lock: aplica a nova taxa dentro de [min_rate, max_rate]"""
+        self.rate = min(self.max_rate, max(self.min_rate, taxa))
+        self.capacity = max(self.rate, self.min_rate)
+        self.tokens = min(self.tokens, self.capacity)
+        self._acordar_primeira()
+
+    def on_429(self):
+        with self.lock:
+            self.respostas_429 += 1
+            self.last_429_time = time.time()
+            agora = time.monotonic()
+            if self.controle_latencia and agora - self.ultimo_recuo < PERIODO_CONTROLE:
+                return  # mesmo episódio de congestionamento (várias requisições em voo): já recuou
+            self.ultimo_recuo = agora
+            self.consecutive_429 += 1
+            self._definir_taxa(self.rate * 0.6 ** self.consecutive_429)
+            prefixo = f"{self.nome}: " if self.nome else ""
+            print(f"\n[rate_limiter] {prefixo}429 detectado: nova taxa {self.rate:.2f} req/s")
+
+    def pausar(self, segundos):
+        """
+        Ninguém recebe token pelos próximos `segundos` (Retry-After ou 429); quem já espera
+        continua na fila e a retomada é gradual (rampa de DURACAO_RAMPA segundos)
+        """
+        with self.lock:
+            agora = time.monotonic()
+            fim = agora + segundos
+            if fim <= self.pausado_ate:
+                return
+            self.tempo_pausado += fim - max(agora, self.pausado_ate)
+            self.pausado_ate = fim
+            self.tokens = min(self.tokens, 0.0)
+            self._acordar_primeira()
+
+    def on_erro(self):
+        """5xx ou timeout: conta para o período; acima de LIMIAR_ERROS vira sinal de sobrecarga"""
+        with self.lock:
+            self.erros += 1
+            if not self.controle_latencia:
+                return
+            self.erros_periodo += 1
+            self._fechar_periodo_se_vencido()
+
+    def on_success(self, tempo_resposta=None):
+        """tempo_resposta (s) alimenta o controle por latência; sem ele, recuperação lenta pós-429"""
+        with self.lock:
+            self.sucessos += 1
+            if self.taxa_estavel is None:
+                self.taxa_estavel = self.rate
+            self.taxa_estavel += (self.rate - self.taxa_estavel) * PESO_TAXA_ESTAVEL
+            if tempo_resposta is not None:
+                self.latencias.append(tempo_resposta)
+            if self.consecutive_429 > 0:
+                self.consecutive_429 = max(0, self.consecutive_429 - 1)
+            if tempo_resposta is None or not self.controle_latencia:
+                if time.time() - self.last_429_time > 30 and self.rate < self.max_rate:
+                    self.rate = min(self.max_rate, self.rate + 0.5)
+                    self.capacity = max(self.capacity, self.rate)
+                    self._acordar_primeira()
+                return
+            self.soma_periodo += tempo_resposta
+            self.amostras_periodo += 1
+            if self.latencia_base is None or tempo_resposta < self.latencia_base:
+                self.latencia_base = tempo_resposta
+            self._fechar_periodo_se_vencido()
+
+    def _fechar_periodo_se_vencido(self):
+        agora = time.monotonic()
+        if agora - self.ultimo_ajuste >= PERIODO_CONTROLE:
+            self.ultimo_ajuste = agora
+            self._ajustar_por_latencia()
+
+    def _ajustar_por_latencia(self):
+        """
+        Com o lock, uma vez por período (gradiente estilo Vegas): compara a latência média do
+        período com a base. Latência estável -> soma uma folga de sqrt(taxa) (aumento aditivo);
+        latência inflando -> multiplica pela razão base/média (recuo multiplicativo). O ponto de
+        equilíbrio fica com uma fila pequena no servidor, bem antes de ele responder 429.
+        """
+        amostras, erros = self.amostras_periodo, self.erros_periodo
+        media = self.soma_periodo / amostras if amostras else None
+        self.soma_periodo, self.amostras_periodo, self.erros_periodo = 0.0, 0, 0
+        saturado, self.saturado = self.saturado, False
+
+        if erros and erros / (erros + amostras) > LIMIAR_ERROS:
+            self.last_429_time = time.time()
+            self._definir_taxa(self.rate * FATOR_RECUO_ERRO)
+            return
+        if media is None:
+            return
+        self.latencia_media = media
+
+        gradiente = min(1.0, max(RECUO_MAXIMO_LATENCIA, TOLERANCIA_LATENCIA * self.latencia_base / media))
+        # Só ganha folga se a taxa está de fato limitando (alguém esperou token) e sem erro recente
+        folga = self.rate ** 0.5 if saturado and time.time() - self.last_429_time > PAUSA_APOS_ERRO else 0.0
+        alvo = self.rate * gradiente + folga
+        if alvo != self.rate:
+            self._definir_taxa(self.rate + (alvo - self.rate) * SUAVIZACAO)
+
+        # A base acompanha devagar uma mudança real de patamar (ex.: outra rota de rede)
+        self.latencia_base += (media - self.latencia_base) * DERIVA_LATENCIA_BASE
+
+    def estado(self):
+        """Taxa e latências atuais (para relatórios e para a simulação)"""
+        with self.lock:
+            return {
+                "taxa": round(self.rate, 2),
+                "tempo_pausado_s": round(self.tempo_pausado, 1),
+                "latencia_base_ms": round(self.latencia_base * 1000, 1) if self.latencia_base else None,
+                "latencia_media_ms": round(self.latencia_media * 1000, 1) if self.latencia_media else None,
+            }
+
+    @property
+    def requisicoes(self):
+        return self.sucessos + self.respostas_429 + self.erros
+
+    def perfil(self):
+        """Taxa de regime, percentis de latência e taxas de erro, no formato salvo em perfis_tribunais.json"""
+        with self.lock:
+            latencias = sorted(self.latencias)
+            total = self.sucessos + self.respostas_429 + self.erros
+            taxa = self.taxa_estavel if self.taxa_estavel is not None else self.rate
+            return {
+                "taxa": round(taxa, 2),
+                "taxa_final": round(self.rate, 2),
+                "latencia_p50_ms": _percentil_ms(latencias, 0.50),
+                "latencia_p90_ms": _percentil_ms(latencias, 0.90),
+                "latencia_p99_ms": _percentil_ms(latencias, 0.99),
+                "requisicoes": total,
+                "taxa_429": round(self.respostas_429 / total, 4) if total else 0.0,
+                "taxa_erros": round(self.erros / total, 4) if total else 0.0,
+                "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+            }
+
+
+def _percentil_ms(ordenados, p):
+    if not ordenados:
+        return None
+    return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] * 1000, 1)
+
+
+def taxa_inicial_do_perfil(perfil, padrao, meia_vida_dias, agora=None):
+    """
+    Taxa aprendida numa execução anterior, puxada de volta para o padrão conforme o perfil
+    envelhece: com meia-vida de 7 dias, um perfil de uma semana fica a meio caminho do padrão
+    """
+    try:
+        atualizado = datetime.fromisoformat(perfil["atualizado_em"])
+        taxa = float(perfil["taxa"])
+    except (KeyError, TypeError, ValueError):
+        return padrao
+    idade_dias = max(0.0, ((agora or datetime.now()) - atualizado).total_seconds() / 86400)
+    peso = 0.5 ** (idade_dias / meia_vida_dias) if meia_vida_dias > 0 else 0.0
+    return padrao + (taxa - padrao) * peso
+
+
+class LimitadorHierarquico:
+    """
+    Token bucket hierárquico: cada requisição tira um token do bucket do tribunal e
+    depois um do bucket global. O filho de um tribunal tem teto próprio (limites_filhos,
+    ou limite_filho_padrão; sem teto = o global) e adapta a taxa só com os 429, erros e
+    latências daquele tribunal. Como o filho espera antes de disputar o global, um tribunal desacelerado
+    não ocupa a capacidade global: ela fica para os demais.
+
+    O bucket global só desacelera quando tribunais_429_global tribunais diferentes
+    recebem 429 dentro de janela_429_global segundos (sinal de limite da API inteira).
+    Sem sigla, acquire/on_429/on_erro/on_success atuam só no global.
+    """
+
+    def __init__(self, taxa_global, min_rate=1, limites_filhos=None, limite_filho_padrao=None,
+                 tribunais_429_global=3, janela_429_global=10.0, controle_latencia=True):
+        self.global_ = AdaptiveRateLimiter(initial_rate=taxa_global, min_rate=min_rate, max_rate=taxa_global,
+                                           nome="global", controle_latencia=controle_latencia)
+        self.min_rate = min_rate
+        self.controle_latencia = controle_latencia
+        self.limites_filhos = dict(limites_filhos or {})
+        self.limite_filho_padrao = limite_filho_padrao
+        self.tribunais_429_global = tribunais_429_global
+        self.janela_429_global = janela_429_global
+        self.filhos = {}
+        self.taxas_iniciais = {}  # sigla -> taxa de partida vinda do perfil salvo
+        self.ultimos_429 = {}  # sigla -> instante do último 429
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.global_.rate
+
+    def filho(self, sigla):
+        with self.lock:
+            limitador = self.filhos.get(sigla)
+            if limitador is None:
+                teto = self._teto(sigla)
+                limitador = AdaptiveRateLimiter(initial_rate=self.taxas_iniciais.get(sigla, teto),
+                                                min_rate=min(self.min_rate, teto),
+                                                max_rate=teto, nome=sigla, controle_latencia=self.controle_latencia)
+                self.filhos[sigla] = limitador
+            return limitador
+
+    def _teto(self, sigla):
+        teto = self.limites_filhos.get(sigla, self.limite_filho_padrao) or self.global_.max_rate
+        return min(teto, self.global_.max_rate)
+
+    def aplicar_perfis(self, perfis, meia_vida_dias):
+        """
+        Warm start: cada tribunal com perfil salvo começa da taxa aprendida (envelhecida em
+        direção ao teto) em vez do teto. Retorna {sigla: taxa inicial} dos que mudaram.
+        """
+        iniciais = {}
+        for sigla, perfil in perfis.items():
+            teto = self._teto(sigla)
+            taxa = taxa_inicial_do_perfil(perfil, teto, meia_vida_dias)
+            taxa = min(teto, max(min(self.min_rate, teto), taxa))
+            if taxa < teto:
+                iniciais[sigla] = round(taxa, 2)
+        with self.lock:
+            self.taxas_iniciais.update(iniciais)
+        return iniciais
+
+    def perfis(self, min_requisicoes=1):
+        """{sigla: perfil} dos tribunais com requisições suficientes nesta execução"""
+        with self.lock:
+            filhos = list(self.filhos.items())
+        return {sigla: f.perfil() for sigla, f in filhos if f.requisicoes >= min_requisicoes}
+
+    def acquire(self, sigla=None, timeout=None):
+        """
+        Token do tribunal e depois do global; False se o timeout (segundos) acabar antes.
+        Sem o global a tempo, o token do tribunal volta para o bucket dele.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        if sigla is None:
+            return self.global_.acquire(timeout)
+        filho = self.filho(sigla)
+        if not filho.acquire(timeout):
+            return False
+        if self.global_.acquire(None if limite is None else max(0.0, limite - time.monotonic())):
+            return True
+        filho.devolver()
+        return False
+
+    async def acquire_async(self, sigla=None, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        if sigla is None:
+            return await self.global_.acquire_async(timeout)
+        filho = self.filho(sigla)
+        if not await filho.acquire_async(timeout):
+            return False
+        liberado = False
+        try:
+            liberado = await self.global_.acquire_async(None if limite is None else max(0.0, limite - time.monotonic()))
+            return liberado
+        finally:
+            if not liberado:
+                filho.devolver()  # timeout ou cancelamento esperando o global
+
+    def segundos_para_token(self, sigla):
+        """Espera no bucket do tribunal para a próxima requisição (o global é o mesmo para todos)"""
+        return self.filho(sigla).segundos_para_token()
+
+    def on_429(self, sigla=None):
+        if sigla is None:
+            self.global_.on_429()
+            return
+        self.filho(sigla).on_429()
+        with self.lock:
+            self.ultimos_429[sigla] = time.time()
+        if self._429_em_varios_tribunais():
+            self.global_.on_429()
+
+    def _429_em_varios_tribunais(self):
+        agora = time.time()
+        with self.lock:
+            recentes = sum(1 for instante in self.ultimos_429.values() if agora - instante <= self.janela_429_global)
+        return recentes >= self.tribunais_429_global
+
+    def pausar(self, sigla, segundos):
+        """Pausa o tribunal; se vários tribunais estão recebendo 429, pausa a API inteira (global)"""
+        if sigla is None or self._429_em_varios_tribunais():
+            self.global_.pausar(segundos)
+        if sigla is not None:
+            self.filho(sigla).pausar(segundos)
+
+    def tempo_pausado(self, sigla=None):
+        bucket = self.global_ if sigla is None else self.filhos.get(sigla)
+        return bucket.tempo_pausado if bucket else 0.0
+
+    def tempos_pausados(self):
+        """{sigla: segundos} dos buckets que ficaram pausados, incluindo "global" """
+        with self.lock:
+            buckets = [("global", self.global_)] + list(self.filhos.items())
+        return {sigla: round(b.tempo_pausado, 1) for sigla, b in buckets if b.tempo_pausado > 0}
+
+    def on_erro(self, sigla=None):
+        (self.global_ if sigla is None else self.filho(sigla)).on_erro()
+
+    def on_success(self, sigla=None, tempo_resposta=None):
+        """A latência vai para o filho do tribunal (é o servidor dele que enche); o global só recupera"""
+        if sigla is None:
+            self.global_.on_success(tempo_resposta)
+            return
+        self.filho(sigla).on_success(tempo_resposta)
+        self.global_.on_success()
+
+    def reduzidos(self):
+        """{sigla: taxa} dos tribunais que estão abaixo do próprio teto"""
+        with self.lock:
+            filhos = list(self.filhos.items())
+        return {sigla: round(f.rate, 2) for sigla, f in filhos if f.rate < f.max_rate}
+
+    def estados(self):
+        """{sigla: estado()} de cada tribunal já visto"""
+        with self.lock:
+            filhos = list(self.filhos.items())
+        return {sigla: f.estado() for sigla, f in filhos}
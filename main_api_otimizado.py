@@ -4,24 +4,39 @@ Scraper PJE - Versão ULTRA OTIMIZADA
 Performance máxima com paralelismo, cache e rate limiting inteligente!
 """
 
+import argparse
+import asyncio
 import json
 import math
 import requests
 import time
 import threading
 import hashlib
+import os
 import sys
 import random
-from datetime import datetime
+import heapq
+from datetime import datetime, date, timedelta
 from urllib.parse import urlencode
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError
+from collections import Counter, deque
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    import aiohttp  # Necessário apenas para o motor async
+except ImportError:
+    aiohttp = None
+
 # Importar lista de tribunais
 from tribunais import get_tribunais_por_tipo
+from cache_paginas import criar_backend, carregar_codec, camada_cache, CacheMemoriaLRU, EscritorCache
+from limitador_taxa import LimitadorHierarquico
+from disjuntor import Disjuntores, CircuitoAberto
+from saida_streaming import SaidaTribunais, escrever_consolidado
+from estado_execucao import (carregar_marcas, salvar_marcas, atualizar_marca, janela_incremental, JournalExecucao, chave_unidade,
+                             carregar_perfis, salvar_perfis, carregar_falhas, salvar_falhas)
 
 # ===== CONFIGURAÇÕES =====
 
@@ -47,10 +62,23 @@ TRIBUNAIS_ESPECIFICOS = ["TJAM"]
 # Paginação
 ITEMS_POR_PAGINA = 100  # Máximo permitido pela API
 
+# Planejamento (pré-contagem de todos os tribunais antes de buscar dados)
+PLANEJAMENTO_ENABLED = True
+ITENS_POR_PAGINA_CONTAGEM = 1  # Página mínima: só precisamos do "count"
+
+# Sharding por data: cada tribunal é dividido em sub-janelas paginadas (e cacheadas) separadamente
+SHARDING_ENABLED = True
+SHARD_DIAS = None            # None = adaptativo; 1 = sempre um shard por dia (máximo reuso de cache)
+MAX_PAGINAS_POR_SHARD = 50   # Shards maiores que isso são divididos ao meio até 1 dia
+
 # Diretórios
 OUTPUT_DIR = "resultados_api"
 CACHE_DIR = "cache_api"
 LOG_FILE = "scraper_requests.log"
+ESTADO_SYNC_FILE = "estado_sync.json"  # Marcas d'água do modo incremental
+JOURNAL_FILE = "journal.jsonl"         # Journal de checkpoint (dentro de OUTPUT_DIR)
+PERFIS_TRIBUNAIS_FILE = "perfis_tribunais.json"  # Taxa/latência aprendidas por tribunal (dentro de OUTPUT_DIR)
+FALHAS_FILE = "paginas_falhas.json"    # Páginas com falha definitiva, para --retry-failed (dentro de OUTPUT_DIR)
 
 # Headers para requisição
 HEADERS = {
@@ -66,23 +94,89 @@ HEADERS = {
 # Paralelismo
 MAX_WORKERS_TRIBUNAIS = 3  # Quantos tribunais processar simultaneamente (REDUZIDO para estabilidade)
 MAX_WORKERS_PAGINAS = 3    # Quantas páginas buscar simultaneamente por tribunal (REDUZIDO)
+JANELA_PAGINAS_EM_VOO = None  # Páginas submetidas e ainda não consumidas por tribunal no motor tribunais (None = 2 x MAX_WORKERS_PAGINAS)
+JANELA_UNIDADES_AGENDADOR = None  # Páginas geradas e não concluídas no agendador global (None = 2 x as que o motor processa ao mesmo tempo)
+
+# Motor de execução:
+#   "threads"   - agendador global (fila única de páginas de todos os tribunais) com threads
+#   "async"     - agendador global em um único event loop (asyncio + aiohttp)
+#   "tribunais" - modo antigo: um ThreadPoolExecutor de páginas por tribunal
+MOTOR_EXECUCAO = "threads"
+MAX_WORKERS_GLOBAL = MAX_WORKERS_TRIBUNAIS * MAX_WORKERS_PAGINAS  # Workers do agendador global (motor threads)
+MAX_TAREFAS_ASYNC = 200    # Requisições simultâneas em voo no motor async
+MAX_CONEXOES_ASYNC = 100   # Pool de conexões compartilhado pelo motor async
 
 # Rate Limiting (requisições por segundo)
 MAX_REQUESTS_PER_SECOND = 3   # REDUZIDO para evitar sobrecarga
 RATE_LIMIT_ENABLED = True
+# Limites por tribunal dentro do global (token bucket hierárquico): cada tribunal tem sua
+# própria taxa adaptativa e um 429 desacelera só o tribunal que o recebeu
+LIMITES_POR_TRIBUNAL = {}      # Ex.: {"TJSP": 2} - teto em req/s de tribunais específicos
+LIMITE_TRIBUNAL_PADRAO = None  # Teto dos demais tribunais (None = o limite global)
+TRIBUNAIS_429_GLOBAL = 3       # 429 em tantos tribunais diferentes (em 10s) desacelera também o global
+CONTROLE_LATENCIA_ENABLED = True  # Ajusta a taxa de cada tribunal pelo tempo de resposta (AIMD/Vegas), antes do 429
+PERFIS_ENABLED = True          # Cada tribunal começa da taxa aprendida na execução anterior (PERFIS_TRIBUNAIS_FILE)
+PERFIL_MEIA_VIDA_DIAS = 7      # Perfis antigos voltam ao padrão: a cada 7 dias, metade do caminho
+PERFIL_MIN_REQUISICOES = 20    # Só salva perfil de tribunal com pelo menos tantas requisições na execução
 
 # Timeouts
 REQUEST_TIMEOUT = 30          # Timeout por requisição (segundos)
-TRIBUNAL_TIMEOUT = 1800        # Timeout por tribunal (segundos) - 30 minutos
-MAX_RETRIES = 3                # Número máximo de tentativas por requisição
+TRIBUNAL_TIMEOUT = 1800        # Prazo por tribunal (segundos) - 30 minutos; vencido, o trabalho pendente é cancelado
+MAX_RETRIES = 3                # Número máximo de tentativas por página
+# Página com 429/5xx/timeout/erro de rede vai para uma fila de retry (heap pelo horário da próxima
+# tentativa, com backoff) e o worker segue com outras páginas em vez de dormir
+ORCAMENTO_RETRIES = 1000       # Reagendamentos permitidos por execução (None = sem limite); esgotado, a falha é definitiva
+
+# Circuit breaker por tribunal: com o backend do tribunal fora, as páginas dele saem da fila
+# (lista de espera) em vez de prender workers em retries; sondas testam a volta
+DISJUNTOR_ENABLED = True
+DISJUNTOR_JANELA_S = 30        # Janela deslizante da taxa de erro (segundos)
+DISJUNTOR_MIN_AMOSTRAS = 8     # Respostas mínimas na janela para avaliar a taxa de erro
+DISJUNTOR_LIMIAR_ERROS = 0.5   # Abre com 50% de 5xx/timeouts/erros de rede na janela...
+DISJUNTOR_FALHAS_SEGUIDAS = 5  # ...ou com tantas falhas seguidas
+DISJUNTOR_TEMPO_ABERTO = 15    # Resfriamento antes da sonda (dobra a cada sonda que falha)
+DISJUNTOR_TEMPO_ABERTO_MAX = 120
+DISJUNTOR_MAX_ABERTURAS = 5    # Aberturas seguidas sem recuperação: desiste das páginas do tribunal
 
 # Cache
 CACHE_ENABLED = True  # Ativa cache para evitar requisições repetidas
+CACHE_LEITURA_ENABLED = True  # False = sempre busca na API (ainda grava no cache)
+CACHE_BACKEND = "sqlite"      # "sqlite" (um banco WAL comprimido) ou "json" (um arquivo por página em CACHE_DIR)
+CACHE_SQLITE_FILE = "cache_api.sqlite3"
+CACHE_MAX_BYTES = 5 * 1024**3  # Limite do banco SQLite; saem as expiradas e depois as menos acessadas (LRU)
+# TTL por idade do fim da janela: (dias, segundos). Janela terminando há < 2 dias expira em 30 min,
+# < 7 dias em 6 h, < 30 dias em 1 dia; dias mais antigos (fechados) não expiram. [] = nunca expira
+CACHE_TTL_REGRAS = [(2, 30 * 60), (7, 6 * 3600), (30, 24 * 3600)]
+CACHE_LOTE_ESCRITA = 50        # Páginas por transação no SQLite / por lote do escritor
+CACHE_ESCRITA_ASSINCRONA = True  # Thread dedicada grava o cache; workers só enfileiram
+CACHE_FILA_ESCRITA = 500       # Páginas aguardando gravação (fila cheia = página não vai para o cache)
+CACHE_COMPRESSAO = "zstd"      # "zstd" (cai para zlib sem o pacote zstandard), "zlib" ou "nenhum"
+CACHE_ZSTD_NIVEL = 3
+CACHE_ZSTD_DICIONARIO = "cache_api.zdict"  # Usado se existir (python cache_paginas.py treinar ...)
+CACHE_MEMORIA_MAX_BYTES = 256 * 1024**2    # LRU em memória na frente do disco (0 = desativado)
+CACHE_VERSAO_ESQUEMA = 2      # Entra na chave do cache; incrementar invalida todas as páginas antigas
+CACHE_DEDUP_ITENS = True       # SQLite: cada item guardado uma vez, páginas viram listas de chaves
+SINGLE_FLIGHT_ENABLED = True   # Chamadas simultâneas da mesma página compartilham uma única requisição
+
+# Modo offline (--offline): refaz filtros/extração só com o cache, sem nenhuma chamada à API
+MODO_OFFLINE = False
+OFFLINE_PROCESSOS = None       # Processos do pool de filtragem (None = número de CPUs)
+OFFLINE_LOTE_PAGINAS = 20      # Páginas enviadas a um processo por vez
+
+# Modo incremental (--incremental): busca só os dias após a marca d'água de cada tribunal
+INCREMENTAL_ENABLED = False
+INCREMENTAL_LOOKBACK_DIAS = 2  # Dias já coletados que são buscados de novo (publicações tardias)
+INCREMENTAL_FIM = None         # Último dia da janela incremental (None = hoje)
+CACHE_REVALIDAR_ATE = {}       # Preenchido pelo --incremental: {sigla: marca}; janelas que começam até a marca ignoram o cache
 
 # Log
 LOG_BATCH_SIZE = 50  # Escreve logs a cada 50 entradas
 LOG_ENABLED = True
 
+# Journal de checkpoint (--resume retoma de onde a execução parou)
+JOURNAL_ENABLED = True
+JOURNAL_FSYNC_LOTE = 50  # fsync a cada 50 unidades concluídas
+
 # ===== SISTEMAS DE CONTROLE =====
 
 # Sessão por thread (thread-local) com HTTPAdapter
@@ -92,7 +186,10 @@ def criar_sessao_thread_local():
     s = getattr(_thread_local, "session", None)
     if s is None:
         s = requests.Session()
-        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+        # Só erros de conexão são repetidos pelo urllib3. 429/5xx chegam ao fetch_page, que os manda
+        # para a fila de retry (sem status_forcelist: a thread não dorme no backoff do urllib3) e
+        # respect_retry_after_header=False: o 429 com Retry-After vira pausa do bucket do tribunal
+        retries = Retry(total=2, backoff_factor=0.5, raise_on_status=False, respect_retry_after_header=False)
         adapter = HTTPAdapter(max_retries=retries, pool_maxsize=20)
         s.mount("https://", adapter)
         s.mount("http://", adapter)
@@ -103,57 +200,178 @@ def criar_sessao_thread_local():
 # Buffer de logs (thread-safe)
 log_buffer = deque()
 log_lock = threading.Lock()
+log_lock_arquivo = threading.Lock()  # Mantém a ordem dos lotes no arquivo; a escrita não segura log_lock
+
+rate_limiter = LimitadorHierarquico(
+    MAX_REQUESTS_PER_SECOND,
+    min_rate=1,
+    limites_filhos=LIMITES_POR_TRIBUNAL,
+    limite_filho_padrao=LIMITE_TRIBUNAL_PADRAO,
+    tribunais_429_global=TRIBUNAIS_429_GLOBAL,
+    controle_latencia=CONTROLE_LATENCIA_ENABLED,
+)
+
+disjuntores = Disjuntores(
+    janela_s=DISJUNTOR_JANELA_S,
+    min_amostras=DISJUNTOR_MIN_AMOSTRAS,
+    limiar_erros=DISJUNTOR_LIMIAR_ERROS,
+    falhas_seguidas=DISJUNTOR_FALHAS_SEGUIDAS,
+    tempo_aberto=DISJUNTOR_TEMPO_ABERTO,
+    tempo_aberto_max=DISJUNTOR_TEMPO_ABERTO_MAX,
+    max_aberturas=DISJUNTOR_MAX_ABERTURAS,
+)
+
+
+class VooUnico:
+    """
+    Single-flight: enquanto uma busca de uma chave está em andamento, as demais
+    chamadas com a mesma chave esperam e recebem o mesmo resultado (ou exceção)
+    em vez de repetir a requisição. Versões para threads e para asyncio.
+    """
 
-class AdaptiveRateLimiter:
-    def __init__(self, initial_rate=5, min_rate=1, max_rate=20):
-        self.rate = float(initial_rate)
-        self.min_rate = float(min_rate)
-        self.max_rate = float(max_rate)
-        self.tokens = self.rate
-        self.capacity = float(max_rate)
-        self.last_refill = time.time()
+    def __init__(self):
         self.lock = threading.Lock()
-        self.consecutive_429 = 0
-        self.last_429_time = 0.0
-
-    def _refill(self):
-        now = time.time()
-        elapsed = now - self.last_refill
-        if elapsed > 0:
-            add = elapsed * self.rate
-            self.tokens = min(self.capacity, self.tokens + add)
-            self.last_refill = now
-
-    def acquire(self):
-        while True:
-            with self.lock:
-                self._refill()
-                if self.tokens >= 1.0:
-                    self.tokens -= 1.0
-                    return
-                need = (1.0 - self.tokens) / (self.rate if self.rate > 0 else 1.0)
-            time.sleep(max(0.01, need))
-
-    def on_429(self):
+        self.em_voo = {}        # chave -> [evento, resultado, erro]
+        self.em_voo_async = {}  # chave -> asyncio.Future
+        self.coalescidas = 0
+
+    def executar(self, chave, funcao, *args):
         with self.lock:
-            self.consecutive_429 += 1
-            self.last_429_time = time.time()
-            factor = 0.6 ** self.consecutive_429
-            new_rate = max(self.min_rate, self.rate * factor)
-            self.rate = max(self.min_rate, new_rate)
-            self.capacity = max(self.rate, self.min_rate)
-            self.tokens = min(self.tokens, self.capacity)
-            print(f"\n[rate_limiter] 429 detectado: nova taxa {self.rate:.2f} req/s")
-
-    def on_success(self):
+            chamada = self.em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self.em_voo[chave] = [threading.Event(), None, None]
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            chamada[0].wait()
+            if chamada[2] is not None:
+                raise chamada[2]
+            return chamada[1]
+
+        try:
+            chamada[1] = funcao(*args)
+            return chamada[1]
+        except BaseException as e:
+            chamada[2] = e
+            raise
+        finally:
+            with self.lock:
+                del self.em_voo[chave]
+            chamada[0].set()
+
+    async def executar_async(self, chave, funcao, *args):
+        futuro = self.em_voo_async.get(chave)
+        if futuro is not None:
+            with self.lock:
+                self.coalescidas += 1
+            # shield: cancelar quem espera não cancela a busca compartilhada
+            return await asyncio.shield(futuro)
+
+        futuro = self.em_voo_async[chave] = asyncio.get_running_loop().create_future()
+        try:
+            resultado = await funcao(*args)
+            futuro.set_result(resultado)
+            return resultado
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita aviso de exceção não consumida quando ninguém esperava
+            raise
+        finally:
+            del self.em_voo_async[chave]
+
+
+voo_unico = VooUnico()
+
+
+class FilaRetry:
+    """
+    Páginas com falha temporária aguardando a próxima tentativa: heap pelo horário da tentativa.
+    Sem lock próprio: usada sob o lock do AgendadorGlobal ou pela thread que coleta as páginas
+    de um tribunal no motor "tribunais".
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0  # desempate: mesma hora, ordem de chegada
+
+    def agendar(self, item, espera):
+        self.seq += 1
+        heapq.heappush(self.heap, (time.time() + espera, self.seq, item))
+
+    def vencidas(self):
+        """Retira e retorna os itens cuja hora de tentar chegou"""
+        agora = time.time()
+        itens = []
+        while self.heap and self.heap[0][0] <= agora:
+            itens.append(heapq.heappop(self.heap)[2])
+        return itens
+
+    def segundos_para_proxima(self):
+        """Tempo até o próximo item vencer (None = fila vazia)"""
+        return max(0.0, self.heap[0][0] - time.time()) if self.heap else None
+
+    def retirar(self, filtro):
+        """Remove e retorna, sem esperar o backoff, os itens que satisfazem filtro (ex.: tribunal com prazo vencido)"""
+        saem = [entrada for entrada in self.heap if filtro(entrada[2])]
+        if saem:
+            self.heap = [entrada for entrada in self.heap if not filtro(entrada[2])]
+            heapq.heapify(self.heap)
+        return [entrada[2] for entrada in saem]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class OrcamentoRetries:
+    """Reagendamentos permitidos na execução inteira, compartilhados por todos os tribunais"""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.usados = 0
+        self.negados = 0
+        self.lock = threading.Lock()
+
+    def consumir(self):
         with self.lock:
-            if self.consecutive_429 > 0:
-                self.consecutive_429 = max(0, self.consecutive_429 - 1)
-            if time.time() - self.last_429_time > 30:
-                self.rate = min(self.max_rate, self.rate + 0.5)
-                self.capacity = max(self.capacity, self.rate)
+            if self.limite is None or self.usados < self.limite:
+                self.usados += 1
+                return True
+            if self.negados == 0:
+                print(f"\n  [⚠️] Orçamento de retries esgotado ({self.limite}): novas falhas temporárias são definitivas")
+            self.negados += 1
+            return False
+
+    def resumo(self):
+        return {"reagendados": self.usados, "orcamento": self.limite, "negados": self.negados}
 
-rate_limiter = AdaptiveRateLimiter(initial_rate=MAX_REQUESTS_PER_SECOND, min_rate=1, max_rate=MAX_REQUESTS_PER_SECOND)
+
+orcamento_retries = OrcamentoRetries(ORCAMENTO_RETRIES)
+
+
+class Prazo:
+    """
+    Deadline de um tribunal (TRIBUNAL_TIMEOUT), levado do agendador até a requisição: limita a
+    espera por token, o backoff dos retries e o timeout HTTP. Vencido, nada novo começa e o
+    trabalho pendente do tribunal é cancelado e registrado como não feito.
+    """
+
+    def __init__(self, segundos):
+        self.fim = time.monotonic() + segundos
+
+    def restante(self):
+        return max(0.0, self.fim - time.monotonic())
+
+    def expirou(self):
+        return time.monotonic() >= self.fim
+
+    def limitar(self, segundos):
+        """Timeout ou espera cortado no que resta do prazo (requests/aiohttp não aceitam timeout 0)"""
+        return min(segundos, max(0.01, self.restante()))
 
 
 # ===== FUNÇÕES AUXILIARES =====
@@ -167,46 +385,97 @@ def calcular_total_paginas(total_itens, itens_por_pagina):
     return math.ceil(total_itens / itens_por_pagina)
 
 
-def gerar_cache_key(sigla_tribunal, pagina):
-    """Gera chave única para cache baseada nos parâmetros"""
-    params_str = f"{sigla_tribunal}_{pagina}_{ITEMS_POR_PAGINA}_{SEARCH_PARAMS['dataDisponibilizacaoInicio']}_{SEARCH_PARAMS['dataDisponibilizacaoFim']}"
-    return hashlib.md5(params_str.encode()).hexdigest()
+def gerar_cache_key(sigla_tribunal, pagina, itens_por_pagina=ITEMS_POR_PAGINA, janela=None):
+    """
+    Gera chave única para cache: hash da codificação canônica da URL base, de todos os
+    parâmetros da requisição (como vão na query string) e da versão do esquema do cache
+    """
+    params, _ = montar_requisicao(sigla_tribunal, pagina, itens_por_pagina, janela)
+    canonico = json.dumps(
+        {"versao": CACHE_VERSAO_ESQUEMA, "url": API_BASE_URL, "params": {k: str(v) for k, v in params.items()}},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+_cache_backend = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache_backend():
+    """Cria o backend de cache na primeira utilização"""
+    global _cache_backend
+    with _cache_lock:
+        if _cache_backend is None:
+            codec = carregar_codec(CACHE_COMPRESSAO, CACHE_ZSTD_NIVEL, CACHE_ZSTD_DICIONARIO)
+            _cache_backend = criar_backend(CACHE_BACKEND, CACHE_DIR, CACHE_SQLITE_FILE,
+                                           max_bytes=CACHE_MAX_BYTES, lote=CACHE_LOTE_ESCRITA, codec=codec,
+                                           dedup_itens=CACHE_DEDUP_ITENS, regras_ttl=CACHE_TTL_REGRAS,
+                                           ignorar_expiracao=MODO_OFFLINE)
+            if CACHE_ESCRITA_ASSINCRONA:
+                _cache_backend = EscritorCache(_cache_backend, max_fila=CACHE_FILA_ESCRITA, lote=CACHE_LOTE_ESCRITA)
+            if CACHE_MEMORIA_MAX_BYTES:
+                _cache_backend = CacheMemoriaLRU(_cache_backend, CACHE_MEMORIA_MAX_BYTES)
+        return _cache_backend
+
+
+def fechar_cache():
+    """Confirma as gravações pendentes do backend; devolve os contadores do escritor (se houver)"""
+    global _cache_backend
+    with _cache_lock:
+        if _cache_backend is None:
+            return None
+        _cache_backend.fechar()
+        escritor = camada_cache(_cache_backend, EscritorCache)
+        _cache_backend = None
+    return escritor.estatisticas() if escritor is not None else None
+
+
+def estatisticas_cache(tipo):
+    """Contadores de uma camada do cache (None se desativada ou o cache não foi usado)"""
+    with _cache_lock:
+        camada = camada_cache(_cache_backend, tipo)
+        return camada.estatisticas() if camada is not None else None
 
 
-def ler_cache(cache_key):
+def usa_dicionario_zstd():
+    return CACHE_COMPRESSAO == "zstd" and bool(CACHE_ZSTD_DICIONARIO) and Path(CACHE_ZSTD_DICIONARIO).is_file()
+
+
+def descricao_compressao():
+    """Compressão efetivamente usada pelo cache (ex.: "zstd+dicionario")"""
+    tipo = obter_cache_backend().codec.tipo
+    return f"{tipo}+dicionario" if tipo == "zstd" and usa_dicionario_zstd() else tipo
+
+
+def cache_desatualizado(sigla_tribunal, janela):
+    """Janela que alcança os dias do look-back incremental do tribunal (já coletados e buscados de novo)"""
+    marca = CACHE_REVALIDAR_ATE.get(sigla_tribunal)
+    return marca is not None and (janela or janela_padrao())["dataDisponibilizacaoInicio"] <= marca
+
+
+def ler_cache(cache_key, sigla_tribunal=None, janela=None):
     """Lê dados do cache se existir"""
-    if not CACHE_ENABLED:
+    if not CACHE_ENABLED or not CACHE_LEITURA_ENABLED or cache_desatualizado(sigla_tribunal, janela):
         return None
-    
-    cache_file = Path(CACHE_DIR) / f"{cache_key}.json"
-    if cache_file.exists():
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return None
-    return None
+    return obter_cache_backend().ler(cache_key)
 
 
-def salvar_cache(cache_key, data):
+def salvar_cache(cache_key, data, params=None):
     """Salva dados no cache"""
     if not CACHE_ENABLED:
         return
-    
-    Path(CACHE_DIR).mkdir(exist_ok=True)
-    cache_file = Path(CACHE_DIR) / f"{cache_key}.json"
-    try:
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False)
-    except:
-        pass
-
+    obter_cache_backend().gravar(cache_key, data, params)
 
 
-def log_request_batch(sigla_tribunal, pagina, url, params, response_data=None, error=None, tempo_resposta_ms=None, status_code=None):
-    """Adiciona log ao buffer (será escrito em batch)"""
+def log_request_batch(sigla_tribunal, pagina, url, params, response_data=None, error=None, tempo_resposta_ms=None, status_code=None,
+                      descarregar=True):
+    """
+    Adiciona log ao buffer (será escrito em batch). Com descarregar=False não escreve o lote
+    cheio: retorna True para o chamador escrevê-lo onde não bloqueie (motor async)
+    """
     if not LOG_ENABLED:
-        return
+        return False
     
     log_entry = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -226,25 +495,35 @@ def log_request_batch(sigla_tribunal, pagina, url, params, response_data=None, e
     
     with log_lock:
         log_buffer.append(log_entry)
-        
-        # Flush se atingiu o tamanho do batch
-        if len(log_buffer) >= LOG_BATCH_SIZE:
-            flush_logs()
+        cheio = len(log_buffer) >= LOG_BATCH_SIZE
+    
+    # Flush se atingiu o tamanho do batch
+    if cheio and descarregar:
+        flush_logs()
+    return cheio
+
+
+async def log_request_async(*args, **kwargs):
+    """log_request_batch para o motor async: o lote cheio é escrito numa thread, fora do event loop"""
+    if log_request_batch(*args, descarregar=False, **kwargs):
+        await asyncio.to_thread(flush_logs)
 
 
 def flush_logs():
-    """Escreve todos os logs pendentes no arquivo"""
+    """Escreve todos os logs pendentes no arquivo (o buffer é liberado antes da escrita)"""
     if not LOG_ENABLED:
         return
     
-    with log_lock:
-        if not log_buffer:
-            return
+    with log_lock_arquivo:
+        with log_lock:
+            if not log_buffer:
+                return
+            entradas = list(log_buffer)
+            log_buffer.clear()
         
         try:
             with open(LOG_FILE, "a", encoding="utf-8") as f:
-                while log_buffer:
-                    entry = log_buffer.popleft()
+                for entry in entradas:
                     f.write(json.dumps(entry, ensure_ascii=False) + "\n")
         except Exception as e:
             print(f"[!] Erro ao escrever logs: {e}")
@@ -275,100 +554,298 @@ def resolver_tribunais():
 
 # ===== FUNÇÕES DE SCRAPING =====
 
-def fetch_page(sigla_tribunal, pagina=1):
-    """"""
-    cache_key = gerar_cache_key(sigla_tribunal, pagina)
-    
-    # Tenta ler do cache primeiro
-    cached_data = ler_cache(cache_key)
-    if cached_data:
-        return cached_data
-    
+def montar_requisicao(sigla_tribunal, pagina, itens_por_pagina=ITEMS_POR_PAGINA, janela=None):
+    """Monta parâmetros e URL de uma página (compartilhado pelos motores threads/async)"""
     params = {
         "pagina": pagina,
-        "itensPorPagina": ITEMS_POR_PAGINA,
+        "itensPorPagina": itens_por_pagina,
         "siglaTribunal": sigla_tribunal,
-        **SEARCH_PARAMS
+        **SEARCH_PARAMS,
+        **(janela or {})
     }
+    return params, f"{API_BASE_URL}?{urlencode(params)}"
+
+
+def ler_retry_after(headers):
+    """Lê o header Retry-After (em segundos), se presente e válido"""
+    if "Retry-After" not in headers:
+        return None
+    try:
+        return float(headers.get("Retry-After"))
+    except Exception:
+        return None
+
+
+def tempo_espera_retry(attempt, jitter_min, jitter_max):
+    """Backoff exponencial com jitter"""
+    return (2 ** attempt) + random.uniform(jitter_min, jitter_max)
+
+
+def espera_429(sigla_tribunal, pagina, attempt, retry_after):
+    """
+    Registra o 429 no rate limiter e calcula quanto aguardar. Com rate limiting a espera vira
+    uma pausa do bucket do tribunal (todos os workers dele respeitam, com retomada gradual)
+    e a thread não dorme por conta própria: retorna 0 e o próximo acquire aguarda a pausa.
+    """
+    rate_limiter.on_429(sigla_tribunal)
+    if DISJUNTOR_ENABLED:
+        disjuntores.liberar_sonda(sigla_tribunal)
+    if retry_after and retry_after > 0:
+        wait_time = retry_after + random.uniform(0.1, 0.5)
+        motivo = f"HTTP 429 com Retry-After {retry_after}s"
+    else:
+        wait_time = tempo_espera_retry(attempt, 0.2, 0.8)
+        motivo = f"HTTP 429 (tentativa {attempt+1}/{MAX_RETRIES})"
+    if RATE_LIMIT_ENABLED:
+        rate_limiter.pausar(sigla_tribunal, wait_time)
+        print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: {motivo} -> {sigla_tribunal} pausado por {wait_time:.2f}s")
+        return 0
+    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: {motivo} -> aguardando {wait_time:.2f}s")
+    return wait_time
+
+
+def registrar_falha(sigla_tribunal):
+    """5xx, timeout ou erro de rede: sinal para o rate limiter e para o circuit breaker"""
+    rate_limiter.on_erro(sigla_tribunal)
+    if DISJUNTOR_ENABLED:
+        disjuntores.registrar(sigla_tribunal, False)
+
+
+def registrar_sucesso(sigla_tribunal, tempo_resposta):
+    rate_limiter.on_success(sigla_tribunal, tempo_resposta)
+    if DISJUNTOR_ENABLED:
+        disjuntores.registrar(sigla_tribunal, True)
+
+
+def verificar_circuito(sigla_tribunal):
+    """Antes de cada tentativa: com o circuito aberto a página volta para a fila de espera"""
+    if DISJUNTOR_ENABLED and not disjuntores.permitir(sigla_tribunal):
+        raise CircuitoAberto(sigla_tribunal)
+
+
+ERRO_PRAZO = "Prazo do tribunal esgotado (TRIBUNAL_TIMEOUT)"
+ERRO_INDISPONIVEL = "Circuito aberto: tribunal indisponível"
+
+
+class PrazoEsgotado(Exception):
+    """O prazo do tribunal venceu antes da página: não vale a pena (nem dá tempo de) tentar"""
+
+    def __init__(self):
+        super().__init__(ERRO_PRAZO)
+
+
+def verificar_prazo(prazo):
+    if prazo is not None and prazo.expirou():
+        raise PrazoEsgotado()
+
+
+class FalhaTemporaria(Exception):
+    """Tentativa com 429/5xx/timeout/erro de rede: a página pode ser tentada de novo depois de `espera` segundos"""
+
+    def __init__(self, motivo, espera):
+        super().__init__(motivo)
+        self.espera = espera
+
+
+class FalhaDefinitiva(Exception):
+    """Página sem dados: tentativas esgotadas (com o motivo da última) ou erro inesperado"""
+
+
+def erro_tentativas_esgotadas(falha):
+    """Erro registrado quando a última tentativa também falhou: leva o motivo real (HTTP 503, Timeout...)"""
+    return f"Falha definitiva após {MAX_RETRIES} tentativas: {falha}"
+
+
+def espera_5xx(sigla_tribunal, pagina, attempt, status_code):
+    registrar_falha(sigla_tribunal)
+    wait_time = tempo_espera_retry(attempt, 0.1, 0.5)
+    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: HTTP {status_code} - Aguardando {wait_time:.2f}s")
+    return wait_time
+
+
+def espera_timeout(sigla_tribunal, pagina, attempt):
+    registrar_falha(sigla_tribunal)
+    wait_time = tempo_espera_retry(attempt, 0.1, 0.6)
+    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: Timeout - aguardando {wait_time:.1f}s (tentativa {attempt+1}/{MAX_RETRIES})")
+    return wait_time
+
+
+def espera_erro_rede(sigla_tribunal, pagina, attempt, erro):
+    registrar_falha(sigla_tribunal)
+    wait_time = tempo_espera_retry(attempt, 0.1, 0.6)
+    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: RequestException {str(erro)[:70]} - aguardando {wait_time:.1f}s")
+    return wait_time
+
+
+def fetch_page(sigla_tribunal, pagina=1, itens_por_pagina=ITEMS_POR_PAGINA, janela=None, tentativa=None, prazo=None):
+    """
+    Busca uma página da API (cache, rate limiting e retry com backoff), com single-flight por chave.
+    tentativa=None: repete na própria thread até MAX_RETRIES. Com o número da tentativa (0, 1, ...):
+    uma única requisição, e uma falha temporária levanta FalhaTemporaria para o chamador reagendar.
+    Sem dados depois da última tentativa (ou com erro inesperado), levanta FalhaDefinitiva com o motivo.
+    Com prazo (Prazo do tribunal), levanta PrazoEsgotado em vez de começar algo que passaria dele.
+    """
+    cache_key = gerar_cache_key(sigla_tribunal, pagina, itens_por_pagina, janela)
+    if not SINGLE_FLIGHT_ENABLED:
+        return _buscar_pagina(cache_key, sigla_tribunal, pagina, itens_por_pagina, janela, tentativa, prazo)
+    return voo_unico.executar(cache_key, _buscar_pagina, cache_key, sigla_tribunal, pagina, itens_por_pagina, janela, tentativa, prazo)
+
+
+def _buscar_pagina(cache_key, sigla_tribunal, pagina, itens_por_pagina, janela, tentativa, prazo):
+    # Tenta ler do cache primeiro
+    cached_data = ler_cache(cache_key, sigla_tribunal, janela)
+    if cached_data or MODO_OFFLINE:
+        return cached_data
     
-    url = f"{API_BASE_URL}?{urlencode(params)}"
+    params, url = montar_requisicao(sigla_tribunal, pagina, itens_por_pagina, janela)
+    tentativas = range(MAX_RETRIES) if tentativa is None else [tentativa]
     
-    for attempt in range(MAX_RETRIES):
+    for attempt in tentativas:
         try:
-            if RATE_LIMIT_ENABLED:
-                rate_limiter.acquire()
-            session_local = criar_sessao_thread_local()
-            inicio_req = time.time()
-            resp = session_local.get(url, timeout=REQUEST_TIMEOUT)
-            tempo_resposta = time.time() - inicio_req
-
-            if resp.status_code == 429:
-                retry_after = None
-                if "Retry-After" in resp.headers:
-                    try:
-                        retry_after = float(resp.headers.get("Retry-After"))
-                    except Exception:
-                        retry_after = None
-                rate_limiter.on_429()
-                if retry_after and retry_after > 0:
-                    wait_time = retry_after + random.uniform(0.1, 0.5)
-                    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: HTTP 429 com Retry-After {retry_after}s -> aguardando {wait_time:.2f}s")
-                    time.sleep(wait_time)
-                else:
-                    base = (2 ** attempt)
-                    jitter = random.uniform(0.2, 0.8)
-                    wait_time = base + jitter
-                    print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: HTTP 429 - Aguardando {wait_time:.2f}s (tentativa {attempt+1}/{MAX_RETRIES})")
-                    time.sleep(wait_time)
-                continue
+            return _tentar_pagina(cache_key, sigla_tribunal, pagina, params, url, attempt, prazo)
+        except FalhaTemporaria as e:
+            if attempt + 1 >= MAX_RETRIES:
+                erro = erro_tentativas_esgotadas(e)
+                log_request_batch(sigla_tribunal, pagina, url, params, error=erro)
+                raise FalhaDefinitiva(erro)
+            if tentativa is not None:
+                raise
+            if prazo is not None and e.espera >= prazo.restante():
+                raise PrazoEsgotado()
+            time.sleep(e.espera)
+
+
+def _tentar_pagina(cache_key, sigla_tribunal, pagina, params, url, attempt, prazo=None):
+    """Uma requisição: retorna os dados ou levanta FalhaTemporaria/FalhaDefinitiva/CircuitoAberto/PrazoEsgotado"""
+    verificar_prazo(prazo)
+    verificar_circuito(sigla_tribunal)
+    try:
+        if RATE_LIMIT_ENABLED and not rate_limiter.acquire(sigla_tribunal, prazo.restante() if prazo else None):
+            raise PrazoEsgotado()
+        session_local = criar_sessao_thread_local()
+        inicio_req = time.time()
+        resp = session_local.get(url, timeout=prazo.limitar(REQUEST_TIMEOUT) if prazo else REQUEST_TIMEOUT)
+        tempo_resposta = time.time() - inicio_req
+
+        if resp.status_code == 429:
+            raise FalhaTemporaria("HTTP 429", espera_429(sigla_tribunal, pagina, attempt, ler_retry_after(resp.headers)))
+
+        if resp.status_code in (502, 503, 504):
+            raise FalhaTemporaria(f"HTTP {resp.status_code}", espera_5xx(sigla_tribunal, pagina, attempt, resp.status_code))
+
+        resp.raise_for_status()
+        data = resp.json()
+        registrar_sucesso(sigla_tribunal, tempo_resposta)
+
+        salvar_cache(cache_key, data, params)
+        log_request_batch(
+            sigla_tribunal,
+            pagina,
+            url,
+            params,
+            response_data=data,
+            tempo_resposta_ms=round(tempo_resposta * 1000, 2),
+            status_code=resp.status_code,
+        )
+        return data
 
-            if resp.status_code in (502, 503, 504):
-                base = (2 ** attempt)
-                jitter = random.uniform(0.1, 0.5)
-                wait_time = base + jitter
-                print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: HTTP {resp.status_code} - Aguardando {wait_time:.2f}s")
-                time.sleep(wait_time)
-                continue
+    except (FalhaTemporaria, FalhaDefinitiva, PrazoEsgotado):
+        raise
+
+    except requests.exceptions.Timeout:
+        verificar_prazo(prazo)  # timeout cortado pelo prazo não é falha do tribunal
+        raise FalhaTemporaria("Timeout", espera_timeout(sigla_tribunal, pagina, attempt))
+
+    except requests.exceptions.RequestException as e:
+        raise FalhaTemporaria(f"Erro de rede: {str(e)[:70]}", espera_erro_rede(sigla_tribunal, pagina, attempt, e))
+
+    except Exception as e:
+        log_request_batch(sigla_tribunal, pagina, url, params, error=f"Erro inesperado: {str(e)}")
+        print(f"\n  [❌] {sigla_tribunal} - Página {pagina}: Erro inesperado: {e}")
+        raise FalhaDefinitiva(f"Erro inesperado: {str(e)[:200]}")
+
+
+async def fetch_page_async(session, sigla_tribunal, pagina=1, janela=None, tentativa=None, prazo=None):
+    """Versão asyncio de fetch_page: mesmo cache, single-flight, tratamento de 429/5xx, retry, prazo e log"""
+    cache_key = gerar_cache_key(sigla_tribunal, pagina, janela=janela)
+    if not SINGLE_FLIGHT_ENABLED:
+        return await _buscar_pagina_async(session, cache_key, sigla_tribunal, pagina, janela, tentativa, prazo)
+    return await voo_unico.executar_async(cache_key, _buscar_pagina_async, session, cache_key, sigla_tribunal, pagina, janela, tentativa, prazo)
+
+
+async def _buscar_pagina_async(session, cache_key, sigla_tribunal, pagina, janela, tentativa, prazo):
+    cached_data = await asyncio.to_thread(ler_cache, cache_key, sigla_tribunal, janela)
+    if cached_data:
+        return cached_data
+    
+    params, url = montar_requisicao(sigla_tribunal, pagina, janela=janela)
+    tentativas = range(MAX_RETRIES) if tentativa is None else [tentativa]
+    
+    for attempt in tentativas:
+        try:
+            return await _tentar_pagina_async(session, cache_key, sigla_tribunal, pagina, params, url, attempt, prazo)
+        except FalhaTemporaria as e:
+            if attempt + 1 >= MAX_RETRIES:
+                erro = erro_tentativas_esgotadas(e)
+                await log_request_async(sigla_tribunal, pagina, url, params, error=erro)
+                raise FalhaDefinitiva(erro)
+            if tentativa is not None:
+                raise
+            if prazo is not None and e.espera >= prazo.restante():
+                raise PrazoEsgotado()
+            await asyncio.sleep(e.espera)
+
+
+async def _tentar_pagina_async(session, cache_key, sigla_tribunal, pagina, params, url, attempt, prazo=None):
+    verificar_prazo(prazo)
+    verificar_circuito(sigla_tribunal)
+    try:
+        if RATE_LIMIT_ENABLED and not await rate_limiter.acquire_async(sigla_tribunal, prazo.restante() if prazo else None):
+            raise PrazoEsgotado()
+        inicio_req = time.time()
+        timeout = aiohttp.ClientTimeout(total=prazo.limitar(REQUEST_TIMEOUT) if prazo else REQUEST_TIMEOUT)
+        async with session.get(url, timeout=timeout) as resp:
+            if resp.status == 429:
+                raise FalhaTemporaria("HTTP 429", espera_429(sigla_tribunal, pagina, attempt, ler_retry_after(resp.headers)))
+
+            if resp.status in (502, 503, 504):
+                raise FalhaTemporaria(f"HTTP {resp.status}", espera_5xx(sigla_tribunal, pagina, attempt, resp.status))
 
             resp.raise_for_status()
-            data = resp.json()
-            rate_limiter.on_success()
-
-            salvar_cache(cache_key, data)
-            log_request_batch(
-                sigla_tribunal,
-                pagina,
-                url,
-                params,
-                response_data=data,
-                tempo_resposta_ms=round(tempo_resposta * 1000, 2),
-                status_code=resp.status_code,
-            )
-            return data
-
-        except requests.exceptions.Timeout:
-            base = (2 ** attempt)
-            jitter = random.uniform(0.1, 0.6)
-            wait_time = base + jitter
-            print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: Timeout - aguardando {wait_time:.1f}s (tentativa {attempt+1}/{MAX_RETRIES})")
-            time.sleep(wait_time)
-            continue
+            data = await resp.json(content_type=None)
+            status_code = resp.status
+        tempo_resposta = time.time() - inicio_req
+        registrar_sucesso(sigla_tribunal, tempo_resposta)
+
+        if CACHE_ESCRITA_ASSINCRONA:
+            salvar_cache(cache_key, data, params)  # só enfileira
+        else:
+            await asyncio.to_thread(salvar_cache, cache_key, data, params)
+        await log_request_async(
+            sigla_tribunal,
+            pagina,
+            url,
+            params,
+            response_data=data,
+            tempo_resposta_ms=round(tempo_resposta * 1000, 2),
+            status_code=status_code,
+        )
+        return data
 
-        except requests.exceptions.RequestException as e:
-            base = (2 ** attempt)
-            jitter = random.uniform(0.1, 0.6)
-            wait_time = base + jitter
-            print(f"\n  [⚠️] {sigla_tribunal} - Página {pagina}: RequestException {str(e)[:70]} - aguardando {wait_time:.1f}s")
-            time.sleep(wait_time)
-            continue
+    except (FalhaTemporaria, FalhaDefinitiva, PrazoEsgotado):
+        raise
 
-        except Exception as e:
-            log_request_batch(sigla_tribunal, pagina, url, params, error=f"Erro inesperado: {str(e)}")
-            print(f"\n  [❌] {sigla_tribunal} - Página {pagina}: Erro inesperado: {e}")
-            return None
+    except asyncio.TimeoutError:
+        verificar_prazo(prazo)
+        raise FalhaTemporaria("Timeout", espera_timeout(sigla_tribunal, pagina, attempt))
+
+    except aiohttp.ClientError as e:
+        raise FalhaTemporaria(f"Erro de rede: {str(e)[:70]}", espera_erro_rede(sigla_tribunal, pagina, attempt, e))
 
-    log_request_batch(sigla_tribunal, pagina, url, params, error="Falha definitiva após retries")
-    return None
+    except Exception as e:
+        await log_request_async(sigla_tribunal, pagina, url, params, error=f"Erro inesperado: {str(e)}")
+        print(f"\n  [❌] {sigla_tribunal} - Página {pagina}: Erro inesperado: {e}")
+        raise FalhaDefinitiva(f"Erro inesperado: {str(e)[:200]}")
 
 
 def filtrar_item(item):
@@ -419,33 +896,139 @@ def extrair_dados_relevantes(item):
     }
 
 
-def processar_pagina(sigla_tribunal, pagina):
+def processar_pagina(sigla_tribunal, pagina, janela=None, tentativa=None, prazo=None):
     """Processa uma página individual (usado no paralelismo)"""
     try:
-        data = fetch_page(sigla_tribunal, pagina)
-        
-        if not data or data.get("status") != "success":
-            return {"pagina": pagina, "resultados": [], "erro": "Dados inválidos ou status não success"}
-        
-        items = data.get("items", [])
-        resultados = []
-        
-        for item in items:
-            if filtrar_item(item):
-                dados = extrair_dados_relevantes(item)
-                resultados.append(dados)
+        data = fetch_page(sigla_tribunal, pagina, janela=janela, tentativa=tentativa, prazo=prazo)
         
-        return {"pagina": pagina, "resultados": resultados, "erro": None}
+        return resultado_da_pagina(pagina, data)
+    
+    except CircuitoAberto as e:
+        return resultado_adiado(pagina, e)
+    
+    except FalhaTemporaria as e:
+        return resultado_reagendar(pagina, e)
+    
+    except FalhaDefinitiva as e:
+        return resultado_falha(pagina, e)
+    
+    except PrazoEsgotado:
+        return resultado_prazo_esgotado(pagina)
     
     except Exception as e:
         print(f"\n  [❌] Erro ao processar página {pagina}: {str(e)}")
         return {"pagina": pagina, "resultados": [], "erro": str(e)}
 
 
-def scrape_tribunal_api_paralelo(tribunal):
+async def processar_pagina_async(session, sigla_tribunal, pagina, janela=None, tentativa=None, prazo=None):
+    """Versão asyncio de processar_pagina"""
+    try:
+        data = await fetch_page_async(session, sigla_tribunal, pagina, janela, tentativa, prazo)
+        return resultado_da_pagina(pagina, data)
+    
+    except CircuitoAberto as e:
+        return resultado_adiado(pagina, e)
+    
+    except FalhaTemporaria as e:
+        return resultado_reagendar(pagina, e)
+    
+    except FalhaDefinitiva as e:
+        return resultado_falha(pagina, e)
+    
+    except PrazoEsgotado:
+        return resultado_prazo_esgotado(pagina)
+    
+    except Exception as e:
+        print(f"\n  [❌] Erro ao processar página {pagina}: {str(e)}")
+        return {"pagina": pagina, "resultados": [], "erro": str(e)}
+
+
+def resultado_adiado(pagina, erro):
+    """Página recusada pelo circuit breaker: o agendador a guarda na lista de espera do tribunal"""
+    return {"pagina": pagina, "resultados": [], "erro": str(erro), "count": 0, "adiada": True}
+
+
+def resultado_reagendar(pagina, falha):
+    """Falha temporária numa tentativa única: quem chamou decide se a página volta para a fila de retry"""
+    return {"pagina": pagina, "resultados": [], "erro": str(falha), "count": 0, "reagendar": falha.espera}
+
+
+def resultado_falha(pagina, falha):
+    """Página sem dados: o erro é o motivo real da falha (ex.: último HTTP 503 ou timeout)"""
+    return {"pagina": pagina, "resultados": [], "erro": str(falha), "count": 0}
+
+
+def resultado_prazo_esgotado(pagina):
+    """Página não feita porque o prazo do tribunal venceu (entra nos erros e no arquivo de falhas)"""
+    return {"pagina": pagina, "resultados": [], "erro": ERRO_PRAZO, "count": 0}
+
+
+def resultado_sem_retry(resultado):
+    """Falha temporária que não pode ser reagendada (orçamento esgotado) vira erro definitivo"""
+    return {**resultado, "erro": f"Orçamento de retries esgotado ({resultado['erro']})", "reagendar": None}
+
+
+ERRO_PAGINA_INVALIDA = "Dados inválidos ou status não success"
+
+
+def resultado_da_pagina(pagina, data):
+    """Aplica filtros e extração aos itens de uma página já baixada"""
+    if not data or data.get("status") != "success":
+        return {"pagina": pagina, "resultados": [], "erro": ERRO_PAGINA_INVALIDA, "count": 0}
+    
+    items = data.get("items", [])
+    resultados = []
+    for item in items:
+        if filtrar_item(item):
+            resultados.append(extrair_dados_relevantes(item))
+    
+    ids = [item["id"] for item in items if isinstance(item.get("id"), int)]
+    datas = [item["datadisponibilizacao"] for item in items if item.get("datadisponibilizacao")]
+    return {
+        "pagina": pagina,
+        "resultados": resultados,
+        "erro": None,
+        "count": data.get("count", 0),
+        "max_id": max(ids) if ids else None,
+        "max_data": max(datas) if datas else None,
+    }
+
+
+def imprimir_estatisticas_tribunal(sigla, total_paginas, paginas_processadas, erros_paginas, count_total, registros_coletados, tempo_total):
+    """Imprime o resumo de um tribunal concluído"""
+    print(f"\n\n{'='*80}")
+    print(f"[✅] {sigla} CONCLUÍDO")
+    print(f"{'='*80}")
+    print(f"  📊 ESTATÍSTICAS:")
+    print(f"      - Páginas processadas: {paginas_processadas:,}/{total_paginas:,}")
+    print(f"      - Páginas com erro: {len(erros_paginas):,}")
+    print(f"      - Taxa de sucesso: {(paginas_processadas/total_paginas*100 if total_paginas > 0 else 0):.1f}%")
+    print(f"      - Itens totais disponíveis: {count_total:,}")
+    print(f"      - Itens filtrados coletados: {registros_coletados:,}")
+    print(f"      - Taxa de filtro: {(registros_coletados/count_total*100 if count_total > 0 else 0):.1f}%")
+    print(f"      - Tempo total: {tempo_total:.1f}s ({tempo_total/60:.1f} min)")
+    pausado = rate_limiter.tempo_pausado(sigla) if RATE_LIMIT_ENABLED else 0
+    if pausado:
+        print(f"      - Em pausa por 429/Retry-After: {pausado:.1f}s | buscando: {max(0.0, tempo_total - pausado):.1f}s")
+    if tempo_total > 0:
+        print(f"      - Velocidade: {paginas_processadas/tempo_total:.1f} páginas/s")
+    print(f"{'='*80}")
+    
+    if erros_paginas:
+        print(f"\n  [⚠️] ERROS ENCONTRADOS ({len(erros_paginas)} páginas):")
+        for erro in erros_paginas[:10]:  # Mostra até 10 erros
+            shard = f" ({erro['inicio']} a {erro['fim']})" if erro.get("inicio") else ""
+            print(f"      - Página {erro['pagina']}{shard}: {erro['erro'][:80]}")
+        if len(erros_paginas) > 10:
+            print(f"      ... e mais {len(erros_paginas) - 10} erros")
+    print(f"{'='*80}\n")
+
+
+def scrape_tribunal_api_paralelo(tribunal, ao_registros):
     """
     Versão OTIMIZADA com paralelismo de páginas
-    Busca múltiplas páginas simultaneamente
+    Busca múltiplas páginas simultaneamente; os registros de cada página vão para
+    ao_registros(sigla, registros) assim que ela é consumida (nada se acumula aqui)
     """
     sigla = tribunal["sigla"]
     nome = tribunal["nome"]
@@ -455,14 +1038,20 @@ def scrape_tribunal_api_paralelo(tribunal):
     print(f"{'='*80}\n")
     
     tempo_inicio = time.time()
+    prazo = Prazo(TRIBUNAL_TIMEOUT)
     
     # Primeira requisição para descobrir total de páginas
     print(f"  [📊] Descobrindo total de páginas...")
-    data_primeira = fetch_page(sigla, 1)
+    motivo = ERRO_PAGINA_INVALIDA
+    try:
+        data_primeira = fetch_page(sigla, 1, prazo=prazo)
+    except (CircuitoAberto, PrazoEsgotado, FalhaDefinitiva) as e:
+        data_primeira = None
+        motivo = str(e)
     
     if not data_primeira or data_primeira.get("status") != "success":
-        print(f"  [!] Erro ao buscar primeira página")
-        return {"resultados": [], "erros": [{"pagina": 1, "erro": "Falha ao obter primeira página"}], "paginas_processadas": 0}
+        print(f"  [!] Erro ao buscar primeira página: {motivo}")
+        return {"registros": 0, "erros": [{"pagina": 1, "erro": f"Falha ao obter primeira página: {motivo}", "descoberta": True}], "paginas_processadas": 0}
     
     count_total = data_primeira.get("count", 0)
     total_paginas = calcular_total_paginas(count_total, ITEMS_POR_PAGINA)
@@ -472,106 +1061,1055 @@ def scrape_tribunal_api_paralelo(tribunal):
     print(f"  [⚡] Iniciando scraping paralelo com {MAX_WORKERS_PAGINAS} workers...\n")
     
     if total_paginas == 0:
-        return {"resultados": [], "erros": [], "paginas_processadas": 0}
+        return {"registros": 0, "erros": [], "paginas_processadas": 0}
     
     # Processa primeira página
-    resultado_primeira = processar_pagina(sigla, 1)
-    all_results = resultado_primeira["resultados"]
+    resultado_primeira = processar_pagina(sigla, 1, prazo=prazo)
+    ao_registros(sigla, resultado_primeira["resultados"])
+    registros_coletados = len(resultado_primeira["resultados"])
     erros_paginas = []
     paginas_processadas = 1
     
     if resultado_primeira["erro"]:
         erros_paginas.append({"pagina": 1, "erro": resultado_primeira["erro"]})
     
-    # Processa páginas restantes em paralelo com timeout
+    # Processa páginas restantes em paralelo dentro do prazo, com no máximo JANELA_PAGINAS_EM_VOO
+    # futures abertos: uma página nova só é submetida quando o resultado de outra foi consumido,
+    # então a memória não cresce com o total de páginas. Uma tentativa por página e as que
+    # falham voltam pela fila de retry (com prioridade sobre as novas na janela), sem prender
+    # um dos MAX_WORKERS_PAGINAS no backoff.
+    # Vencido o prazo, as páginas não iniciadas (na janela, no retry ou ainda não submetidas)
+    # são canceladas e entram nos erros (ERRO_PRAZO); as que estão em voo terminam logo, pois
+    # token e HTTP respeitam o prazo
     if total_paginas > 1:
+        janela_em_voo = JANELA_PAGINAS_EM_VOO or 2 * MAX_WORKERS_PAGINAS
         with ThreadPoolExecutor(max_workers=MAX_WORKERS_PAGINAS) as executor:
-            # Submete todas as páginas
-            futures = {
-                executor.submit(processar_pagina, sigla, pag): pag 
-                for pag in range(2, total_paginas + 1)
-            }
+            futures = {}
+            proxima_pagina = 2
+            prontas = deque()  # retries com backoff vencido aguardando vaga na janela
+            retry = FilaRetry()
+            cancelado = False
             
-            # Coleta resultados conforme completam (com timeout)
+            # Coleta resultados conforme completam
             paginas_processadas = 1
             paginas_com_erro = 0
             
-            try:
-                for future in as_completed(futures, timeout=TRIBUNAL_TIMEOUT):
-                    pagina_num = futures[future]
+            while futures or retry or prontas or proxima_pagina <= total_paginas:
+                if not cancelado and prazo.expirou():
+                    cancelado = True
+                    canceladas = [futures.pop(f)[0] for f in list(futures) if f.cancel()]
+                    canceladas += [pag for pag, _ in retry.retirar(lambda item: True)]
+                    canceladas += [pag for pag, _ in prontas] + list(range(proxima_pagina, total_paginas + 1))
+                    prontas.clear()
+                    proxima_pagina = total_paginas + 1
+                    for pag in sorted(canceladas):
+                        erros_paginas.append({"pagina": pag, "erro": ERRO_PRAZO})
+                    paginas_com_erro += len(canceladas)
+                    print(f"\n\n  [❌] PRAZO ESGOTADO: Tribunal {sigla} excedeu {TRIBUNAL_TIMEOUT}s")
+                    print(f"  [ℹ️] Páginas processadas até o prazo: {paginas_processadas}/{total_paginas} "
+                          f"| canceladas: {len(canceladas)} | em voo: {len(futures)}")
+                
+                prontas.extend(retry.vencidas())
+                while len(futures) < janela_em_voo and (prontas or proxima_pagina <= total_paginas):
+                    if prontas:
+                        pag, tentativa = prontas.popleft()
+                    else:
+                        pag, tentativa = proxima_pagina, 0
+                        proxima_pagina += 1
+                    futures[executor.submit(processar_pagina, sigla, pag, None, tentativa, prazo)] = (pag, tentativa)
+                
+                espera = prazo.restante() if not cancelado else None
+                if retry:
+                    espera = min(espera, retry.segundos_para_proxima())
+                if not futures:
+                    time.sleep(espera)
+                    continue
+                concluidos, _ = wait(futures, timeout=espera, return_when=FIRST_COMPLETED)
+                
+                for future in concluidos:
+                    pagina_num, tentativa = futures.pop(future)
                     try:
-                        resultado = future.result(timeout=10)  # Timeout individual de 10s
+                        resultado = future.result()
+                        
+                        # Circuito aberto: a página espera o fim do resfriamento na fila de retry
+                        if resultado.get("adiada") and not disjuntores.de(sigla).desistiu:
+                            espera_sonda = max(0.5, disjuntores.de(sigla).segundos_para_sonda())
+                            if espera_sonda < prazo.restante():
+                                retry.agendar((pagina_num, tentativa), espera_sonda)
+                                continue
+                            resultado = resultado_prazo_esgotado(pagina_num)
+                        if resultado.get("reagendar") is not None:
+                            if resultado["reagendar"] >= prazo.restante():
+                                resultado = resultado_prazo_esgotado(pagina_num)
+                            elif orcamento_retries.consumir():
+                                retry.agendar((pagina_num, tentativa + 1), resultado["reagendar"])
+                                continue
+                            else:
+                                resultado = resultado_sem_retry(resultado)
                         
                         if resultado["erro"]:
                             erros_paginas.append({"pagina": pagina_num, "erro": resultado["erro"]})
                             paginas_com_erro += 1
+                            if resultado["erro"] == ERRO_PRAZO:
+                                continue  # não feita
                         
-                        all_results.extend(resultado["resultados"])
+                        ao_registros(sigla, resultado["resultados"])
+                        registros_coletados += len(resultado["resultados"])
                         paginas_processadas += 1
                         
                         # Progress
                         progresso = (paginas_processadas / total_paginas) * 100
-                        print(f"  [⚡] Progresso: {paginas_processadas}/{total_paginas} páginas ({progresso:.1f}%) | Filtrados: {len(all_results):,} | Erros: {paginas_com_erro}", end="\r")
-                    
-                    except TimeoutError:
-                        print(f"\n  [⚠️] Timeout na página {pagina_num}")
-                        erros_paginas.append({"pagina": pagina_num, "erro": "Timeout"})
-                        paginas_com_erro += 1
+                        print(f"  [⚡] Progresso: {paginas_processadas}/{total_paginas} páginas ({progresso:.1f}%) | Filtrados: {registros_coletados:,} | Erros: {paginas_com_erro}", end="\r")
                     
                     except Exception as e:
                         print(f"\n  [❌] Erro ao processar resultado da página {pagina_num}: {str(e)}")
                         erros_paginas.append({"pagina": pagina_num, "erro": str(e)})
                         paginas_com_erro += 1
-            
-            except TimeoutError:
-                print(f"\n\n  [❌] TIMEOUT GLOBAL: Tribunal {sigla} excedeu {TRIBUNAL_TIMEOUT}s")
-                print(f"  [ℹ️] Páginas processadas até o timeout: {paginas_processadas}/{total_paginas}")
     
     tempo_total = time.time() - tempo_inicio
+    imprimir_estatisticas_tribunal(sigla, total_paginas, paginas_processadas, erros_paginas, count_total, registros_coletados, tempo_total)
     
-    print(f"\n\n{'='*80}")
-    print(f"[✅] {sigla} CONCLUÍDO")
-    print(f"{'='*80}")
-    print(f"  📊 ESTATÍSTICAS:")
-    print(f"      - Páginas processadas: {paginas_processadas:,}/{total_paginas:,}")
-    print(f"      - Páginas com erro: {len(erros_paginas):,}")
-    print(f"      - Taxa de sucesso: {(paginas_processadas/total_paginas*100 if total_paginas > 0 else 0):.1f}%")
-    print(f"      - Itens totais disponíveis: {count_total:,}")
-    print(f"      - Itens filtrados coletados: {len(all_results):,}")
-    print(f"      - Taxa de filtro: {(len(all_results)/count_total*100 if count_total > 0 else 0):.1f}%")
-    print(f"      - Tempo total: {tempo_total:.1f}s ({tempo_total/60:.1f} min)")
-    if tempo_total > 0:
-        print(f"      - Velocidade: {paginas_processadas/tempo_total:.1f} páginas/s")
-    print(f"{'='*80}")
-    
-    if erros_paginas:
-        print(f"\n  [⚠️] ERROS ENCONTRADOS ({len(erros_paginas)} páginas):")
-        for erro in erros_paginas[:10]:  # Mostra até 10 erros
-            print(f"      - Página {erro['pagina']}: {erro['erro'][:80]}")
-        if len(erros_paginas) > 10:
-            print(f"      ... e mais {len(erros_paginas) - 10} erros")
-    print(f"{'='*80}\n")
-    
-    return {"resultados": all_results, "erros": erros_paginas, "paginas_processadas": paginas_processadas}
+    return {"registros": registros_coletados, "erros": erros_paginas, "paginas_processadas": paginas_processadas}
 
 
-def processar_tribunal(tribunal):
+def processar_tribunal(tribunal, ao_registros):
     """Wrapper para processar tribunal (usado no paralelismo de tribunais)"""
     try:
         sigla = tribunal["sigla"]
-        resultado = scrape_tribunal_api_paralelo(tribunal)
-        return sigla, resultado["resultados"], tribunal["nome"], resultado.get("erros", []), resultado.get("paginas_processadas", 0)
+        resultado = scrape_tribunal_api_paralelo(tribunal, ao_registros)
+        return sigla, tribunal["nome"], resultado.get("erros", []), resultado.get("paginas_processadas", 0)
     except Exception as e:
         print(f"\n[❌] Erro crítico ao processar {tribunal['sigla']}: {e}")
         import traceback
         traceback.print_exc()
-        return tribunal["sigla"], [], tribunal["nome"], [{"erro": str(e)}], 0
+        return tribunal["sigla"], tribunal["nome"], [{"erro": str(e)}], 0
+
+
+# ===== PLANEJAMENTO =====
+
+def janela_busca(inicio, fim):
+    """Janela de datas no formato de SEARCH_PARAMS"""
+    return {"dataDisponibilizacaoInicio": str(inicio), "dataDisponibilizacaoFim": str(fim)}
+
+
+def janela_padrao():
+    return janela_busca(SEARCH_PARAMS["dataDisponibilizacaoInicio"], SEARCH_PARAMS["dataDisponibilizacaoFim"])
+
+
+def limites_janela(janela):
+    return date.fromisoformat(janela["dataDisponibilizacaoInicio"]), date.fromisoformat(janela["dataDisponibilizacaoFim"])
+
+
+def janelas_iniciais(janela):
+    """Divide a janela em blocos fixos de SHARD_DIAS dias (ou mantém inteira no modo adaptativo)"""
+    if not SHARDING_ENABLED or not SHARD_DIAS:
+        return [janela]
+    inicio, fim = limites_janela(janela)
+    janelas = []
+    while inicio <= fim:
+        fim_bloco = min(fim, inicio + timedelta(days=SHARD_DIAS - 1))
+        janelas.append(janela_busca(inicio, fim_bloco))
+        inicio = fim_bloco + timedelta(days=1)
+    return janelas
+
+
+def contar_itens_tribunal(sigla_tribunal, janela=None):
+    """Consulta apenas o count do tribunal (página de ITENS_POR_PAGINA_CONTAGEM itens)"""
+    try:
+        data = fetch_page(sigla_tribunal, 1, ITENS_POR_PAGINA_CONTAGEM, janela)
+    except FalhaDefinitiva:
+        return None
+    if not data or data.get("status") != "success":
+        return None
+    return data.get("count", 0)
+
+
+def planejar_shards(sigla_tribunal, janela):
+    """
+    Conta a janela e, se ela passar de MAX_PAGINAS_POR_SHARD páginas, divide ao meio
+    recursivamente (até 1 dia). Cada shard é paginado e cacheado de forma independente.
+    """
+    count = contar_itens_tribunal(sigla_tribunal, janela)
+    if count is None:
+        return None
+    
+    paginas = calcular_total_paginas(count, ITEMS_POR_PAGINA)
+    shard = {"janela": janela, "count": count, "paginas": paginas}
+    inicio, fim = limites_janela(janela)
+    
+    if not SHARDING_ENABLED or paginas <= MAX_PAGINAS_POR_SHARD or inicio >= fim:
+        return [shard]
+    
+    meio = inicio + timedelta(days=(fim - inicio).days // 2)
+    primeira = planejar_shards(sigla_tribunal, janela_busca(inicio, meio))
+    segunda = planejar_shards(sigla_tribunal, janela_busca(meio + timedelta(days=1), fim))
+    if primeira is None or segunda is None:
+        return [shard]
+    return primeira + segunda
+
+
+def janela_do_tribunal(tribunal):
+    """Janela própria do tribunal (modo incremental) ou a de SEARCH_PARAMS"""
+    return tribunal.get("janela") or janela_padrao()
+
+
+def planejar_tribunal(tribunal):
+    """Lista de shards do tribunal, ou None se a contagem falhar"""
+    shards = []
+    for janela in janelas_iniciais(janela_do_tribunal(tribunal)):
+        parte = planejar_shards(tribunal["sigla"], janela)
+        if parte is None:
+            return None
+        shards.extend(parte)
+    return shards
+
+
+def planejar_execucao(tribunais):
+    """
+    Pré-passo de contagem: pergunta o count de todos os tribunais de uma vez
+    e monta o plano ordenado do maior para o menor (o tribunal mais longo começa primeiro)
+    """
+    inicio = time.time()
+    planos_tribunal = {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS_GLOBAL, len(tribunais)))) as executor:
+        futures = {executor.submit(planejar_tribunal, t): t for t in tribunais}
+        for future in as_completed(futures):
+            tribunal = futures[future]
+            try:
+                planos_tribunal[tribunal["sigla"]] = future.result()
+            except Exception as e:
+                print(f"\n  [⚠️] {tribunal['sigla']}: Falha na contagem - {str(e)}")
+                planos_tribunal[tribunal["sigla"]] = None
+    
+    itens_plano = []
+    falhas = []
+    for tribunal in tribunais:
+        shards = planos_tribunal.get(tribunal["sigla"])
+        if shards is None:
+            falhas.append(tribunal["sigla"])
+            continue
+        itens_plano.append({
+            "sigla": tribunal["sigla"],
+            "nome": tribunal["nome"],
+            "count": sum(shard["count"] for shard in shards),
+            "paginas": sum(shard["paginas"] for shard in shards),
+            "shards": shards,
+        })
+    
+    itens_plano.sort(key=lambda item: item["paginas"], reverse=True)
+    total_paginas = sum(item["paginas"] for item in itens_plano)
+    taxa = rate_limiter.rate if RATE_LIMIT_ENABLED else None
+    
+    return {
+        "tribunais": itens_plano,
+        "falhas_contagem": falhas,
+        "total_itens": sum(item["count"] for item in itens_plano),
+        "total_paginas": total_paginas,
+        "total_shards": sum(len(item["shards"]) for item in itens_plano),
+        "taxa_req_s": taxa,
+        "duracao_estimada_segundos": (total_paginas / taxa) if taxa else None,
+        "tempo_planejamento_segundos": time.time() - inicio,
+    }
+
+
+def ordenar_por_plano(tribunais, plano):
+    """Ordena os tribunais conforme o plano (maior primeiro); sem contagem vão para o início"""
+    if not plano:
+        return tribunais
+    posicao = {item["sigla"]: i for i, item in enumerate(plano["tribunais"])}
+    return sorted(tribunais, key=lambda t: posicao.get(t["sigla"], -1))
+
+
+def imprimir_plano(plano):
+    print(f"\n{'='*80}")
+    print("🗺️  PLANO DE EXECUÇÃO (maior primeiro)")
+    print(f"{'='*80}")
+    for item in plano["tribunais"]:
+        print(f"  {item['sigla']:<6} {item['count']:>10,} itens  {item['paginas']:>7,} páginas  {len(item['shards']):>4} shards")
+    if plano["falhas_contagem"]:
+        print(f"  [⚠️] Sem contagem (página 1 descobre o total): {', '.join(plano['falhas_contagem'])}")
+    print(f"{'-'*80}")
+    print(f"  Total: {plano['total_itens']:,} itens em {plano['total_paginas']:,} páginas ({plano['total_shards']:,} shards)")
+    if plano["duracao_estimada_segundos"] is not None:
+        duracao = plano["duracao_estimada_segundos"]
+        print(f"  Duração estimada: {duracao:.0f}s ({duracao/60:.1f} min) a {plano['taxa_req_s']:.1f} req/s")
+    print(f"  Planejamento levou {plano['tempo_planejamento_segundos']:.1f}s")
+    print(f"{'='*80}\n")
+
+
+# ===== AGENDADOR GLOBAL =====
+
+class AgendadorGlobal:
+    """
+    Fila única de unidades (tribunal, shard, página) compartilhada por todos os workers.
+    Com plano, cada shard vira um gerador das suas páginas; sem plano, a página 1 de cada
+    tribunal descobre o total e cria o gerador das demais. As unidades só são criadas
+    quando há vaga na janela (unidades na fila ou em processamento, no máximo `janela`),
+    então a memória não cresce com o total de páginas da execução.
+    Um worker ocioso sempre pega a próxima página pendente de qualquer tribunal.
+    Com o circuito de um tribunal aberto, as páginas dele saem da fila para uma lista de
+    espera (adiadas) e voltam uma a uma como sondas quando o circuito fica meio-aberto, ou
+    todas quando ele fecha; os workers seguem com os tribunais saudáveis. Adiadas e retries
+    ficam fora da janela; o gerador de um tribunal com adiadas ou circuito aberto espera.
+    Os geradores se revezam (uma unidade de cada tribunal por vez), e um tribunal sem token
+    no próprio bucket (rate limiting) não prende os workers: as unidades dele ficam na fila,
+    na vez delas, e o gerador dele espera enquanto já houver uma delas na fila.
+    Cada worker faz uma única tentativa por página: com falha temporária a página vai para a
+    fila de retry (FilaRetry) e volta à frente da fila quando vence o backoff.
+    Cada tribunal ganha um Prazo (TRIBUNAL_TIMEOUT) ao sair a primeira página; vencido, as
+    unidades dele ainda na fila, nas adiadas, no retry ou por gerar são canceladas e viram
+    erros ERRO_PRAZO.
+    Os registros de cada página vão para ao_registros(sigla, registros) quando ela é concluída;
+    o agendador só guarda contadores por tribunal. Unidades já no journal (--resume) são
+    concluídas quando geradas, com os registros relidos do journal fora do lock.
+    """
+
+    def __init__(self, tribunais, ao_concluir, ao_registros, plano=None, journal=None, janela=None):
+        self.cond = threading.Condition()
+        self.lock_saida = threading.Lock()
+        self.ao_concluir = ao_concluir
+        self.ao_registros = ao_registros
+        self.journal = journal
+        self.janela = janela or JANELA_UNIDADES_AGENDADOR or 2 * MAX_WORKERS_GLOBAL
+        self.fila = deque()
+        self.geradores = deque()  # estados dos tribunais com páginas por gerar, em rodízio
+        self.abertas = 0  # unidades geradas e ainda não concluídas (fila, em voo, adiadas, retry)
+        self.adiadas = {}  # sigla -> deque de unidades recusadas pelo circuit breaker
+        self.retry = FilaRetry()  # unidades com falha temporária aguardando o backoff
+        self.proxima_varredura = 0.0  # próxima procura por tribunais com prazo vencido
+        self.estados = {}
+        self.ativos = len(tribunais)
+        self.paginas_total = 0
+        self.paginas_concluidas = 0
+        self.paginas_retomadas = 0
+        
+        planejados = {item["sigla"]: item for item in plano["tribunais"]} if plano else {}
+        vazios = []
+        
+        # Com plano, os geradores seguem a ordem do plano (maior tribunal primeiro);
+        # sem contagem, a página 1 descobre o total como antes
+        for tribunal in ordenar_por_plano(tribunais, plano):
+            sigla = tribunal["sigla"]
+            estado = {
+                "tribunal": tribunal,
+                "count_total": 0,
+                "total_paginas": 0,
+                "pendentes": 1,
+                "planejado": sigla in planejados,
+                "registros": 0,
+                "erros": [],
+                "paginas_processadas": 0,
+                "tempo_inicio": None,
+                "prazo": None,
+                "max_id": None,
+                "max_data": None,
+                "geradores": deque(),  # iteradores de unidades de cada shard ainda por gerar, em ordem
+            }
+            self.estados[sigla] = estado
+            
+            if estado["planejado"]:
+                item = planejados[sigla]
+                estado["count_total"] = item["count"]
+                estado["total_paginas"] = item["paginas"]
+                estado["pendentes"] = 0
+                if "unidades" in item:
+                    # --retry-failed: só as páginas listadas, sem paginar os shards
+                    self._adicionar_gerador(estado, (
+                        {"sigla": sigla, "janela": unidade["janela"], "pagina": unidade["pagina"]}
+                        for unidade in item["unidades"]
+                    ), len(item["unidades"]))
+                for shard in item["shards"]:
+                    self._adicionar_gerador(estado, paginas_do_shard(sigla, shard["janela"], 1, shard["paginas"]),
+                                            shard["paginas"])
+                if estado["pendentes"] == 0:
+                    vazios.append(estado)
+            else:
+                self.fila.append({"sigla": sigla, "janela": janela_do_tribunal(tribunal), "pagina": 1})
+                self.paginas_total += 1
+                self.abertas += 1
+        
+        for estado in vazios:
+            self.ativos -= 1
+            self._finalizar(estado)
+
+    def _adicionar_gerador(self, estado, unidades, quantidade):
+        """Registra `quantidade` páginas a gerar para o tribunal (contam como pendentes desde já)"""
+        if quantidade <= 0:
+            return
+        self.paginas_total += quantidade
+        estado["pendentes"] += quantidade
+        if not estado["geradores"]:
+            self.geradores.append(estado)
+        estado["geradores"].append(unidades)
+
+    def _gerador_liberado(self, estado):
+        """Se o tribunal pode receber unidades novas agora (as vencidas ou desistidas saem para serem canceladas)"""
+        if estado["prazo"] is not None and estado["prazo"].expirou():
+            return True
+        if not DISJUNTOR_ENABLED:
+            return True
+        sigla = estado["tribunal"]["sigla"]
+        disjuntor = disjuntores.de(sigla)
+        return disjuntor.desistiu or (not self.adiadas.get(sigla) and disjuntor.aceita_unidade())
+
+    def _espera_token(self, sigla):
+        """Segundos até o bucket do tribunal liberar mais uma requisição (0 = já libera)"""
+        return rate_limiter.segundos_para_token(sigla) if RATE_LIMIT_ENABLED else 0.0
+
+    def _abastecer(self):
+        """
+        Com o cond: gera unidades até a janela encher. Retorna (retomadas, canceladas): as que
+        já estão no journal, com a posição delas, e as de tribunais com prazo vencido ou
+        desistidos pelo circuit breaker; o chamador as conclui fora do lock
+        """
+        retomadas = []
+        canceladas = []
+        em_espera = []
+        ocupadas = self.abertas - len(self.retry) - sum(len(espera) for espera in self.adiadas.values())
+        na_fila = Counter(unidade["sigla"] for unidade in self.fila)
+        while ocupadas < self.janela and self.geradores:
+            estado = self.geradores.popleft()
+            sigla = estado["tribunal"]["sigla"]
+            # Tribunal sem token com unidade já na fila: gerar mais só ocuparia a janela dos outros
+            if not self._gerador_liberado(estado) or (na_fila[sigla] and self._espera_token(sigla) > 0):
+                em_espera.append(estado)
+                continue
+            unidade = next(estado["geradores"][0], None)
+            if unidade is None:
+                estado["geradores"].popleft()
+                if estado["geradores"]:
+                    self.geradores.appendleft(estado)  # próximo shard, sem perder a vez
+                continue
+            self.geradores.append(estado)
+            self.abertas += 1
+            ocupadas += 1
+            posicao = self.journal.retirar(chave_da_unidade(unidade)) if self.journal else None
+            if posicao is not None:
+                retomadas.append((unidade, posicao))
+            elif estado["prazo"] is not None and estado["prazo"].expirou():
+                canceladas.append((unidade, ERRO_PRAZO))
+            elif DISJUNTOR_ENABLED and disjuntores.de(unidade["sigla"]).desistiu:
+                canceladas.append((unidade, ERRO_INDISPONIVEL))
+            else:
+                self.fila.append(unidade)
+                na_fila[sigla] += 1
+        self.geradores.extend(em_espera)
+        return retomadas, canceladas
+
+    def _retomar(self, unidade, posicao):
+        """Conclui uma unidade do journal (--resume) com os registros lidos do arquivo"""
+        entrada = self.journal.ler(posicao)
+        self.concluir(unidade, {**entrada, "pagina": unidade["pagina"], "erro": None}, retomada=True)
+
+    def _acumular(self, estado, resultado):
+        estado["registros"] += len(resultado["resultados"])
+        for campo in ("max_id", "max_data"):
+            valor = resultado.get(campo)
+            if valor is not None and (estado[campo] is None or valor > estado[campo]):
+                estado[campo] = valor
+
+    def _retirar(self):
+        """
+        Retorna (unidade, desistencias): a próxima unidade da fila cujo tribunal aceita
+        requisições e tem token no próprio bucket, ou as unidades a encerrar como
+        ERRO_INDISPONIVEL de tribunais desistidos pelo circuit breaker (tiradas também do
+        retry), que o chamador conclui antes de pedir outra. As de circuito aberto vão para as
+        adiadas; as de tribunais sem token ficam na fila, na mesma ordem, para o worker não
+        esperar num tribunal enquanto outros têm vez.
+        """
+        sem_token = set()
+        puladas = []
+        desistidas = []
+        unidade = None
+        while self.fila:
+            candidata = self.fila.popleft()
+            sigla = candidata["sigla"]
+            if DISJUNTOR_ENABLED:
+                disjuntor = disjuntores.de(sigla)
+                if disjuntor.desistiu:
+                    desistidas.append(candidata)
+                    continue
+                if not disjuntor.aceita_unidade():
+                    self.adiadas.setdefault(sigla, deque()).append(candidata)
+                    continue
+            if sigla in sem_token or self._espera_token(sigla) > 0:
+                sem_token.add(sigla)
+                puladas.append(candidata)
+                continue
+            unidade = candidata
+            break
+        if unidade is not None and desistidas:
+            puladas.append(unidade)  # volta para a vez dela depois das desistências
+            unidade = None
+        self.fila.extendleft(reversed(puladas))
+        if desistidas:
+            siglas = {candidata["sigla"] for candidata in desistidas}
+            desistidas.extend(self.retry.retirar(lambda pendente: pendente["sigla"] in siglas))
+            return None, [(candidata, ERRO_INDISPONIVEL) for candidata in desistidas]
+        if unidade is not None:
+            estado = self.estados[unidade["sigla"]]
+            if estado["tempo_inicio"] is None:
+                estado["tempo_inicio"] = time.time()
+                estado["prazo"] = Prazo(TRIBUNAL_TIMEOUT)
+        return unidade, []
+
+    def _cancelar_vencidos(self):
+        """
+        Tira da fila, das adiadas e do retry as unidades dos tribunais com prazo vencido, para
+        encerrá-las como ERRO_PRAZO sem ocupar um worker (no máximo a cada 0.5s).
+        """
+        agora = time.monotonic()
+        if agora < self.proxima_varredura:
+            return []
+        self.proxima_varredura = agora + 0.5
+        vencidos = {sigla for sigla, estado in self.estados.items()
+                    if estado["pendentes"] and estado["prazo"] is not None and estado["prazo"].expirou()}
+        if not vencidos:
+            return []
+        canceladas = [unidade for unidade in self.fila if unidade["sigla"] in vencidos]
+        if canceladas:
+            self.fila = deque(unidade for unidade in self.fila if unidade["sigla"] not in vencidos)
+        for sigla in vencidos:
+            canceladas.extend(self.adiadas.pop(sigla, ()))
+        canceladas.extend(self.retry.retirar(lambda unidade: unidade["sigla"] in vencidos))
+        return [(unidade, ERRO_PRAZO) for unidade in canceladas]
+
+    def _revisar_adiadas(self):
+        """
+        Devolve à fila as adiadas de circuitos que fecharam (todas) ou estão meio-abertos (uma,
+        como sonda). Retorna as que devem ser encerradas: tribunal dado como indisponível.
+        """
+        desistencias = []
+        for sigla, espera in self.adiadas.items():
+            if not espera:
+                continue
+            disjuntor = disjuntores.de(sigla)
+            if disjuntor.desistiu:
+                desistencias.extend((unidade, ERRO_INDISPONIVEL) for unidade in espera)
+                desistencias.extend((unidade, ERRO_INDISPONIVEL)
+                                    for unidade in self.retry.retirar(lambda pendente: pendente["sigla"] == sigla))
+                espera.clear()
+            elif disjuntor.aceita_unidade():
+                if disjuntor.estado == "fechado":
+                    self.fila.extendleft(reversed(espera))
+                    espera.clear()
+                else:
+                    self.fila.appendleft(espera.popleft())
+        return desistencias
+
+    def espera_revisao(self):
+        """Quanto esperar por uma unidade nova antes de revisar adiadas e retries (None = nada pendente)"""
+        with self.cond:
+            esperas = [disjuntores.de(sigla).segundos_para_sonda() for sigla, espera in self.adiadas.items() if espera]
+            # Gerador parado por circuito aberto: acorda quando vence o resfriamento
+            esperas += [disjuntores.de(estado["tribunal"]["sigla"]).segundos_para_sonda() for estado in self.geradores
+                        if DISJUNTOR_ENABLED and not self._gerador_liberado(estado)]
+            # Unidades na fila esperando token do tribunal: acorda quando o bucket libera
+            esperas += [self._espera_token(sigla) for sigla in {unidade["sigla"] for unidade in self.fila}]
+            if self.retry:
+                esperas.append(self.retry.segundos_para_proxima())
+            if not esperas:
+                return None
+            return min(1.0, max(0.05, min(esperas)))
+
+    def _obter(self, bloquear):
+        while True:
+            with self.cond:
+                self.fila.extendleft(reversed(self.retry.vencidas()))
+                desistencias = self._cancelar_vencidos() + self._revisar_adiadas()
+                retomadas, canceladas = self._abastecer()
+                desistencias += canceladas
+                if not desistencias and not retomadas:
+                    unidade, desistencias = self._retirar()
+                    if not desistencias:
+                        if unidade is not None or not bloquear:
+                            return unidade
+                        if self.ativos == 0:
+                            return None
+                        self.cond.wait(self.espera_revisao())
+                        continue
+            for unidade, posicao in retomadas:
+                self._retomar(unidade, posicao)
+            for unidade, erro in desistencias:
+                self.concluir(unidade, {"pagina": unidade["pagina"], "resultados": [], "erro": erro, "count": 0}, processada=False)
+
+    def proxima(self):
+        """Bloqueia até haver uma unidade; retorna None quando todos os tribunais terminaram"""
+        return self._obter(bloquear=True)
+
+    def tentar_proxima(self):
+        """Versão não bloqueante de proxima() (usada pelo motor async)"""
+        return self._obter(bloquear=False)
+
+    def terminado(self):
+        with self.cond:
+            return self.ativos == 0
+
+    def prazo(self, unidade):
+        """Prazo do tribunal da unidade (definido quando a primeira página dele sai da fila)"""
+        return self.estados[unidade["sigla"]]["prazo"]
+
+    def expirou(self, unidade):
+        """Indica se o tribunal da unidade já excedeu TRIBUNAL_TIMEOUT"""
+        prazo = self.prazo(unidade)
+        return prazo is not None and prazo.expirou()
+
+    def concluir(self, unidade, resultado, processada=True, retomada=False):
+        """Registra o resultado de uma unidade e cria o gerador das páginas descobertas na página 1"""
+        if resultado.get("adiada"):
+            with self.cond:
+                self.adiadas.setdefault(unidade["sigla"], deque()).append(unidade)
+                self.cond.notify_all()
+            return
+        if resultado.get("reagendar") is not None:
+            prazo = self.prazo(unidade)
+            if prazo is not None and resultado["reagendar"] >= prazo.restante():
+                resultado = resultado_prazo_esgotado(unidade["pagina"])
+            elif DISJUNTOR_ENABLED and disjuntores.de(unidade["sigla"]).desistiu:
+                resultado = {**resultado, "erro": ERRO_INDISPONIVEL, "reagendar": None}  # tribunal dado como indisponível
+            elif orcamento_retries.consumir():
+                with self.cond:
+                    self.retry.agendar({**unidade, "tentativa": unidade.get("tentativa", 0) + 1}, resultado["reagendar"])
+                    self.cond.notify_all()
+                return
+            else:
+                resultado = resultado_sem_retry(resultado)
+        if resultado["erro"] == ERRO_PRAZO:
+            processada = False  # não feita: fica fora das processadas e do journal
+        # Grava fora do cond (não segura os outros workers); vem antes de descontar a pendente,
+        # então o tribunal só é finalizado depois que todos os registros dele foram entregues
+        self.ao_registros(unidade["sigla"], resultado["resultados"])
+        finalizado = None
+        with self.cond:
+            estado = self.estados[unidade["sigla"]]
+            pagina = unidade["pagina"]
+            
+            descoberta = pagina == 1 and not estado["planejado"]
+            
+            if resultado["erro"]:
+                erro = f"Falha ao obter primeira página: {resultado['erro']}" if descoberta and processada else resultado["erro"]
+                janela = unidade["janela"]
+                estado["erros"].append({
+                    "pagina": pagina,
+                    "inicio": janela["dataDisponibilizacaoInicio"],
+                    "fim": janela["dataDisponibilizacaoFim"],
+                    "erro": erro,
+                    "descoberta": descoberta,
+                })
+            if processada and not (descoberta and resultado["erro"]):
+                estado["paginas_processadas"] += 1
+            self._acumular(estado, resultado)
+            
+            if descoberta and not resultado["erro"]:
+                estado["count_total"] = resultado.get("count", 0)
+                estado["total_paginas"] = calcular_total_paginas(estado["count_total"], ITEMS_POR_PAGINA)
+                self._adicionar_gerador(estado, paginas_do_shard(unidade["sigla"], unidade["janela"], 2, estado["total_paginas"]),
+                                        estado["total_paginas"] - 1)
+            
+            estado["pendentes"] -= 1
+            self.abertas -= 1
+            self.paginas_concluidas += 1
+            if retomada:
+                self.paginas_retomadas += 1
+            if estado["pendentes"] == 0:
+                self.ativos -= 1
+                finalizado = estado
+            
+            print(f"  [⚡] Progresso global: {self.paginas_concluidas:,}/{self.paginas_total:,} páginas | Tribunais concluídos: {len(self.estados) - self.ativos}/{len(self.estados)}", end="\r")
+            self.cond.notify_all()
+        
+        if self.journal and processada and not resultado["erro"] and not retomada:
+            janela = unidade["janela"]
+            self.journal.registrar(unidade["sigla"], janela["dataDisponibilizacaoInicio"], janela["dataDisponibilizacaoFim"],
+                                   unidade["pagina"], resultado)
+        
+        if finalizado:
+            self._finalizar(finalizado)
+
+    def _finalizar(self, estado):
+        tribunal = estado["tribunal"]
+        tempo_total = time.time() - (estado["tempo_inicio"] or time.time())
+        with self.lock_saida:
+            imprimir_estatisticas_tribunal(tribunal["sigla"], estado["total_paginas"], estado["paginas_processadas"],
+                                           estado["erros"], estado["count_total"], estado["registros"], tempo_total)
+            self.ao_concluir(tribunal["sigla"], tribunal["nome"], estado["erros"], estado["paginas_processadas"],
+                             {"max_id": estado["max_id"], "max_data": estado["max_data"]})
+
+
+def paginas_do_shard(sigla, janela, primeira, ultima):
+    """Gera as unidades das páginas primeira..ultima de um shard, uma de cada vez"""
+    for pagina in range(primeira, ultima + 1):
+        yield {"sigla": sigla, "janela": janela, "pagina": pagina}
+
+
+def chave_da_unidade(unidade):
+    janela = unidade["janela"]
+    return chave_unidade(unidade["sigla"], janela["dataDisponibilizacaoInicio"], janela["dataDisponibilizacaoFim"], unidade["pagina"])
+
+
+def trabalhador_global(agendador):
+    """Worker do motor threads: consome unidades da fila global até acabar"""
+    while True:
+        unidade = agendador.proxima()
+        if unidade is None:
+            return
+        if agendador.expirou(unidade):
+            agendador.concluir(unidade, resultado_prazo_esgotado(unidade["pagina"]), processada=False)
+            continue
+        agendador.concluir(unidade, processar_pagina(unidade["sigla"], unidade["pagina"], unidade["janela"],
+                                                     unidade.get("tentativa", 0), agendador.prazo(unidade)))
+
+
+def executar_motor_threads(tribunais, ao_concluir, ao_registros, ao_falhar, plano=None, journal=None):
+    """Agendador global: MAX_WORKERS_GLOBAL threads consumindo páginas de todos os tribunais"""
+    agendador = AgendadorGlobal(tribunais, ao_concluir, ao_registros, plano, journal,
+                                janela=JANELA_UNIDADES_AGENDADOR or 2 * MAX_WORKERS_GLOBAL)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_GLOBAL) as executor:
+        futures = [executor.submit(trabalhador_global, agendador) for _ in range(MAX_WORKERS_GLOBAL)]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"\n[❌] Worker global: Erro crítico - {str(e)}")
+                ao_falhar({"sigla": "AGENDADOR"}, str(e))
+
 
+# ===== MOTOR ASYNC =====
 
-def main():
+class AvisoAsync:
+    """
+    Condition dos workers async com um contador de conclusões: quem não achou unidade só dorme
+    se nada foi concluído desde que olhou a fila (a consulta à fila roda fora do lock, numa thread)
+    """
+
+    def __init__(self):
+        self.cond = asyncio.Condition()
+        self.versao = 0
+
+    async def avisar(self):
+        async with self.cond:
+            self.versao += 1
+            self.cond.notify_all()
+
+    async def esperar(self, versao, timeout):
+        async with self.cond:
+            if self.versao != versao:
+                return
+            try:
+                await asyncio.wait_for(self.cond.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def trabalhador_global_async(session, agendador, aviso):
+    """
+    Worker do motor async: mesma fila global, aguardando novas unidades sem bloquear o loop.
+    Obter e concluir unidades grava arquivos (saída por tribunal, journal com fsync, registros
+    retomados), então rodam em threads (asyncio.to_thread) e o loop segue com as requisições;
+    o lock do aviso só cerca a espera, os workers obtêm unidades em paralelo
+    """
+    while True:
+        versao = aviso.versao
+        unidade = await asyncio.to_thread(agendador.tentar_proxima)
+        if unidade is None:
+            if agendador.terminado():
+                return
+            # Com páginas adiadas pelo circuit breaker ou em backoff, acorda para revisá-las
+            await aviso.esperar(versao, agendador.espera_revisao())
+            continue
+        
+        if agendador.expirou(unidade):
+            await asyncio.to_thread(agendador.concluir, unidade, resultado_prazo_esgotado(unidade["pagina"]), processada=False)
+        else:
+            resultado = await processar_pagina_async(session, unidade["sigla"], unidade["pagina"], unidade["janela"],
+                                                     unidade.get("tentativa", 0), agendador.prazo(unidade))
+            await asyncio.to_thread(agendador.concluir, unidade, resultado)
+        
+        await aviso.avisar()
+
+
+async def _executar_motor_async(tribunais, ao_concluir, ao_registros, plano, journal):
+    agendador = AgendadorGlobal(tribunais, ao_concluir, ao_registros, plano, journal,
+                                janela=JANELA_UNIDADES_AGENDADOR or 2 * MAX_TAREFAS_ASYNC)
+    aviso = AvisoAsync()
+    conector = aiohttp.TCPConnector(limit=MAX_CONEXOES_ASYNC, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=conector) as session:
+        await asyncio.gather(*(trabalhador_global_async(session, agendador, aviso) for _ in range(MAX_TAREFAS_ASYNC)))
+
+
+def executar_motor_async(tribunais, ao_concluir, ao_registros, ao_falhar, plano=None, journal=None):
+    """Processa todos os tribunais em um único event loop com pool de conexões compartilhado"""
+    if aiohttp is None:
+        raise RuntimeError("Motor async requer o pacote aiohttp (pip install aiohttp)")
+    try:
+        asyncio.run(_executar_motor_async(tribunais, ao_concluir, ao_registros, plano, journal))
+    except Exception as e:
+        print(f"\n[❌] Motor async: Erro crítico - {str(e)}")
+        ao_falhar({"sigla": "ASYNC"}, str(e))
+
+
+def executar_motor_tribunais(tribunais, ao_concluir, ao_registros, ao_falhar, plano=None):
+    """Modo antigo: tribunais em ThreadPoolExecutor, cada um com seu próprio pool de páginas"""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TRIBUNAIS) as executor:
+        futures = {executor.submit(processar_tribunal, t, ao_registros): t for t in ordenar_por_plano(tribunais, plano)}
+        
+        for future in as_completed(futures):
+            tribunal = futures[future]
+            try:
+                ao_concluir(*future.result(timeout=TRIBUNAL_TIMEOUT + 60))
+            
+            except TimeoutError:
+                print(f"\n[❌] {tribunal['sigla']}: Timeout total do tribunal")
+                ao_falhar(tribunal, "Timeout total")
+            
+            except Exception as e:
+                print(f"\n[❌] {tribunal['sigla']}: Erro crítico - {str(e)}")
+                ao_falhar(tribunal, str(e))
+
+
+# ===== MODO OFFLINE =====
+
+ERRO_AUSENTE_CACHE = "Página ausente do cache (modo offline)"
+
+
+def config_processo_offline():
+    """
+    Configuração repassada aos processos do pool (com spawn, no Windows, eles reimportam
+    o módulo e veriam só os valores padrão). Os processos só leem o cache.
+    """
+    nomes = ("API_BASE_URL", "SEARCH_PARAMS", "FILTROS", "ITEMS_POR_PAGINA", "CACHE_ENABLED", "CACHE_BACKEND",
+             "CACHE_DIR", "CACHE_SQLITE_FILE", "CACHE_COMPRESSAO", "CACHE_ZSTD_NIVEL", "CACHE_ZSTD_DICIONARIO",
+             "CACHE_VERSAO_ESQUEMA", "CACHE_DEDUP_ITENS", "CACHE_TTL_REGRAS")
+    config = {nome: globals()[nome] for nome in nomes}
+    config.update({
+        "MODO_OFFLINE": True,
+        "CACHE_LEITURA_ENABLED": True,
+        "CACHE_ESCRITA_ASSINCRONA": False,
+        "CACHE_MEMORIA_MAX_BYTES": 0,
+        "CACHE_MAX_BYTES": None,
+        "LOG_ENABLED": False,
+    })
+    return config
+
+
+def iniciar_processo_offline(config):
+    globals().update(config)
+
+
+def processar_lote_offline(unidades):
+    """Roda nos processos do pool: lê as páginas do cache e aplica filtrar_item/extrair_dados_relevantes"""
+    resultados = []
+    for unidade in unidades:
+        data = fetch_page(unidade["sigla"], unidade["pagina"], janela=unidade["janela"])
+        if data is None:
+            resultados.append({"pagina": unidade["pagina"], "resultados": [], "erro": ERRO_AUSENTE_CACHE, "count": 0})
+        else:
+            resultados.append(resultado_da_pagina(unidade["pagina"], data))
+    return resultados
+
+
+def executar_motor_offline(tribunais, ao_concluir, ao_registros, ao_falhar, plano=None):
+    """
+    Replay do cache: o agendador global distribui as páginas em lotes para um pool de
+    processos, que leem o cache e filtram; sem rate limiter, sem sessão HTTP
+    """
+    processos = OFFLINE_PROCESSOS or os.cpu_count() or 1
+    # Até 2 lotes por processo em andamento; a janela deixa outro tanto pronto na fila
+    agendador = AgendadorGlobal(tribunais, ao_concluir, ao_registros, plano,
+                                janela=JANELA_UNIDADES_AGENDADOR or 4 * processos * OFFLINE_LOTE_PAGINAS)
+    ausentes = 0
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=iniciar_processo_offline,
+                                 initargs=(config_processo_offline(),)) as pool:
+            em_andamento = {}
+            while True:
+                # Mantém até 2 lotes por processo em andamento; a página 1 de tribunais sem
+                # plano libera as demais páginas quando volta
+                while len(em_andamento) < processos * 2:
+                    lote = []
+                    while len(lote) < OFFLINE_LOTE_PAGINAS:
+                        unidade = agendador.tentar_proxima()
+                        if unidade is None:
+                            break
+                        lote.append(unidade)
+                    if not lote:
+                        break
+                    em_andamento[pool.submit(processar_lote_offline, lote)] = lote
+                if not em_andamento:
+                    break
+                
+                feitos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for future in feitos:
+                    lote = em_andamento.pop(future)
+                    try:
+                        resultados = future.result()
+                    except Exception as e:
+                        resultados = [{"pagina": u["pagina"], "resultados": [], "erro": f"Erro no processo: {e}", "count": 0}
+                                      for u in lote]
+                    for unidade, resultado in zip(lote, resultados):
+                        if resultado["erro"] == ERRO_AUSENTE_CACHE:
+                            ausentes += 1
+                        agendador.concluir(unidade, resultado)
+    except Exception as e:
+        print(f"\n[❌] Motor offline: Erro crítico - {str(e)}")
+        ao_falhar({"sigla": "OFFLINE"}, str(e))
+    
+    if ausentes:
+        print(f"\n[⚠️] {ausentes:,} páginas não estão no cache - rode sem --offline para completá-las")
+
+
+def assinatura_execucao():
+    """Identifica a configuração que gerou o journal (resultados filtrados só valem para os mesmos filtros)"""
+    base = json.dumps({"api": API_BASE_URL, "filtros": FILTROS, "itens_por_pagina": ITEMS_POR_PAGINA}, sort_keys=True)
+    return hashlib.md5(base.encode()).hexdigest()
+
+
+def preparar_incremental(tribunais, marcas):
+    """
+    Aplica as marcas d'água: cada tribunal recebe sua própria janela (dias após a marca
+    menos INCREMENTAL_LOOKBACK_DIAS). Tribunais já em dia ficam de fora.
+    Retorna (tribunais selecionados, {sigla: marca} dos que têm dias de look-back a revalidar).
+    """
+    fim = INCREMENTAL_FIM or date.today().isoformat()
+    selecionados = []
+    revalidar = {}
+    
+    print("[🔁] MODO INCREMENTAL:")
+    for tribunal in tribunais:
+        marca = marcas.get(tribunal["sigla"])
+        janela = janela_incremental(marca, SEARCH_PARAMS["dataDisponibilizacaoInicio"], fim, INCREMENTAL_LOOKBACK_DIAS)
+        ultima = marca.get("ultima_data_completa") if marca else None
+        if janela is None:
+            print(f"    {tribunal['sigla']:<6} em dia (marca {ultima})")
+            continue
+        print(f"    {tribunal['sigla']:<6} {janela[0]} a {janela[1]} (marca {ultima or 'nenhuma'})")
+        selecionados.append(dict(tribunal, janela=janela_busca(*janela)))
+        if ultima and INCREMENTAL_LOOKBACK_DIAS > 0:
+            revalidar[tribunal["sigla"]] = ultima
+    print()
+    return selecionados, revalidar
+
+
+# ===== PÁGINAS COM FALHA (--retry-failed) =====
+
+def unidades_com_falha(erros_tribunais, tribunais):
+    """
+    Converte os erros da execução em unidades (tribunal, shard, página) para o arquivo de falhas.
+    Falha na página 1 sem contagem (ou do tribunal inteiro) vira uma unidade de descoberta:
+    o --retry-failed busca a janela toda de novo.
+    """
+    por_sigla = {t["sigla"]: t for t in tribunais}
+    unidades = []
+    for entrada in erros_tribunais:
+        tribunal = por_sigla.get(entrada["tribunal"])
+        if tribunal is None:
+            continue  # falha do motor (AGENDADOR/ASYNC), não de um tribunal
+        janela = janela_do_tribunal(tribunal)
+        erros = entrada.get("erros") or [{"erro": entrada.get("erro"), "descoberta": True}]
+        if any(erro.get("descoberta") or "pagina" not in erro for erro in erros):
+            erros = [{"pagina": 1, "erro": next(e["erro"] for e in erros if e.get("descoberta") or "pagina" not in e),
+                      "descoberta": True}]
+        for erro in erros:
+            unidades.append({
+                "sigla": tribunal["sigla"],
+                "nome": tribunal["nome"],
+                "inicio": erro.get("inicio") or janela["dataDisponibilizacaoInicio"],
+                "fim": erro.get("fim") or janela["dataDisponibilizacaoFim"],
+                "pagina": erro["pagina"],
+                "erro": erro["erro"],
+                "descoberta": bool(erro.get("descoberta")),
+            })
+    return unidades
+
+
+def plano_das_falhas(falhas):
+    """
+    Tribunais e plano do --retry-failed: exatamente as unidades do arquivo de falhas.
+    Tribunais com unidade de descoberta ficam fora do plano (a página 1 descobre o total de novo).
+    """
+    por_sigla = {}
+    for unidade in falhas:
+        por_sigla.setdefault(unidade["sigla"], []).append(unidade)
+    
+    tribunais = []
+    itens_plano = []
+    for sigla, unidades in por_sigla.items():
+        descoberta = next((u for u in unidades if u.get("descoberta")), None)
+        primeira = descoberta or unidades[0]
+        tribunais.append({"sigla": sigla, "nome": primeira["nome"], "janela": janela_busca(primeira["inicio"], primeira["fim"])})
+        if descoberta:
+            continue
+        itens_plano.append({
+            "sigla": sigla,
+            "nome": primeira["nome"],
+            "count": 0,
+            "paginas": len(unidades),
+            "shards": [],
+            "unidades": [{"janela": janela_busca(u["inicio"], u["fim"]), "pagina": u["pagina"]} for u in unidades],
+        })
+    return tribunais, {"tribunais": itens_plano}
+
+
+def carregar_saida_json(caminho, padrao):
+    """Lê uma saída anterior (resumo.json) para o --retry-failed completar"""
+    if not Path(caminho).exists():
+        return padrao
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[⚠️] Saída anterior ilegível ({caminho}): {e} - será regravada só com os dados recuperados")
+        return padrao
+
+
+def parse_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper PJE - Versão Ultra Otimizada")
+    parser.add_argument("--motor", choices=["threads", "async", "tribunais"], default=MOTOR_EXECUCAO,
+                        help=f"Motor de execução (padrão: {MOTOR_EXECUCAO})")
+    parser.add_argument("--plan", "--dry-run", dest="plan", action="store_true",
+                        help="Apenas conta os itens de cada tribunal, mostra o plano e sai")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Retoma a execução interrompida pulando as unidades já gravadas no journal ({JOURNAL_FILE})")
+    parser.add_argument("--incremental", action="store_true", default=INCREMENTAL_ENABLED,
+                        help=f"Busca só os dias após a marca d'água de cada tribunal ({ESTADO_SYNC_FILE})")
+    parser.add_argument("--offline", action="store_true",
+                        help="Refaz filtros e extração só a partir do cache, sem chamar a API")
+    parser.add_argument("--retry-failed", dest="retry_failed", action="store_true",
+                        help=f"Busca só as páginas com falha da execução anterior ({FALHAS_FILE}) e mescla nas saídas existentes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Main OTIMIZADO com paralelismo de tribunais e páginas
     """
+    global CACHE_REVALIDAR_ATE, MODO_OFFLINE
+    # A execução liga o modo offline / as revalidações do incremental só para ela: chamadas
+    # seguidas no mesmo processo voltam à configuração do módulo
+    configuracao = (CACHE_REVALIDAR_ATE, MODO_OFFLINE)
+    try:
+        return executar(parse_argumentos(argv))
+    finally:
+        CACHE_REVALIDAR_ATE, MODO_OFFLINE = configuracao
+
+
+def executar(args):
+    """Uma execução do scraper com os argumentos já lidos"""
+    global CACHE_REVALIDAR_ATE, MODO_OFFLINE
+    motor = args.motor
+    if (args.incremental or args.resume or args.retry_failed) and motor == "tribunais":
+        raise ValueError("--incremental, --resume e --retry-failed requerem o agendador global (--motor threads ou async)")
+    if args.retry_failed and (args.incremental or args.resume or args.offline or args.plan):
+        raise ValueError("--retry-failed não combina com --incremental, --resume, --offline ou --plan")
+    if args.offline:
+        if args.incremental or args.resume:
+            raise ValueError("--offline não combina com --incremental ou --resume")
+        if not CACHE_ENABLED:
+            raise ValueError("--offline requer CACHE_ENABLED = True")
+        MODO_OFFLINE = True
+        motor = "offline"
+    
     print("="*80)
     print("🚀 SCRAPER PJE - VERSÃO ULTRA OTIMIZADA")
     print("="*80)
@@ -588,27 +2126,95 @@ def main():
     print(f"    Código Classe: {FILTROS.get('codigoClasse', 'TODOS')}")
     print(f"    Tipo Tribunal: {TIPO_TRIBUNAL}")
     print(f"    Tribunais específicos: {TRIBUNAIS_ESPECIFICOS or 'Todos'}")
+    if SHARDING_ENABLED:
+        print(f"    Sharding por data: {f'{SHARD_DIAS} dia(s)' if SHARD_DIAS else 'adaptativo'} (máx. {MAX_PAGINAS_POR_SHARD} páginas/shard)")
     print()
     
     print("[⚡] OTIMIZAÇÕES ATIVADAS:")
-    print(f"    ✓ requests.Session() - Reuso de conexões HTTP")
-    print(f"    ✓ ThreadPoolExecutor - {MAX_WORKERS_TRIBUNAIS} tribunais paralelos")
-    print(f"    ✓ Paralelismo de páginas - {MAX_WORKERS_PAGINAS} páginas simultâneas")
-    print(f"    ✓ Rate Limiting - {MAX_REQUESTS_PER_SECOND} req/s {'(ATIVADO)' if RATE_LIMIT_ENABLED else '(DESATIVADO)'}")
+    if motor != "offline":
+        print(f"    ✓ requests.Session() - Reuso de conexões HTTP")
+    if motor == "offline":
+        print(f"    ✓ Modo OFFLINE - só cache, filtragem em {OFFLINE_PROCESSOS or os.cpu_count()} processos (sem chamadas à API)")
+    elif motor == "async":
+        print(f"    ✓ Motor async (aiohttp) - até {MAX_TAREFAS_ASYNC} requisições em voo, pool de {MAX_CONEXOES_ASYNC} conexões")
+    elif motor == "threads":
+        print(f"    ✓ Agendador global - {MAX_WORKERS_GLOBAL} workers compartilhados por todos os tribunais")
+    else:
+        print(f"    ✓ ThreadPoolExecutor - {MAX_WORKERS_TRIBUNAIS} tribunais paralelos")
+        print(f"    ✓ Paralelismo de páginas - {MAX_WORKERS_PAGINAS} páginas simultâneas")
+    if motor != "offline":
+        print(f"    ✓ Rate Limiting - {MAX_REQUESTS_PER_SECOND} req/s {'(ATIVADO)' if RATE_LIMIT_ENABLED else '(DESATIVADO)'}")
+        if RATE_LIMIT_ENABLED and CONTROLE_LATENCIA_ENABLED:
+            print("    ✓ Controle por latência - taxa de cada tribunal segue o tempo de resposta (AIMD/Vegas)")
+        if RATE_LIMIT_ENABLED and (LIMITES_POR_TRIBUNAL or LIMITE_TRIBUNAL_PADRAO):
+            limites = ", ".join(f"{sigla} {taxa}" for sigla, taxa in LIMITES_POR_TRIBUNAL.items())
+            print(f"    ✓ Limites por tribunal (req/s) - {limites or ''}{' | demais ' + str(LIMITE_TRIBUNAL_PADRAO) if LIMITE_TRIBUNAL_PADRAO else ''}")
     print(f"    ✓ Log em batch - {LOG_BATCH_SIZE} entradas {'(ATIVADO)' if LOG_ENABLED else '(DESATIVADO)'}")
-    print(f"    ✓ Cache local - {'ATIVADO' if CACHE_ENABLED else 'DESATIVADO'}")
+    compressao_cache = descricao_compressao() if CACHE_ENABLED else None
+    print(f"    ✓ Cache local - {f'ATIVADO ({CACHE_BACKEND}, {compressao_cache})' if CACHE_ENABLED else 'DESATIVADO'}")
+    if CACHE_ENABLED and CACHE_ESCRITA_ASSINCRONA:
+        print(f"    ✓ Gravação do cache em segundo plano - fila de {CACHE_FILA_ESCRITA} páginas, lotes de {CACHE_LOTE_ESCRITA}")
+    if CACHE_ENABLED and CACHE_MEMORIA_MAX_BYTES:
+        print(f"    ✓ Cache em memória (LRU) - até {CACHE_MEMORIA_MAX_BYTES / 1024**2:.1f} MB")
     print()
     
     # Cria diretórios
     Path(OUTPUT_DIR).mkdir(exist_ok=True)
-    if CACHE_ENABLED:
+    if CACHE_ENABLED and CACHE_BACKEND == "json":
         Path(CACHE_DIR).mkdir(exist_ok=True)
+    if CACHE_ENABLED and CACHE_BACKEND == "sqlite" and Path(CACHE_DIR).is_dir() and obter_cache_backend().vazio():
+        print(f"[ℹ️] Cache SQLite vazio e {CACHE_DIR}/ existe. Para aproveitar o cache antigo (informe a janela com que ele foi gerado):")
+        dicionario = f" --dicionario {CACHE_ZSTD_DICIONARIO}" if usa_dicionario_zstd() else ""
+        print(f"    python cache_paginas.py importar {CACHE_DIR} {CACHE_SQLITE_FILE} --inicio AAAA-MM-DD --fim AAAA-MM-DD{dicionario}\n")
+    
+    # Warm start do rate limiter com os perfis da execução anterior
+    usa_perfis = PERFIS_ENABLED and RATE_LIMIT_ENABLED and not args.offline
+    perfis_file = Path(OUTPUT_DIR) / PERFIS_TRIBUNAIS_FILE
+    if usa_perfis:
+        iniciais = rate_limiter.aplicar_perfis(carregar_perfis(perfis_file), PERFIL_MEIA_VIDA_DIAS)
+        if iniciais:
+            print(f"[🧠] Taxas iniciais aprendidas ({PERFIS_TRIBUNAIS_FILE}): "
+                  + ", ".join(f"{sigla} {taxa} req/s" for sigla, taxa in iniciais.items()) + "\n")
     
     # Obtém tribunais
     tribunais = resolver_tribunais()
+    
+    falhas_file = Path(OUTPUT_DIR) / FALHAS_FILE
+    plano_falhas = None
+    if args.retry_failed:
+        falhas = carregar_falhas(falhas_file, assinatura_execucao())
+        if not falhas:
+            print(f"[✅] Nenhuma página com falha em {falhas_file}: nada a reprocessar")
+            flush_logs()
+            fechar_cache()
+            return
+        tribunais, plano_falhas = plano_das_falhas(falhas)
+        print(f"[🔁] --retry-failed: {len(falhas):,} páginas com falha de {len(tribunais)} tribunais ({falhas_file})")
+        for tribunal in tribunais:
+            print(f"    {tribunal['sigla']:<6} {sum(1 for u in falhas if u['sigla'] == tribunal['sigla']):>5} páginas")
+        print()
+    
+    marcas = None
+    if args.incremental:
+        marcas = carregar_marcas(ESTADO_SYNC_FILE)
+        tribunais, CACHE_REVALIDAR_ATE = preparar_incremental(tribunais, marcas)
+        ultimo_dia_fechado = (date.today() - timedelta(days=1)).isoformat()
+    
     print(f"[📋] Tribunais a processar: {len(tribunais)}")
     print()
     
+    plano = plano_falhas
+    if (PLANEJAMENTO_ENABLED or args.plan) and not args.retry_failed:
+        print(f"[🗺️] Contando itens de {len(tribunais)} tribunais...")
+        plano = planejar_execucao(tribunais)
+        imprimir_plano(plano)
+        with open(Path(OUTPUT_DIR) / "plano.json", "w", encoding="utf-8") as f:
+            json.dump(plano, f, ensure_ascii=False, indent=2)
+        if args.plan:
+            flush_logs()
+            fechar_cache()
+            return
+    
     tempo_inicio_total = time.time()
     resultados_consolidados = {}
     total_geral = 0
@@ -618,45 +2224,105 @@ def main():
     
     erros_tribunais = []
     
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TRIBUNAIS) as executor:
-        futures = {executor.submit(processar_tribunal, t): t for t in tribunais}
+    janelas = {t["sigla"]: janela_do_tribunal(t) for t in tribunais}
+    consolidado_file = Path(OUTPUT_DIR) / "consolidado.json"
+    resumo_file = Path(OUTPUT_DIR) / "resumo.json"
+    # --retry-failed / --incremental: os totais da execução anterior vêm do resumo.json (o consolidado
+    # não é relido); tribunais fora desta execução continuam com eles
+    consolidado_anterior = {
+        sigla: {"tribunal": dados["nome"], "total_registros": dados["total"],
+                "paginas_processadas": dados.get("paginas_processadas", 0), "erros": dados.get("erros", 0)}
+        for sigla, dados in carregar_saida_json(resumo_file, {}).get("tribunais", {}).items()
+    } if args.retry_failed or args.incremental else {}
+    # Páginas refeitas já contavam como processadas (com erro) na execução anterior
+    refeitas = {item["sigla"]: item["paginas"] for item in plano["tribunais"]} if args.retry_failed else {}
+    
+    # Registros vão direto para <sigla>.json enquanto as páginas chegam; com --retry-failed ou
+    # --incremental, o arquivo anterior do tribunal é o começo do novo (sem repetir ids)
+    saida = SaidaTribunais(OUTPUT_DIR, mesclar=args.retry_failed or args.incremental)
+    
+    def ao_registros(sigla, registros):
+        saida.adicionar(sigla, registros)
+    
+    def ao_concluir(sigla, nome, erros, paginas_proc, info=None):
+        nonlocal total_geral
+        if marcas is not None and not erros:
+            # Sem erros: a janela inteira do tribunal foi coletada. Hoje ainda recebe publicações,
+            # então a marca para no último dia fechado
+            ultima = min(janelas[sigla]["dataDisponibilizacaoFim"], ultimo_dia_fechado)
+            if ultima >= janelas[sigla]["dataDisponibilizacaoInicio"]:
+                atualizar_marca(marcas, sigla, ultima, (info or {}).get("max_id"))
+        total_registros, novos = saida.fechar(sigla)
+        if args.retry_failed:
+            paginas_proc += consolidado_anterior.get(sigla, {}).get("paginas_processadas", refeitas.get(sigla, 0)) - refeitas.get(sigla, 0)
+            print(f"[🔁] {sigla}: {novos:,} registros recuperados | {len(erros)} páginas ainda com falha")
+        if total_registros:
+            resultados_consolidados[sigla] = {
+                "tribunal": nome,
+                "total_registros": total_registros,
+                "paginas_processadas": paginas_proc,
+                "erros": len(erros),
+            }
+            total_geral += total_registros
+            print(f"[💾] {sigla}: {total_registros:,} registros salvos | {len(erros)} erros")
+        else:
+            print(f"[!] {sigla}: Nenhum resultado")
         
-        for future in as_completed(futures):
-            tribunal = futures[future]
-            try:
-                sigla, resultados, nome, erros, paginas_proc = future.result(timeout=TRIBUNAL_TIMEOUT + 60)
-                
-                if resultados:
-                    # Salva resultados individuais
-                    output_file = Path(OUTPUT_DIR) / f"{sigla}.json"
-                    with open(output_file, "w", encoding="utf-8") as f:
-                        json.dump(resultados, f, ensure_ascii=False, indent=2)
-                    
-                    resultados_consolidados[sigla] = {
-                        "tribunal": nome,
-                        "total_registros": len(resultados),
-                        "paginas_processadas": paginas_proc,
-                        "erros": len(erros),
-                        "registros": resultados
-                    }
-                    total_geral += len(resultados)
-                    print(f"[💾] {sigla}: {len(resultados):,} registros salvos | {len(erros)} erros")
-                else:
-                    print(f"[!] {sigla}: Nenhum resultado")
-                
-                if erros:
-                    erros_tribunais.append({"tribunal": sigla, "erros": erros})
-            
-            except TimeoutError:
-                print(f"\n[❌] {tribunal['sigla']}: Timeout total do tribunal")
-                erros_tribunais.append({"tribunal": tribunal['sigla'], "erro": "Timeout total"})
-            
-            except Exception as e:
-                print(f"\n[❌] {tribunal['sigla']}: Erro crítico - {str(e)}")
-                erros_tribunais.append({"tribunal": tribunal['sigla'], "erro": str(e)})
+        if erros:
+            erros_tribunais.append({"tribunal": sigla, "erros": erros})
+    
+    def ao_falhar(tribunal, erro):
+        erros_tribunais.append({"tribunal": tribunal['sigla'], "erro": erro})
+    
+    journal = None
+    if JOURNAL_ENABLED and motor not in ("tribunais", "offline") and not args.retry_failed:
+        journal = JournalExecucao(Path(OUTPUT_DIR) / JOURNAL_FILE, assinatura_execucao(),
+                                  continuar=args.resume, fsync_lote=JOURNAL_FSYNC_LOTE)
+        if args.resume:
+            print(f"[♻️] Retomando: {len(journal.concluidas):,} unidades já concluídas no journal\n")
+    
+    try:
+        if motor == "offline":
+            executar_motor_offline(tribunais, ao_concluir, ao_registros, ao_falhar, plano)
+        elif motor == "async":
+            executar_motor_async(tribunais, ao_concluir, ao_registros, ao_falhar, plano, journal)
+        elif motor == "tribunais":
+            executar_motor_tribunais(tribunais, ao_concluir, ao_registros, ao_falhar, plano)
+        else:
+            executar_motor_threads(tribunais, ao_concluir, ao_registros, ao_falhar, plano, journal)
+    finally:
+        saida.descartar_abertos()
+        if journal:
+            journal.fechar()
+        # Mesmo com erro no motor: o escritor do cache roda numa thread daemon e as páginas
+        # ainda na fila se perderiam na saída do processo
+        flush_logs()
+        cache_memoria = estatisticas_cache(CacheMemoriaLRU)
+        cache_escrita = fechar_cache()
     
-    # Flush logs pendentes
-    flush_logs()
+    if marcas is not None:
+        salvar_marcas(ESTADO_SYNC_FILE, marcas)
+        print(f"\n[💾] Marcas d'água salvas: {ESTADO_SYNC_FILE}")
+    
+    # Dead letter: páginas que esgotaram os retries, para um --retry-failed depois. O --offline não
+    # grava: as páginas ausentes do cache substituiriam as falhas da última execução online
+    falhas_restantes = unidades_com_falha(erros_tribunais, tribunais)
+    if not args.offline:
+        salvar_falhas(falhas_file, assinatura_execucao(), falhas_restantes)
+    if args.offline:
+        if falhas_restantes:
+            print(f"\n[ℹ️] Modo offline: {len(falhas_restantes):,} páginas com falha não entram em {falhas_file} "
+                  f"(mantido como na última execução online)")
+    elif falhas_restantes:
+        print(f"\n[💾] {len(falhas_restantes):,} páginas com falha salvas em {falhas_file} "
+              f"(reprocessar: python main_api_otimizado.py --retry-failed)")
+    elif args.retry_failed:
+        print(f"\n[✅] Todas as páginas com falha foram recuperadas ({falhas_file} removido)")
+    
+    if args.retry_failed or args.incremental:
+        # Tribunais que não estavam no arquivo de falhas (ou já em dia) continuam como na execução anterior
+        resultados_consolidados = {**consolidado_anterior, **resultados_consolidados}
+        total_geral = sum(dados["total_registros"] for dados in resultados_consolidados.values())
     
     tempo_total_execucao = time.time() - tempo_inicio_total
     
@@ -670,16 +2336,48 @@ def main():
     if tempo_total_execucao > 0:
         print(f"Velocidade média: {total_geral/tempo_total_execucao:.0f} registros/s")
     print(f"Tribunais com erros: {len(erros_tribunais)}")
+    desacelerados = rate_limiter.reduzidos() if RATE_LIMIT_ENABLED else {}
+    if desacelerados:
+        print("Tribunais desacelerados por 429/latência (req/s no fim): " + ", ".join(f"{s} {t}" for s, t in desacelerados.items()))
+    pausas = rate_limiter.tempos_pausados() if RATE_LIMIT_ENABLED else {}
+    if pausas:
+        print("Tempo em pausa por 429/Retry-After: " + ", ".join(f"{s} {t:.1f}s" for s, t in pausas.items())
+              + f" | buscando (API não pausada): {tempo_total_execucao - pausas.get('global', 0):.1f}s")
+    circuitos = disjuntores.resumo() if DISJUNTOR_ENABLED else {}
+    if circuitos:
+        print("Circuit breaker: " + ", ".join(
+            f"{sigla} abriu {info['aberturas']}x{' (desistiu das páginas restantes)' if info['desistiu'] else ''}"
+            for sigla, info in circuitos.items()))
+    retries = orcamento_retries.resumo()
+    if retries["reagendados"] or retries["negados"]:
+        orcamento = f"{retries['orcamento']:,}" if retries["orcamento"] is not None else "sem limite"
+        print(f"Páginas reagendadas (fila de retry): {retries['reagendados']:,} de {orcamento}"
+              + (f" | {retries['negados']:,} falhas sem retry (orçamento esgotado)" if retries["negados"] else ""))
+    prazo_esgotado = {
+        entrada["tribunal"]: sum(1 for erro in entrada["erros"] if erro["erro"] == ERRO_PRAZO)
+        for entrada in erros_tribunais
+        if any(erro["erro"] == ERRO_PRAZO for erro in entrada.get("erros", []))
+    }
+    if prazo_esgotado:
+        print(f"Prazo esgotado (TRIBUNAL_TIMEOUT={TRIBUNAL_TIMEOUT}s), páginas não feitas: "
+              + ", ".join(f"{sigla} {n:,}" for sigla, n in prazo_esgotado.items()))
+    if voo_unico.coalescidas:
+        print(f"Requisições coalescidas (single-flight): {voo_unico.coalescidas:,}")
+    if cache_escrita and (cache_escrita["descartadas"] or cache_escrita["falhas"]):
+        print(f"[⚠️] Cache: {cache_escrita['descartadas']:,} páginas descartadas (fila de gravação cheia), "
+              f"{cache_escrita['falhas']:,} com falha de gravação")
+    if cache_memoria:
+        print(f"Cache em memória: {cache_memoria['acertos']:,} acertos, {cache_memoria['faltas']:,} faltas "
+              f"({cache_memoria['taxa_acerto']*100:.1f}%), {cache_memoria['despejos']:,} despejos, "
+              f"{cache_memoria['bytes'] / 1024**2:.1f}/{cache_memoria['max_bytes'] / 1024**2:.1f} MB")
     print()
     
     # Detalhes por tribunal
     for sigla, dados in resultados_consolidados.items():
         print(f"  - {sigla}: {dados['total_registros']:,} registros")
     
-    # Salva consolidado
-    consolidado_file = Path(OUTPUT_DIR) / "consolidado.json"
-    with open(consolidado_file, "w", encoding="utf-8") as f:
-        json.dump(resultados_consolidados, f, ensure_ascii=False, indent=2)
+    # Salva consolidado (concatenando os <sigla>.json, sem carregar os registros)
+    escrever_consolidado(consolidado_file, resultados_consolidados, saida)
     print(f"\n[💾] Consolidado salvo: {consolidado_file}")
     
     # Salva resumo
@@ -688,32 +2386,56 @@ def main():
         "parametros_busca": SEARCH_PARAMS,
         "filtros": FILTROS,
         "tipo_tribunal": TIPO_TRIBUNAL,
+        "modo": "offline" if args.offline else "incremental" if args.incremental else "retry-failed" if args.retry_failed else "completo",
+        "janelas_incrementais": janelas if args.incremental else None,
         "total_tribunais": len(resultados_consolidados),
         "total_registros": total_geral,
         "tempo_execucao_segundos": tempo_total_execucao,
         "velocidade_registros_por_segundo": total_geral / tempo_total_execucao if tempo_total_execucao > 0 else 0,
         "otimizacoes": {
+            "motor": motor,
             "session_reuso": True,
             "paralelismo_tribunais": MAX_WORKERS_TRIBUNAIS,
             "paralelismo_paginas": MAX_WORKERS_PAGINAS,
+            "workers_globais": MAX_WORKERS_GLOBAL,
             "rate_limiting": RATE_LIMIT_ENABLED,
             "cache": CACHE_ENABLED,
+            "cache_backend": CACHE_BACKEND,
+            "cache_compressao": compressao_cache,
+            "cache_memoria": cache_memoria,
+            "cache_escrita": cache_escrita,
+            "single_flight_coalescidas": voo_unico.coalescidas,
+            "limites_por_tribunal": LIMITES_POR_TRIBUNAL,
+            "tribunais_desacelerados": desacelerados,
+            "tempo_pausado_segundos": pausas,
+            "circuit_breaker": circuitos,
+            "retries": retries,
+            "prazo_esgotado": prazo_esgotado,
+            "controle_latencia": CONTROLE_LATENCIA_ENABLED,
+            "limitador_por_tribunal": rate_limiter.estados() if RATE_LIMIT_ENABLED else {},
             "log_batch": LOG_ENABLED
         },
         "tribunais": {
             sigla: {
                 "nome": dados["tribunal"],
-                "total": dados["total_registros"]
+                "total": dados["total_registros"],
+                "paginas_processadas": dados["paginas_processadas"],
+                "erros": dados["erros"]
             }
             for sigla, dados in resultados_consolidados.items()
         }
     }
     
-    resumo_file = Path(OUTPUT_DIR) / "resumo.json"
     with open(resumo_file, "w", encoding="utf-8") as f:
         json.dump(resumo, f, ensure_ascii=False, indent=2)
     print(f"[💾] Resumo salvo: {resumo_file}")
     
+    if usa_perfis:
+        novos_perfis = rate_limiter.perfis(PERFIL_MIN_REQUISICOES)
+        if novos_perfis:
+            salvar_perfis(perfis_file, novos_perfis)
+            print(f"[💾] Perfis de taxa salvos: {perfis_file} ({len(novos_perfis)} tribunais)")
+    
     print("\n" + "="*80)
     print("✅ CONCLUÍDO COM SUCESSO!")
     print("="*80)
@@ -0,0 +1,159 @@
+"""
+Saída em streaming do scraper: os registros filtrados vão para o disco página a página,
+sem acumular tribunais inteiros em memória
+- EscritorTribunal: <sigla>.json escrito aos poucos (array JSON) e publicado no fechamento
+- SaidaTribunais: um escritor por tribunal, criado no primeiro registro (thread-safe)
+- escrever_consolidado: consolidado.json montado concatenando os <sigla>.json linha a linha
+Os arquivos saem iguais, byte a byte, ao json.dump(..., ensure_ascii=False, indent=2) de antes.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def _json_indentado(valor, nivel):
+    """json.dumps(indent=2) de um valor aninhado nivel espaços para dentro"""
+    return json.dumps(valor, ensure_ascii=False, indent=2).replace("\n", "\n" + " " * nivel)
+
+
+def carregar_registros(caminho):
+    """Lê um <sigla>.json anterior ([] se não existir ou estiver ilegível)"""
+    if not Path(caminho).exists():
+        return []
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[⚠️] Saída anterior ilegível ({caminho}): {e} - será regravada só com os dados recuperados")
+        return []
+
+
+class EscritorTribunal:
+    """
+    Array JSON de registros gravado incrementalmente em <arquivo>.parcial; fechar() completa
+    o array e renomeia para o arquivo final (um arquivo pela metade nunca fica no lugar do anterior).
+    Com mesclar=True (--retry-failed), começa pelos registros do arquivo existente e não
+    repete ids: só esse tribunal é lido, uma vez.
+    """
+
+    def __init__(self, caminho, mesclar=False):
+        self.caminho = Path(caminho)
+        self.temporario = self.caminho.with_name(self.caminho.name + ".parcial")
+        self.arquivo = open(self.temporario, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.total = 0
+        self.novos = 0
+        self.ids = None
+        if mesclar:
+            existentes = carregar_registros(self.caminho)
+            self.ids = set()
+            self._escrever(existentes)
+            self.novos = 0
+
+    def _escrever(self, registros):
+        for registro in registros:
+            if self.ids is not None:
+                id_registro = registro.get("id")
+                if id_registro is not None:
+                    if id_registro in self.ids:
+                        continue
+                    self.ids.add(id_registro)
+            self.arquivo.write("[\n  " if self.total == 0 else ",\n  ")
+            self.arquivo.write(_json_indentado(registro, 2))
+            self.total += 1
+            self.novos += 1
+
+    def adicionar(self, registros):
+        with self.lock:
+            self._escrever(registros)
+
+    def fechar(self):
+        """Publica o arquivo; sem registros, descarta o parcial e mantém o que havia (como antes)"""
+        with self.lock:
+            if self.total:
+                self.arquivo.write("\n]")
+            self.arquivo.close()
+            if self.total:
+                os.replace(self.temporario, self.caminho)
+            else:
+                self.temporario.unlink()
+            return self.total
+
+    def descartar(self):
+        with self.lock:
+            self.arquivo.close()
+            self.temporario.unlink(missing_ok=True)
+
+
+class SaidaTribunais:
+    """Escritores <diretorio>/<sigla>.json abertos sob demanda pelos workers"""
+
+    def __init__(self, diretorio, mesclar=False):
+        self.diretorio = Path(diretorio)
+        self.mesclar = mesclar
+        self.escritores = {}
+        self.lock = threading.Lock()
+
+    def caminho(self, sigla):
+        return self.diretorio / f"{sigla}.json"
+
+    def _escritor(self, sigla):
+        with self.lock:
+            escritor = self.escritores.get(sigla)
+            if escritor is None:
+                escritor = EscritorTribunal(self.caminho(sigla), self.mesclar)
+                self.escritores[sigla] = escritor
+            return escritor
+
+    def adicionar(self, sigla, registros):
+        if registros:
+            self._escritor(sigla).adicionar(registros)
+
+    def fechar(self, sigla):
+        """Fecha o tribunal e retorna (total de registros no arquivo, registros desta execução)"""
+        if self.mesclar:
+            self._escritor(sigla)  # sem nada recuperado, o arquivo anterior continua valendo
+        with self.lock:
+            escritor = self.escritores.pop(sigla, None)
+        if escritor is None:
+            return 0, 0
+        return escritor.fechar(), escritor.novos
+
+    def descartar_abertos(self):
+        """Tribunais que não chegaram ao fim (erro crítico do motor) não deixam arquivo parcial"""
+        with self.lock:
+            abertos = list(self.escritores.values())
+            self.escritores.clear()
+        for escritor in abertos:
+            escritor.descartar()
+
+
+def escrever_consolidado(caminho, tribunais, saida):
+    """
+    Grava consolidado.json ({sigla: {tribunal, total_registros, paginas_processadas, erros,
+    registros}}) sem carregar registros: os metadados vêm de tribunais (na ordem do dict) e a
+    lista "registros" é copiada linha a linha do <sigla>.json de cada um.
+    """
+    caminho = Path(caminho)
+    temporario = caminho.with_name(caminho.name + ".tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (sigla, dados) in enumerate(tribunais.items()):
+            f.write(("\n  " if i == 0 else ",\n  ") + json.dumps(sigla, ensure_ascii=False) + ": {")
+            for campo, valor in dados.items():
+                f.write("\n    " + json.dumps(campo) + ": " + _json_indentado(valor, 4) + ",")
+            f.write('\n    "registros": ')
+            arquivo_tribunal = saida.caminho(sigla)
+            if arquivo_tribunal.exists():
+                with open(arquivo_tribunal, "r", encoding="utf-8") as origem:
+                    f.write(origem.readline().rstrip("\n"))
+                    for linha in origem:
+                        f.write("\n    " + linha.rstrip("\n"))
+            else:
+                print(f"[⚠️] {arquivo_tribunal} não encontrado - {sigla} vai sem registros para o consolidado")
+                f.write("[]")
+            f.write("\n  }")
+        f.write("\n}" if tribunais else "}")
+    os.replace(temporario, caminho)
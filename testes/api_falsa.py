@@ -0,0 +1,116 @@
+"""
+API falsa do comunicaapi para os testes offline (http.server numa thread, porta livre em 127.0.0.1)
+
+Cada tribunal tem ITENS_POR_DIA itens por dia, com ids determinísticos; metade deles passa
+nos FILTROS padrão do main_api_otimizado.py. Falhas e latência são configuráveis por teste:
+    api.falhas[("TJAM", 2)] = 503       # página 2 do TJAM (itensPorPagina > 1) sempre com 503
+    api.latencia = 0.2                  # segundos antes de cada resposta
+Todas as requisições ficam em api.requisicoes (dicts com os parâmetros da query string).
+"""
+
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+ITENS_POR_DIA = 70
+TIPO_FILTRADO = "Lista de distribuição"
+CLASSE_FILTRADA = "12154"
+
+
+def id_item(sigla, dia, indice):
+    return int(sigla.encode().hex(), 16) % 10**6 * 10**7 + dia.toordinal() % 10**5 * 100 + indice
+
+
+def item_falso(sigla, dia, indice):
+    filtrado = indice % 2 == 0
+    return {
+        "id": id_item(sigla, dia, indice),
+        "numeroprocessocommascara": f"0000{indice:03d}-00.{dia.year}.8.26.0001",
+        "numero_processo": f"0000{indice:03d}00{dia.year}8260001",
+        "datadisponibilizacao": dia.isoformat(),
+        "siglaTribunal": sigla,
+        "tipoComunicacao": TIPO_FILTRADO if filtrado else "Intimação",
+        "nomeOrgao": f"{indice}ª Vara Cível",
+        "nomeClasse": "Procedimento Comum Cível",
+        "codigoClasse": CLASSE_FILTRADA if filtrado else "7",
+        "tipoDocumento": "Distribuição",
+        "meiocompleto": "Diário Eletrônico",
+        "link": None,
+        "hash": f"{sigla}-{dia.isoformat()}-{indice}",
+        "texto": f"Texto da comunicação {indice} de {dia.isoformat()}",
+        "destinatarios": [{"nome": "Parte", "polo": "A"}],
+        "destinatarioadvogados": [],
+    }
+
+
+def itens_da_janela(sigla, inicio, fim):
+    itens = []
+    dia = date.fromisoformat(inicio)
+    while dia <= date.fromisoformat(fim):
+        itens.extend(item_falso(sigla, dia, indice) for indice in range(ITENS_POR_DIA))
+        dia += timedelta(days=1)
+    return itens
+
+
+def ids_filtrados(sigla, inicio, fim):
+    """Ids que o scraper deve gravar para o tribunal (os que passam nos FILTROS padrão)"""
+    return {item["id"] for item in itens_da_janela(sigla, inicio, fim) if item["tipoComunicacao"] == TIPO_FILTRADO}
+
+
+class ApiFalsa:
+    def __init__(self):
+        self.falhas = {}        # (sigla, pagina) -> status HTTP (só páginas de dados, itensPorPagina > 1)
+        self.latencia = 0.0
+        self.requisicoes = []
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}/api/v1/comunicacao"
+        self.thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.thread.start()
+
+    def paginas_de_dados(self, sigla=None):
+        """Requisições de página de dados (as da contagem usam itensPorPagina=1)"""
+        with self.lock:
+            return [p for p in self.requisicoes
+                    if int(p["itensPorPagina"]) > 1 and (sigla is None or p["siglaTribunal"] == sigla)]
+
+    def responder(self, handler):
+        params = dict(parse_qsl(urlsplit(handler.path).query))
+        with self.lock:
+            self.requisicoes.append(params)
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        sigla = params["siglaTribunal"]
+        pagina = int(params["pagina"])
+        por_pagina = int(params["itensPorPagina"])
+        status = self.falhas.get((sigla, pagina)) if por_pagina > 1 else None
+        if status:
+            corpo, codigo = b"{}", status
+        else:
+            itens = itens_da_janela(sigla, params["dataDisponibilizacaoInicio"], params["dataDisponibilizacaoFim"])
+            inicio = (pagina - 1) * por_pagina
+            dados = {"status": "success", "count": len(itens), "items": itens[inicio:inicio + por_pagina]}
+            corpo, codigo = json.dumps(dados).encode("utf-8"), 200
+        handler.send_response(codigo)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(corpo)))
+        handler.end_headers()
+        handler.wfile.write(corpo)
+
+    def fechar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
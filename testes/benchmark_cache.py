@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache de páginas: JSON puro (formato atual do ler_cache) x zlib x zstd x zstd+dicionário
+Mede taxa de compressão e velocidade de leitura (arquivo + descompressão + json.loads)
+
+Uso:
+    python testes/benchmark_cache.py cache_api              # diretório de cache JSON
+    python testes/benchmark_cache.py cache_api.sqlite3      # banco do backend SQLite
+    python testes/benchmark_cache.py cache_api 500          # limita a 500 páginas
+    python testes/benchmark_cache.py cache_api.sqlite3 2000 cache_api.zdict  # banco gravado com dicionário
+
+Metade das páginas treina o dicionário e a outra metade é medida, para o dicionário
+não "decorar" as páginas do teste.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cache_paginas import BackendCacheJSON, CodecCache, amostras_origem, carregar_codec, treinar_dicionario, zstandard
+
+REPETICOES = 3
+
+
+def medir(nome, codec, paginas, diretorio):
+    """Grava as páginas com o codec e mede a leitura pelo mesmo caminho do cache JSON"""
+    backend = BackendCacheJSON(Path(diretorio) / nome, codec=codec)
+    backend.diretorio.mkdir()
+    bytes_disco = 0
+    for i, conteudo in enumerate(paginas):
+        comprimido = codec.comprimir(conteudo)
+        (backend.diretorio / f"{i}{codec.extensao}").write_bytes(comprimido)
+        bytes_disco += len(comprimido)
+
+    melhor = None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        for i in range(len(paginas)):
+            if backend.ler(str(i)) is None:
+                raise RuntimeError(f"{nome}: página {i} ilegível")
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return bytes_disco, melhor
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__)
+        return 1
+    origem = argv[0]
+    quantidade = int(argv[1]) if len(argv) > 1 else 2000
+    arquivo_dicionario = argv[2] if len(argv) > 2 else None
+
+    # O codec só é usado para ler a origem (detecta zlib/zstd; o dicionário é necessário se foi usado na gravação)
+    paginas = amostras_origem(origem, quantidade, carregar_codec("zstd", arquivo_dicionario=arquivo_dicionario))
+    if len(paginas) < 20:
+        print(f"[❌] Poucas páginas em {origem} ({len(paginas)})")
+        return 1
+
+    treino, teste = paginas[::2], paginas[1::2]
+    bytes_json = sum(len(p) for p in teste)
+    print(f"[📊] {len(teste):,} páginas medidas ({bytes_json / 1024**2:.1f} MB de JSON), "
+          f"{len(treino):,} usadas no treino do dicionário\n")
+
+    codecs = [("json", CodecCache("nenhum")), ("zlib", CodecCache("zlib"))]
+    if zstandard is None:
+        print("[⚠️] Pacote zstandard não instalado - medindo apenas JSON e zlib\n")
+    else:
+        codecs.append(("zstd-3", CodecCache("zstd", nivel=3)))
+        codecs.append(("zstd-9", CodecCache("zstd", nivel=9)))
+        inicio = time.time()
+        dicionario = treinar_dicionario(treino)
+        print(f"[⚡] Dicionário de {len(dicionario) / 1024:.0f} KB treinado em {time.time() - inicio:.1f}s\n")
+        codecs.append(("zstd-3+dic", CodecCache("zstd", nivel=3, dicionario=dicionario)))
+
+    print(f"{'Formato':<12} {'Disco (MB)':>11} {'Taxa':>7} {'Leitura (pág/s)':>16} {'MB/s (JSON)':>12}")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome, codec in codecs:
+            bytes_disco, segundos = medir(nome, codec, teste, diretorio)
+            print(f"{nome:<12} {bytes_disco / 1024**2:>11.2f} {bytes_json / bytes_disco:>6.1f}x "
+                  f"{len(teste) / segundos:>16,.0f} {bytes_json / 1024**2 / segundos:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
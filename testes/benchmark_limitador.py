@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do AdaptiveRateLimiter: fila FIFO (atual) x laço com time.sleep (versão anterior)
+
+Mede, com 1, 16 e 256 threads esperando:
+- custo do acquire sem disputa por tokens (taxa altíssima): µs por chamada
+- espera sob disputa (taxa fixa): p50/p99/máx da espera por token e a dispersão p99 - p50
+- justiça: menor e maior número de tokens obtidos por uma thread
+- vazão real x taxa configurada
+Também roda a mesma disputa com corrotinas (acquire_async).
+
+Uso:
+    python testes/benchmark_limitador.py             # taxa 500 req/s, 3s por cenário
+    python testes/benchmark_limitador.py 200 5       # taxa 200 req/s, 5s por cenário
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from limitador_taxa import AdaptiveRateLimiter
+
+THREADS = (1, 16, 256)
+CHAMADAS_SEM_DISPUTA = 20000  # total de acquires por cenário sem disputa
+
+
+class LimitadorPolling(AdaptiveRateLimiter):
+    """acquire da versão anterior: cada thread refaz a conta e dorme max(0.01, need)"""
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                need = (1.0 - self.tokens) / (self.rate if self.rate > 0 else 1.0)
+            time.sleep(max(0.01, need))
+
+    async def acquire_async(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                need = (1.0 - self.tokens) / (self.rate if self.rate > 0 else 1.0)
+            await asyncio.sleep(max(0.01, need))
+
+
+def novo_limitador(classe, taxa):
+    limitador = classe(initial_rate=taxa, min_rate=1, max_rate=taxa)
+    limitador.tokens = 0.0  # sem rajada inicial: todo mundo disputa desde o começo
+    return limitador
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def medir_custo(classe, threads):
+    """µs por acquire com tokens sempre disponíveis (só o custo de lock/fila)"""
+    limitador = classe(initial_rate=1e9, min_rate=1, max_rate=1e9)
+    por_thread = CHAMADAS_SEM_DISPUTA // threads
+    largada = threading.Barrier(threads + 1)
+
+    def trabalhar():
+        largada.wait()
+        for _ in range(por_thread):
+            limitador.acquire()
+
+    workers = [threading.Thread(target=trabalhar) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    largada.wait()
+    inicio = time.perf_counter()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - inicio) / (por_thread * threads) * 1e6
+
+
+def medir_disputa(classe, threads, taxa, duracao):
+    """Cada thread pede tokens sem parar por `duracao` segundos; registra quanto esperou em cada um"""
+    limitador = novo_limitador(classe, taxa)
+    esperas = [[] for _ in range(threads)]
+    largada = threading.Barrier(threads + 1)
+    fim = [0.0]
+
+    def trabalhar(i):
+        largada.wait()
+        while True:
+            inicio = time.perf_counter()
+            if inicio >= fim[0]:
+                return
+            limitador.acquire()
+            esperas[i].append(time.perf_counter() - inicio)
+
+    workers = [threading.Thread(target=trabalhar, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    fim[0] = time.perf_counter() + duracao
+    limitador.last_refill = time.monotonic()  # tokens acumulados enquanto as threads subiam não contam
+    largada.wait()
+    inicio = time.perf_counter()
+    for w in workers:
+        w.join()
+    return esperas, time.perf_counter() - inicio
+
+
+def medir_disputa_async(classe, tarefas, taxa, duracao):
+    """Mesma disputa com corrotinas em um único event loop"""
+    limitador = novo_limitador(classe, taxa)
+    esperas = [[] for _ in range(tarefas)]
+
+    async def trabalhar(i, fim):
+        while True:
+            inicio = time.perf_counter()
+            if inicio >= fim:
+                return
+            await limitador.acquire_async()
+            esperas[i].append(time.perf_counter() - inicio)
+
+    async def rodar():
+        fim = time.perf_counter() + duracao
+        limitador.last_refill = time.monotonic()
+        await asyncio.gather(*(trabalhar(i, fim) for i in range(tarefas)))
+
+    inicio = time.perf_counter()
+    asyncio.run(rodar())
+    return esperas, time.perf_counter() - inicio
+
+
+def linha(nome, n, esperas, segundos, taxa):
+    todas = [e for por_thread in esperas for e in por_thread]
+    obtidos = [len(por_thread) for por_thread in esperas]
+    p50, p99 = percentil(todas, 0.50), percentil(todas, 0.99)
+    print(f"{nome:<14} {n:>5} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f} {max(todas) * 1000:>9.1f} "
+          f"{(p99 - p50) * 1000:>10.1f} {min(obtidos):>6} {max(obtidos):>6} {len(todas) / segundos / taxa:>8.0%}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    taxa = float(argv[0]) if argv else 500.0
+    duracao = float(argv[1]) if len(argv) > 1 else 3.0
+    classes = [("fila FIFO", AdaptiveRateLimiter), ("polling", LimitadorPolling)]
+
+    print(f"[📊] Custo do acquire sem disputa ({CHAMADAS_SEM_DISPUTA:,} chamadas)\n")
+    print(f"{'Limitador':<14} " + " ".join(f"{str(n) + ' thr':>10}" for n in THREADS))
+    print("-" * 48)
+    for nome, classe in classes:
+        custos = [medir_custo(classe, n) for n in THREADS]
+        print(f"{nome:<14} " + " ".join(f"{c:>8.2f}µs" for c in custos))
+
+    print(f"\n[📊] Espera por token sob disputa ({taxa:.0f} req/s, {duracao:.0f}s por cenário)\n")
+    print(f"{'Limitador':<14} {'N':>5} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9} "
+          f"{'p99-p50':>10} {'mín/t':>6} {'máx/t':>6} {'vazão':>8}")
+    print("-" * 84)
+    for nome, classe in classes:
+        for n in THREADS:
+            esperas, segundos = medir_disputa(classe, n, taxa, duracao)
+            linha(nome, n, esperas, segundos, taxa)
+        for n in THREADS:
+            esperas, segundos = medir_disputa_async(classe, n, taxa, duracao)
+            linha(nome + " async", n, esperas, segundos, taxa)
+    print("\nmín/t e máx/t = tokens obtidos pela thread (ou corrotina) que menos e que mais conseguiu")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
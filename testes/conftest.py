@@ -0,0 +1,61 @@
+"""
+Fixtures dos testes offline: a API falsa (testes/api_falsa.py) e o main_api_otimizado.py
+configurado para ela, com saídas, cache e logs num diretório temporário
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_falsa import ApiFalsa
+
+INICIO = "2025-11-03"
+FIM = "2025-11-07"
+TRIBUNAIS = ["TJAM", "TJAC"]
+
+
+@pytest.fixture
+def api():
+    api = ApiFalsa()
+    yield api
+    api.fechar()
+
+
+@pytest.fixture
+def scraper(api, tmp_path, monkeypatch):
+    """main_api_otimizado apontado para a API falsa: sem rate limit, disjuntor, perfis nem cache"""
+    import main_api_otimizado as m
+
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "API_BASE_URL": api.url,
+        "SEARCH_PARAMS": {"dataDisponibilizacaoInicio": INICIO, "dataDisponibilizacaoFim": FIM},
+        "TIPO_TRIBUNAL": "TODOS",
+        "TRIBUNAIS_ESPECIFICOS": list(TRIBUNAIS),
+        "OUTPUT_DIR": str(tmp_path / "resultados"),
+        "CACHE_DIR": str(tmp_path / "cache_api"),
+        "CACHE_SQLITE_FILE": str(tmp_path / "cache_api.sqlite3"),
+        "CACHE_ZSTD_DICIONARIO": "",
+        "LOG_FILE": str(tmp_path / "scraper_requests.log"),
+        "ESTADO_SYNC_FILE": str(tmp_path / "estado_sync.json"),
+        "CACHE_ENABLED": False,
+        "CACHE_LEITURA_ENABLED": True,
+        "MODO_OFFLINE": False,
+        "RATE_LIMIT_ENABLED": False,
+        "DISJUNTOR_ENABLED": False,
+        "PERFIS_ENABLED": False,
+        "MAX_WORKERS_GLOBAL": 3,
+        "MAX_TAREFAS_ASYNC": 4,
+        "MAX_RETRIES": 2,
+        "OFFLINE_PROCESSOS": 2,
+        "orcamento_retries": m.OrcamentoRetries(None),
+        "voo_unico": m.VooUnico(),
+        "tempo_espera_retry": lambda attempt, jitter_min, jitter_max: 0.01,
+    }
+    for nome, valor in config.items():
+        monkeypatch.setattr(m, nome, valor)
+    return m
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Simulação do controle de taxa do AdaptiveRateLimiter contra um servidor modelado (relógio virtual)
+
+Servidor: atende CAPACIDADE req/s em fila FIFO com latência base LATENCIA_BASE; a latência de cada
+requisição é a base + o tempo de fila na chegada. Quando a fila passa de FILA_MAX_S segundos de
+trabalho, responde 429 na hora. A capacidade muda no meio da simulação (queda e recuperação)
+para mostrar o controlador acompanhando.
+
+Cliente: demanda infinita (sempre há página esperando token); cada resposta alimenta o limitador
+como no main_api_otimizado.py (on_success com o tempo de resposta, on_429).
+
+Compara:
+- só 429:      controle_latencia=False (recuo 0.6^n no 429, +0.5 req/s por sucesso após 30s)
+- AIMD/Vegas:  controle_latencia=True
+
+Uso:
+    python testes/simulacao_controle_taxa.py                 # tabela + gráfico ASCII
+    python testes/simulacao_controle_taxa.py saida.csv       # também grava a série em CSV
+                                                              # (e saida.png se houver matplotlib)
+"""
+
+import contextlib
+import csv
+import heapq
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import limitador_taxa
+from limitador_taxa import AdaptiveRateLimiter
+
+DURACAO = 240.0           # segundos simulados
+PASSO = 0.005             # resolução do relógio virtual
+LATENCIA_BASE = 0.08      # latência do servidor sem fila (s)
+FILA_MAX_S = 0.5          # fila acima de 0.5s de trabalho -> 429
+TAXA_MAXIMA = 100.0       # MAX_REQUESTS_PER_SECOND do cliente
+INTERVALO_RELATORIO = 10.0
+# (a partir do instante, capacidade em req/s)
+CAPACIDADES = [(0.0, 40.0), (80.0, 20.0), (160.0, 35.0)]
+
+
+class RelogioVirtual:
+    """Substitui o módulo time dentro do limitador_taxa durante a simulação"""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def time(self):
+        return self.agora
+
+    def monotonic(self):
+        return self.agora
+
+
+def capacidade_em(t):
+    atual = CAPACIDADES[0][1]
+    for inicio, capacidade in CAPACIDADES:
+        if t >= inicio:
+            atual = capacidade
+    return atual
+
+
+def simular(controle_latencia):
+    relogio = RelogioVirtual()
+    time_original = limitador_taxa.time
+    limitador_taxa.time = relogio
+    try:
+        limitador = AdaptiveRateLimiter(initial_rate=TAXA_MAXIMA, min_rate=1, max_rate=TAXA_MAXIMA,
+                                        controle_latencia=controle_latencia)
+        limitador.tokens = 0.0
+        respostas = []      # heap (instante, seq, latência ou None para 429)
+        fila_livre_em = 0.0  # instante em que o servidor esvazia a fila atual
+        seq = 0
+        serie = []
+        janela = {"enviadas": 0, "ok": 0, "429": 0, "latencias": []}
+        proximo_relatorio = INTERVALO_RELATORIO
+
+        with contextlib.redirect_stdout(io.StringIO()):  # o on_429 imprime a cada 429
+            while relogio.agora < DURACAO:
+                t = relogio.agora
+                capacidade = capacidade_em(t)
+
+                # Entrega as respostas que chegaram até agora
+                while respostas and respostas[0][0] <= t:
+                    _, _, latencia = heapq.heappop(respostas)
+                    if latencia is None:
+                        janela["429"] += 1
+                        limitador.on_429()
+                    else:
+                        janela["ok"] += 1
+                        janela["latencias"].append(latencia)
+                        limitador.on_success(latencia)
+
+                # Demanda infinita: consome todos os tokens disponíveis
+                with limitador.lock:
+                    limitador._refill()
+                    enviar = int(limitador.tokens)
+                    limitador.tokens -= enviar
+                    limitador.saturado = True
+                for _ in range(enviar):
+                    janela["enviadas"] += 1
+                    seq += 1
+                    fila = max(0.0, fila_livre_em - t)
+                    if fila > FILA_MAX_S:
+                        heapq.heappush(respostas, (t + 0.01, seq, None))
+                        continue
+                    fila_livre_em = max(fila_livre_em, t) + 1.0 / capacidade
+                    latencia = LATENCIA_BASE + fila
+                    heapq.heappush(respostas, (t + latencia, seq, latencia))
+
+                if t >= proximo_relatorio:
+                    latencias = janela["latencias"]
+                    serie.append({
+                        "t": round(t),
+                        "capacidade": capacidade,
+                        "taxa": round(limitador.rate, 1),
+                        "vazao_ok": round(janela["ok"] / INTERVALO_RELATORIO, 1),
+                        "latencia_ms": round(sum(latencias) / len(latencias) * 1000) if latencias else 0,
+                        "r429": janela["429"],
+                    })
+                    janela = {"enviadas": 0, "ok": 0, "429": 0, "latencias": []}
+                    proximo_relatorio += INTERVALO_RELATORIO
+                relogio.agora += PASSO
+    finally:
+        limitador_taxa.time = time_original
+    return serie
+
+
+def grafico_ascii(nome, serie, largura=50):
+    print(f"\n{nome}: taxa (#) x capacidade (|) em req/s")
+    for ponto in serie:
+        escala = largura / TAXA_MAXIMA
+        barra = ["#" if i < ponto["taxa"] * escala else " " for i in range(largura)]
+        marca = min(largura - 1, int(ponto["capacidade"] * escala))
+        barra[marca] = "|"
+        print(f"{ponto['t']:>5}s {''.join(barra)} {ponto['taxa']:>6.1f}")
+
+
+def grafico_png(arquivo, series):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("[⚠️] matplotlib não instalado - gráfico PNG não gerado")
+        return
+    fig, (eixo_taxa, eixo_lat) = plt.subplots(2, 1, sharex=True, figsize=(9, 6))
+    primeira = next(iter(series.values()))
+    eixo_taxa.step([p["t"] for p in primeira], [p["capacidade"] for p in primeira], "k--", label="capacidade")
+    for nome, serie in series.items():
+        eixo_taxa.plot([p["t"] for p in serie], [p["taxa"] for p in serie], label=nome)
+        eixo_lat.plot([p["t"] for p in serie], [p["latencia_ms"] for p in serie], label=nome)
+    eixo_taxa.set_ylabel("req/s")
+    eixo_lat.set_ylabel("latência (ms)")
+    eixo_lat.set_xlabel("tempo (s)")
+    eixo_taxa.legend()
+    fig.savefig(arquivo, dpi=100)
+    print(f"[📈] Gráfico salvo em {arquivo}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    series = {"só 429": simular(False), "AIMD/Vegas": simular(True)}
+
+    print(f"{'':>6} {'cap':>5} | {'só 429: taxa':>12} {'ok/s':>6} {'lat ms':>7} {'429':>5} | "
+          f"{'Vegas: taxa':>11} {'ok/s':>6} {'lat ms':>7} {'429':>5}")
+    print("-" * 86)
+    for a, b in zip(series["só 429"], series["AIMD/Vegas"]):
+        print(f"{a['t']:>5}s {a['capacidade']:>5.0f} | {a['taxa']:>12.1f} {a['vazao_ok']:>6.1f} {a['latencia_ms']:>7} {a['r429']:>5} | "
+              f"{b['taxa']:>11.1f} {b['vazao_ok']:>6.1f} {b['latencia_ms']:>7} {b['r429']:>5}")
+
+    print()
+    for nome, serie in series.items():
+        total_429 = sum(p["r429"] for p in serie)
+        apos_partida = sum(p["r429"] for p in serie[1:])  # o primeiro intervalo é a partida a frio em TAXA_MAXIMA
+        vazao = sum(p["vazao_ok"] for p in serie) / len(serie)
+        latencia = sum(p["latencia_ms"] for p in serie) / len(serie)
+        print(f"[📊] {nome:<11} 429: {total_429:>4,} ({apos_partida} após a partida)   "
+              f"vazão média: {vazao:>5.1f} req/s   latência média: {latencia:>5.0f} ms")
+
+    for nome, serie in series.items():
+        grafico_ascii(nome, serie)
+
+    if argv:
+        with open(argv[0], "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["controlador", "t", "capacidade", "taxa", "vazao_ok", "latencia_ms", "r429"])
+            for nome, serie in series.items():
+                for p in serie:
+                    escritor.writerow([nome, p["t"], p["capacidade"], p["taxa"], p["vazao_ok"], p["latencia_ms"], p["r429"]])
+        print(f"\n[💾] Série salva em {argv[0]}")
+        grafico_png(str(Path(argv[0]).with_suffix(".png")), series)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
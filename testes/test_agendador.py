@@ -0,0 +1,160 @@
+"""
+AgendadorGlobal do main_api_otimizado.py, sem rede: as unidades são entregues e concluídas
+à mão, como um worker faria
+"""
+
+import threading
+import time
+
+import pytest
+
+import main_api_otimizado as m
+from estado_execucao import JournalExecucao
+
+JANELA = {"dataDisponibilizacaoInicio": "2025-11-03", "dataDisponibilizacaoFim": "2025-11-07"}
+
+
+@pytest.fixture
+def agendador_sem_rede(monkeypatch):
+    monkeypatch.setattr(m, "DISJUNTOR_ENABLED", False)
+    monkeypatch.setattr(m, "orcamento_retries", m.OrcamentoRetries(None))
+    monkeypatch.setattr(m, "imprimir_estatisticas_tribunal", lambda *args: None)
+
+
+def plano_de(paginas_por_tribunal):
+    return {"tribunais": [
+        {"sigla": sigla, "count": paginas * m.ITEMS_POR_PAGINA, "paginas": paginas,
+         "shards": [{"janela": JANELA, "count": paginas * m.ITEMS_POR_PAGINA, "paginas": paginas}]}
+        for sigla, paginas in paginas_por_tribunal.items()
+    ]}
+
+
+def resultado_ok(unidade):
+    return {"pagina": unidade["pagina"], "resultados": [{"id": unidade["pagina"]}], "erro": None, "count": 0}
+
+
+def test_agendador_sem_plano_descobre_as_paginas_na_primeira(agendador_sem_rede):
+    concluidos = {}
+    registros = []
+    agendador = m.AgendadorGlobal([{"sigla": "TJAM", "nome": "TJAM", "janela": JANELA}, {"sigla": "TJAC", "nome": "TJAC"}],
+                                  lambda sigla, nome, erros, processadas, info: concluidos.update({sigla: processadas}),
+                                  lambda sigla, lista: registros.extend((sigla, r["id"]) for r in lista))
+
+    entregues = []
+    while (unidade := agendador.tentar_proxima()) is not None:
+        entregues.append((unidade["sigla"], unidade["pagina"]))
+        resultado = resultado_ok(unidade)
+        if unidade["pagina"] == 1:
+            resultado["count"] = 3 * m.ITEMS_POR_PAGINA if unidade["sigla"] == "TJAM" else 1
+        agendador.concluir(unidade, resultado)
+
+    assert entregues[:2] == [("TJAM", 1), ("TJAC", 1)]
+    assert sorted(entregues) == [("TJAC", 1), ("TJAM", 1), ("TJAM", 2), ("TJAM", 3)]
+    assert agendador.terminado()
+    assert concluidos == {"TJAM": 3, "TJAC": 1}
+    assert sorted(registros) == sorted(entregues)
+
+
+def test_agendador_retoma_unidades_do_journal(agendador_sem_rede, tmp_path):
+    caminho = tmp_path / "journal.jsonl"
+    journal = JournalExecucao(caminho, {"a": 1})
+    for pagina in (2, 3):
+        journal.registrar("TJAM", JANELA["dataDisponibilizacaoInicio"], JANELA["dataDisponibilizacaoFim"], pagina,
+                          {"resultados": [{"id": pagina * 10}], "count": 0, "max_id": pagina * 10})
+    journal.fechar()
+
+    journal = JournalExecucao(caminho, {"a": 1}, continuar=True)
+    registros = []
+    agendador = m.AgendadorGlobal([{"sigla": "TJAM", "nome": "TJAM"}], lambda *args: None,
+                                  lambda sigla, lista: registros.extend(lista), plano_de({"TJAM": 4}),
+                                  journal=journal, janela=2)
+    processadas = []
+    while (unidade := agendador.tentar_proxima()) is not None:
+        processadas.append(unidade["pagina"])
+        agendador.concluir(unidade, resultado_ok(unidade))
+    journal.fechar()
+
+    assert processadas == [1, 4]
+    assert agendador.paginas_retomadas == 2
+    assert agendador.terminado()
+    assert sorted(r["id"] for r in registros) == [1, 4, 20, 30]
+    assert agendador.estados["TJAM"]["max_id"] == 30
+
+
+def test_agendador_nao_gera_mais_unidades_que_a_janela(agendador_sem_rede):
+    paginas = {"TJAM": 3000, "TJAC": 2000}
+    concluidos = {}
+    agendador = m.AgendadorGlobal([{"sigla": s, "nome": s} for s in paginas],
+                                  lambda sigla, nome, erros, processadas, info: concluidos.update({sigla: processadas}),
+                                  lambda sigla, registros: None, plano_de(paginas), janela=10)
+
+    assert len(agendador.fila) == 0 and agendador.abertas == 0
+    maximo = 0
+    em_maos = []
+    while True:
+        # Segura algumas unidades "em voo" para a janela ficar cheia
+        while len(em_maos) < 4:
+            unidade = agendador.tentar_proxima()
+            if unidade is None:
+                break
+            em_maos.append(unidade)
+        maximo = max(maximo, agendador.abertas)
+        if not em_maos:
+            break
+        unidade = em_maos.pop(0)
+        agendador.concluir(unidade, resultado_ok(unidade))
+
+    assert maximo == 10
+    assert agendador.terminado()
+    assert concluidos == paginas
+
+
+def test_tribunal_sem_token_nao_prende_os_outros(agendador_sem_rede, monkeypatch):
+    monkeypatch.setattr(m, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(m, "rate_limiter", m.LimitadorHierarquico(50, limites_filhos={"TJAM": 1}, controle_latencia=False))
+    inicio = time.monotonic()
+    concluidos = {}
+    agendador = m.AgendadorGlobal([{"sigla": s, "nome": s} for s in ("TJAM", "TJAC")],
+                                  lambda sigla, *args: concluidos.update({sigla: time.monotonic() - inicio}),
+                                  lambda sigla, registros: None, plano_de({"TJAM": 4, "TJAC": 4}), janela=4)
+
+    def trabalhador():
+        while (unidade := agendador.proxima()) is not None:
+            m.rate_limiter.acquire(unidade["sigla"])  # como o fetch_page faria
+            agendador.concluir(unidade, resultado_ok(unidade))
+
+    workers = [threading.Thread(target=trabalhador) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    # TJAM a 1 req/s leva ~3s; o TJAC não espera por ele
+    assert agendador.terminado()
+    assert concluidos["TJAC"] < 0.5 and concluidos["TJAM"] > 2.5
+
+
+def test_tribunal_desistido_nao_recebe_mais_requisicoes(agendador_sem_rede, monkeypatch):
+    monkeypatch.setattr(m, "DISJUNTOR_ENABLED", True)
+    monkeypatch.setattr(m, "disjuntores", m.Disjuntores(falhas_seguidas=1, tempo_aberto=0.01, tempo_aberto_max=0.01,
+                                                        max_aberturas=3))
+    erros = {}
+    agendador = m.AgendadorGlobal([{"sigla": "TJAM", "nome": "TJAM"}],
+                                  lambda sigla, nome, lista, *args: erros.update({sigla: lista}),
+                                  lambda sigla, registros: None, plano_de({"TJAM": 4}))
+    requisicoes = 0
+    while (unidade := agendador.proxima()) is not None:
+        # Como o processar_pagina: circuito aberto adia a página, senão a API responde 503
+        disjuntor = m.disjuntores.de("TJAM")
+        if not disjuntor.permitir():
+            agendador.concluir(unidade, {**resultado_ok(unidade), "resultados": [], "erro": "Circuito aberto", "adiada": True})
+            continue
+        requisicoes += 1
+        disjuntor.registrar(False)
+        agendador.concluir(unidade, {**resultado_ok(unidade), "resultados": [], "erro": "HTTP 503", "reagendar": 0.01})
+
+    # Abre na 1ª falha e desiste depois de 2 sondas com falha: nenhuma página sai depois disso
+    assert requisicoes == 3
+    assert m.disjuntores.resumo()["TJAM"]["aberturas"] == 3
+    assert sorted(erro["pagina"] for erro in erros["TJAM"]) == [1, 2, 3, 4]
+    assert {erro["erro"] for erro in erros["TJAM"]} == {m.ERRO_INDISPONIVEL}
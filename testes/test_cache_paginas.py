@@ -0,0 +1,158 @@
+"""
+Cache de páginas (cache_paginas.py): BackendCacheSQLite e as camadas na frente dele
+"""
+
+import time
+from datetime import date, datetime
+
+from cache_paginas import BackendCacheSQLite, CacheMemoriaLRU, EscritorCache, calcular_expiracao
+
+HOJE = date.today().isoformat()
+ANTIGO = "2020-01-31"
+
+
+def params(fim=ANTIGO):
+    return {"dataDisponibilizacaoInicio": "2020-01-01", "dataDisponibilizacaoFim": fim}
+
+
+def pagina(*ids, texto="texto"):
+    return {"status": "success", "count": len(ids), "items": [{"id": i, "hash": f"h{i}", "texto": texto} for i in ids]}
+
+
+def refs_itens(backend):
+    return sorted(refs for (refs,) in backend.conexao_escrita.execute("SELECT refs FROM itens"))
+
+
+def total_no_banco(backend):
+    return backend.conexao_escrita.execute(
+        "SELECT (SELECT COALESCE(SUM(tamanho), 0) FROM paginas) + (SELECT COALESCE(SUM(tamanho), 0) FROM itens)"
+    ).fetchone()[0]
+
+
+# ===== SQLITE =====
+
+def test_sqlite_serve_o_buffer_e_persiste_ao_fechar(tmp_path):
+    caminho = tmp_path / "cache.sqlite3"
+    backend = BackendCacheSQLite(caminho, lote=10)
+    backend.gravar("p1", pagina(1, 2), params())
+
+    assert backend.ler("p1") == pagina(1, 2)  # ainda no buffer, antes da transação
+    assert backend.ler("p2") is None
+    backend.fechar()
+
+    reaberto = BackendCacheSQLite(caminho)
+    assert reaberto.ler("p1") == pagina(1, 2)
+    assert reaberto.estatisticas()["paginas"] == 1
+    reaberto.fechar()
+
+
+# ===== TTL =====
+
+def test_calcular_expiracao_pela_idade_da_janela():
+    regras = [(2, 60), (7, 3600)]
+    agora = datetime(2025, 11, 10, 12).timestamp()
+
+    assert calcular_expiracao("2025-11-10", agora, regras) == agora + 60
+    assert calcular_expiracao("2025-11-05", agora, regras) == agora + 3600
+    assert calcular_expiracao("2025-10-01", agora, regras) is None  # dia fechado: não expira
+    assert calcular_expiracao(None, agora, regras) is None
+
+
+def test_pagina_recente_expira_e_historica_nao(tmp_path):
+    backend = BackendCacheSQLite(tmp_path / "cache.sqlite3", regras_ttl=[(2, 0.05)])
+    backend.gravar_lote([("recente", pagina(1), params(HOJE)), ("historica", pagina(2), params())])
+    time.sleep(0.1)
+
+    assert backend.ler("recente") is None
+    assert backend.ler("historica") == pagina(2)
+    backend.fechar()
+
+    # Replay offline: a página vencida ainda serve
+    offline = BackendCacheSQLite(tmp_path / "cache.sqlite3", regras_ttl=[(2, 0.05)], ignorar_expiracao=True)
+    assert offline.ler("recente") == pagina(1)
+    assert offline.podar() == (1, 0)
+    assert offline.ler("recente") is None
+    offline.fechar()
+
+
+# ===== LRU =====
+
+def test_despejo_lru_preserva_paginas_lidas(tmp_path):
+    backend = BackendCacheSQLite(tmp_path / "cache.sqlite3", dedup_itens=False)
+    for i in range(20):
+        backend.gravar_lote([(f"p{i}", pagina(i, texto=f"t{i}" * 50), params())])
+        time.sleep(0.002)
+    assert backend.ler("p0") is not None  # p0 passa a ser a mais recente
+
+    # Passou do limite: sai um bloco das menos acessadas até voltar a 90%
+    backend.max_bytes = backend.total_bytes
+    backend.gravar_lote([("p20", pagina(20, texto="t20" * 50), params())])
+
+    restantes = {c for (c,) in backend.conexao_escrita.execute("SELECT chave FROM paginas")}
+    assert {"p0", "p20"} <= restantes
+    assert "p1" not in restantes
+    assert backend.total_bytes <= backend.max_bytes * 0.9
+    assert backend.total_bytes == total_no_banco(backend)
+    backend.fechar()
+
+
+# ===== ITENS DEDUPLICADOS =====
+
+def test_itens_compartilhados_contam_referencias(tmp_path):
+    backend = BackendCacheSQLite(tmp_path / "cache.sqlite3")
+    backend.gravar_lote([("a", pagina(1, 2, 3), params()), ("b", pagina(3, 4), params())])
+    assert refs_itens(backend) == [1, 1, 1, 2]
+
+    # Substituir "a" solta as referências antigas: 1 e 2 ficam órfãos e saem
+    backend.gravar_lote([("a", pagina(3), params())])
+    assert refs_itens(backend) == [1, 2]
+    assert backend.ler("b") == pagina(3, 4)
+
+    # Remover as páginas (podar com limite de 1 byte) libera todos os itens
+    backend.podar(max_bytes=1)
+    assert refs_itens(backend) == []
+    assert backend.total_bytes == total_no_banco(backend) == 0
+    backend.fechar()
+
+
+def test_item_alterado_com_mesmo_hash_da_api_nao_reaproveita_o_antigo(tmp_path):
+    backend = BackendCacheSQLite(tmp_path / "cache.sqlite3")
+    backend.gravar_lote([("a", pagina(1, texto="original"), params())])
+    backend.gravar_lote([("b", pagina(1, texto="corrigido"), params())])
+
+    assert backend.ler("a")["items"][0]["texto"] == "original"
+    assert backend.ler("b")["items"][0]["texto"] == "corrigido"
+    assert refs_itens(backend) == [1, 1]
+    backend.fechar()
+
+
+# ===== CAMADAS =====
+
+def test_memoria_lru_limitada_em_bytes(tmp_path):
+    backend = BackendCacheSQLite(tmp_path / "cache.sqlite3")
+    backend.gravar_lote([(f"p{i}", pagina(i, texto="x" * 200), params()) for i in range(5)])
+    memoria = CacheMemoriaLRU(backend, max_bytes=700)
+
+    for i in range(5):
+        memoria.ler(f"p{i}")
+    memoria.ler("p4")
+
+    estatisticas = memoria.estatisticas()
+    assert estatisticas["bytes"] <= 700
+    assert estatisticas["despejos"] > 0
+    assert estatisticas["acertos"] == 1
+    assert "p0" not in memoria.entradas
+    memoria.fechar()
+
+
+def test_escritor_cache_serve_pendentes_e_grava_ao_fechar(tmp_path):
+    caminho = tmp_path / "cache.sqlite3"
+    escritor = EscritorCache(BackendCacheSQLite(caminho), espera_lote=5)
+    escritor.gravar("p1", pagina(1), params())
+
+    assert escritor.ler("p1") == pagina(1)
+    escritor.fechar()
+
+    backend = BackendCacheSQLite(caminho)
+    assert backend.ler("p1") == pagina(1)
+    backend.fechar()
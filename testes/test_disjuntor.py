@@ -0,0 +1,84 @@
+"""
+Disjuntor (circuit breaker por tribunal) do disjuntor.py
+"""
+
+import time
+
+from disjuntor import ABERTO, FECHADO, MEIO_ABERTO, Disjuntor
+
+
+def test_disjuntor_abre_com_falhas_seguidas():
+    disjuntor = Disjuntor("TJAM", falhas_seguidas=3, tempo_aberto=60)
+    for _ in range(2):
+        disjuntor.registrar(False)
+    assert disjuntor.estado == FECHADO
+
+    disjuntor.registrar(False)
+
+    assert disjuntor.estado == ABERTO
+    assert not disjuntor.permitir()
+    assert not disjuntor.aceita_unidade()
+    assert 59 < disjuntor.segundos_para_sonda() <= 60
+
+
+def test_disjuntor_abre_pela_taxa_de_erro_da_janela():
+    disjuntor = Disjuntor("TJAM", min_amostras=4, limiar_erros=0.5, falhas_seguidas=100)
+    for sucesso in (True, False, True):
+        disjuntor.registrar(sucesso)
+    assert disjuntor.estado == FECHADO
+
+    disjuntor.registrar(False)
+
+    assert disjuntor.estado == ABERTO
+
+
+def test_disjuntor_meio_aberto_deixa_uma_sonda_e_fecha_depois_de_duas():
+    disjuntor = Disjuntor("TJAM", falhas_seguidas=1, tempo_aberto=0.05)
+    disjuntor.registrar(False)
+    time.sleep(0.06)
+
+    assert disjuntor.permitir()
+    assert disjuntor.estado == MEIO_ABERTO
+    assert not disjuntor.permitir()  # uma sonda por vez
+    disjuntor.registrar(True)
+    assert disjuntor.estado == MEIO_ABERTO
+
+    assert disjuntor.permitir()
+    disjuntor.registrar(True)
+
+    assert disjuntor.estado == FECHADO
+    assert disjuntor.aberturas == 0 and disjuntor.aberturas_total == 1
+
+
+def test_disjuntor_sonda_com_falha_reabre_com_resfriamento_dobrado():
+    disjuntor = Disjuntor("TJAM", falhas_seguidas=1, tempo_aberto=0.05, tempo_aberto_max=10)
+    disjuntor.registrar(False)
+    time.sleep(0.06)
+    assert disjuntor.permitir()
+
+    disjuntor.registrar(False)
+
+    assert disjuntor.estado == ABERTO
+    assert 0.05 < disjuntor.segundos_para_sonda() <= 0.1
+
+
+def test_disjuntor_desiste_depois_de_max_aberturas():
+    disjuntor = Disjuntor("TJAM", falhas_seguidas=1, tempo_aberto=0.01, max_aberturas=3)
+    disjuntor.registrar(False)
+    for _ in range(2):
+        time.sleep(0.05)
+        assert disjuntor.permitir()
+        disjuntor.registrar(False)
+
+    assert disjuntor.desistiu
+
+
+def test_disjuntor_liberar_sonda_sem_veredito():
+    disjuntor = Disjuntor("TJAM", falhas_seguidas=1, tempo_aberto=0.01)
+    disjuntor.registrar(False)
+    time.sleep(0.02)
+    assert disjuntor.permitir()
+
+    disjuntor.liberar_sonda()  # ex.: a sonda recebeu 429
+
+    assert disjuntor.permitir()
@@ -0,0 +1,73 @@
+"""
+Journal de execução (--resume) e arquivo de falhas do estado_execucao.py
+"""
+
+import json
+
+from estado_execucao import JournalExecucao, carregar_falhas, carregar_journal, chave_unidade, salvar_falhas
+
+ASSINATURA = {"filtros": {"tipoComunicacao": "Lista de distribuição"}, "itens_por_pagina": 100}
+
+
+def gravar_journal(caminho, paginas):
+    journal = JournalExecucao(caminho, ASSINATURA, fsync_lote=2)
+    for pagina in paginas:
+        journal.registrar("TJAM", "2025-11-03", "2025-11-07", pagina,
+                          {"resultados": [{"id": pagina, "texto": "ção"}], "count": 350, "max_id": pagina})
+    journal.fechar()
+
+
+def test_journal_guarda_so_posicoes_e_le_do_disco(tmp_path):
+    caminho = tmp_path / "journal.jsonl"
+    gravar_journal(caminho, [1, 2, 3])
+
+    journal = JournalExecucao(caminho, ASSINATURA, continuar=True)
+    assert all(isinstance(posicao, int) for posicao in journal.concluidas.values())
+
+    posicao = journal.retirar(chave_unidade("TJAM", "2025-11-03", "2025-11-07", 2))
+    entrada = journal.ler(posicao)
+    assert entrada["resultados"] == [{"id": 2, "texto": "ção"}]
+    assert entrada["count"] == 350 and entrada["max_id"] == 2
+    # Cada unidade é retomada uma vez
+    assert journal.retirar(chave_unidade("TJAM", "2025-11-03", "2025-11-07", 2)) is None
+    journal.fechar()
+
+
+def test_journal_descarta_linha_truncada_e_continua_escrevendo(tmp_path):
+    caminho = tmp_path / "journal.jsonl"
+    gravar_journal(caminho, [1, 2, 3])
+    linhas = caminho.read_bytes().splitlines(keepends=True)
+    caminho.write_bytes(b"".join(linhas[:3]) + linhas[3][:25])
+
+    journal = JournalExecucao(caminho, ASSINATURA, continuar=True)
+    assert set(journal.concluidas) == {chave_unidade("TJAM", "2025-11-03", "2025-11-07", p) for p in (1, 2)}
+    journal.registrar("TJAM", "2025-11-03", "2025-11-07", 3, {"resultados": [], "count": 350})
+    journal.fechar()
+
+    indice = carregar_journal(caminho, ASSINATURA)
+    assert set(indice) == {chave_unidade("TJAM", "2025-11-03", "2025-11-07", p) for p in (1, 2, 3)}
+
+
+def test_journal_de_outra_assinatura_e_ignorado(tmp_path):
+    caminho = tmp_path / "journal.jsonl"
+    gravar_journal(caminho, [1])
+
+    assert carregar_journal(caminho, {**ASSINATURA, "itens_por_pagina": 50}) == {}
+    journal = JournalExecucao(caminho, {**ASSINATURA, "itens_por_pagina": 50}, continuar=True)
+    journal.fechar()
+    # Recomeçado do zero, com o cabeçalho novo
+    cabecalho = json.loads(caminho.read_text(encoding="utf-8").splitlines()[0])
+    assert cabecalho["assinatura"]["itens_por_pagina"] == 50
+    assert len(caminho.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_falhas_so_valem_para_a_mesma_assinatura(tmp_path):
+    caminho = tmp_path / "paginas_falhas.json"
+    unidades = [{"sigla": "TJAM", "pagina": 2, "erro": "HTTP 503"}]
+    salvar_falhas(caminho, ASSINATURA, unidades)
+
+    assert carregar_falhas(caminho, ASSINATURA) == unidades
+    assert carregar_falhas(caminho, {**ASSINATURA, "itens_por_pagina": 50}) == []
+
+    salvar_falhas(caminho, ASSINATURA, [])
+    assert not caminho.exists()
@@ -0,0 +1,260 @@
+"""
+Execuções completas do main_api_otimizado.py contra a API falsa (sem rede)
+"""
+
+import json
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+import cache_paginas
+from api_falsa import ids_filtrados, itens_da_janela
+from cache_paginas import BackendCacheSQLite, chave_legada
+from conftest import FIM, INICIO, TRIBUNAIS
+
+PAGINAS_POR_TRIBUNAL = 4  # 350 itens a 100 por página
+
+
+def ids_gravados(m, sigla):
+    with open(Path(m.OUTPUT_DIR) / f"{sigla}.json", encoding="utf-8") as f:
+        registros = json.load(f)
+    ids = [registro["id"] for registro in registros]
+    assert len(ids) == len(set(ids)), f"{sigla}: registros repetidos"
+    return set(ids)
+
+
+def ler_json(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def assert_saida_completa(m):
+    consolidado = ler_json(Path(m.OUTPUT_DIR) / "consolidado.json")
+    for sigla in TRIBUNAIS:
+        esperados = ids_filtrados(sigla, INICIO, FIM)
+        assert ids_gravados(m, sigla) == esperados
+        assert {r["id"] for r in consolidado[sigla]["registros"]} == esperados
+        assert consolidado[sigla]["total_registros"] == len(esperados)
+
+
+@pytest.mark.parametrize("motor", ["threads", "async"])
+def test_execucao_completa(scraper, api, motor):
+    scraper.main(["--motor", motor])
+
+    assert_saida_completa(scraper)
+    assert len(api.paginas_de_dados()) == PAGINAS_POR_TRIBUNAL * len(TRIBUNAIS)
+    assert not (Path(scraper.OUTPUT_DIR) / scraper.FALHAS_FILE).exists()
+    assert not list(Path(scraper.OUTPUT_DIR).glob("*.parcial"))
+
+
+def test_resume_pula_unidades_do_journal(scraper, api):
+    scraper.main([])
+    journal = Path(scraper.OUTPUT_DIR) / scraper.JOURNAL_FILE
+    linhas = journal.read_bytes().splitlines(keepends=True)
+    assert len(linhas) == 1 + PAGINAS_POR_TRIBUNAL * len(TRIBUNAIS)
+
+    # Interrupção depois de 3 unidades, com a 4ª linha pela metade
+    journal.write_bytes(b"".join(linhas[:4]) + linhas[4][:40])
+    for sigla in TRIBUNAIS:
+        (Path(scraper.OUTPUT_DIR) / f"{sigla}.json").unlink()
+    api.requisicoes.clear()
+
+    scraper.main(["--resume"])
+
+    assert len(api.paginas_de_dados()) == PAGINAS_POR_TRIBUNAL * len(TRIBUNAIS) - 3
+    assert_saida_completa(scraper)
+
+
+def test_journal_de_outra_configuracao_nao_e_retomado(scraper, api, monkeypatch):
+    scraper.main([])
+    monkeypatch.setattr(scraper, "FILTROS", {"tipoComunicacao": "Intimação"})
+    api.requisicoes.clear()
+
+    scraper.main(["--resume"])
+
+    assert len(api.paginas_de_dados()) == PAGINAS_POR_TRIBUNAL * len(TRIBUNAIS)
+
+
+def test_offline_nao_substitui_arquivo_de_falhas(scraper, api, monkeypatch):
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", True)
+    api.falhas[("TJAC", 3)] = 503
+    scraper.main([])
+    arquivo_falhas = Path(scraper.OUTPUT_DIR) / scraper.FALHAS_FILE
+    antes = arquivo_falhas.read_bytes()
+    api.requisicoes.clear()
+
+    scraper.main(["--offline"])
+
+    assert api.requisicoes == []
+    assert arquivo_falhas.read_bytes() == antes
+    assert len(ids_gravados(scraper, "TJAC")) == len(ids_filtrados("TJAC", INICIO, FIM)) - 50
+
+
+def test_retry_failed_refaz_so_as_paginas_com_falha(scraper, api):
+    api.falhas[("TJAM", 2)] = 503
+    scraper.main([])
+
+    falhas = ler_json(Path(scraper.OUTPUT_DIR) / scraper.FALHAS_FILE)["unidades"]
+    assert [(u["sigla"], u["pagina"]) for u in falhas] == [("TJAM", 2)]
+    assert falhas[0]["erro"] == f"Falha definitiva após {scraper.MAX_RETRIES} tentativas: HTTP 503"
+    assert len(ids_gravados(scraper, "TJAM")) == len(ids_filtrados("TJAM", INICIO, FIM)) - 50
+
+    api.falhas.clear()
+    api.requisicoes.clear()
+    scraper.main(["--retry-failed"])
+
+    assert [(p["siglaTribunal"], p["pagina"]) for p in api.paginas_de_dados()] == [("TJAM", "2")]
+    assert not (Path(scraper.OUTPUT_DIR) / scraper.FALHAS_FILE).exists()
+    assert_saida_completa(scraper)
+    resumo = ler_json(Path(scraper.OUTPUT_DIR) / "resumo.json")
+    assert resumo["tribunais"]["TJAM"]["paginas_processadas"] == PAGINAS_POR_TRIBUNAL
+    assert resumo["tribunais"]["TJAC"]["total"] == len(ids_filtrados("TJAC", INICIO, FIM))
+
+
+def test_prazo_do_tribunal_cancela_paginas_pendentes(scraper, api, monkeypatch):
+    monkeypatch.setattr(scraper, "TRIBUNAIS_ESPECIFICOS", ["TJAM"])
+    monkeypatch.setattr(scraper, "SEARCH_PARAMS", {"dataDisponibilizacaoInicio": "2025-11-01",
+                                                   "dataDisponibilizacaoFim": "2025-11-30"})
+    monkeypatch.setattr(scraper, "MAX_WORKERS_GLOBAL", 1)
+    monkeypatch.setattr(scraper, "TRIBUNAL_TIMEOUT", 1)
+    monkeypatch.setattr(scraper, "PLANEJAMENTO_ENABLED", False)
+    api.latencia = 0.3
+
+    inicio = time.monotonic()
+    scraper.main([])
+
+    assert time.monotonic() - inicio < 10
+    total_paginas = 30 * 70 // 100
+    falhas = ler_json(Path(scraper.OUTPUT_DIR) / scraper.FALHAS_FILE)["unidades"]
+    assert falhas and all(u["erro"] == scraper.ERRO_PRAZO for u in falhas)
+    # Cada página ou foi gravada inteira ou está no arquivo de falhas, e as canceladas nem foram pedidas
+    assert len(ids_gravados(scraper, "TJAM")) == (total_paginas - len(falhas)) * 50
+    pedidas = {p["pagina"] for p in api.paginas_de_dados()}
+    assert len(pedidas) <= total_paginas - len(falhas) + 1
+
+
+def test_erro_no_motor_nao_perde_paginas_na_fila_do_cache(scraper, api, monkeypatch):
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", True)
+    monkeypatch.setattr(scraper, "PLANEJAMENTO_ENABLED", False)
+
+    def motor_com_erro(*args):
+        scraper.salvar_cache("pagina-gravada", {"status": "success", "count": 0, "items": []})
+        raise RuntimeError("falha no motor")
+
+    monkeypatch.setattr(scraper, "executar_motor_threads", motor_com_erro)
+    with pytest.raises(RuntimeError):
+        scraper.main([])
+
+    assert scraper._cache_backend is None
+    backend = BackendCacheSQLite(scraper.CACHE_SQLITE_FILE)
+    assert backend.ler("pagina-gravada") == {"status": "success", "count": 0, "items": []}
+    backend.fechar()
+
+
+def test_motor_async_obtem_unidades_em_paralelo(scraper, api, monkeypatch):
+    original = scraper.AgendadorGlobal.tentar_proxima
+    lock = threading.Lock()
+    simultaneas = [0, 0]  # atual, máximo
+
+    def tentar_proxima_lenta(agendador):
+        with lock:
+            simultaneas[0] += 1
+            simultaneas[1] = max(simultaneas)
+        time.sleep(0.05)
+        try:
+            return original(agendador)
+        finally:
+            with lock:
+                simultaneas[0] -= 1
+
+    monkeypatch.setattr(scraper.AgendadorGlobal, "tentar_proxima", tentar_proxima_lenta)
+    scraper.main(["--motor", "async"])
+
+    assert_saida_completa(scraper)
+    assert simultaneas[1] > 1
+
+
+def test_cache_api_antigo_importado_serve_o_offline(scraper, api, monkeypatch, tmp_path):
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", True)
+    # cache_api/ da versão original: um <md5>.json por página, sem os parâmetros da requisição
+    antigo = tmp_path / "cache_api_antigo"
+    antigo.mkdir()
+    for sigla in TRIBUNAIS:
+        itens = itens_da_janela(sigla, INICIO, FIM)
+        for pagina in range(1, PAGINAS_POR_TRIBUNAL + 1):
+            dados = {"status": "success", "count": len(itens), "items": itens[(pagina - 1) * 100:pagina * 100]}
+            (antigo / f"{chave_legada(sigla, pagina, 100, INICIO, FIM)}.json").write_text(json.dumps(dados), encoding="utf-8")
+    (antigo / "ilegivel.json").write_text("{", encoding="utf-8")
+
+    assert cache_paginas.main(["importar", str(antigo), scraper.CACHE_SQLITE_FILE, "--inicio", INICIO, "--fim", FIM]) == 0
+    scraper.main(["--offline"])
+
+    assert api.requisicoes == []
+    assert_saida_completa(scraper)
+
+
+def test_offline_nao_vaza_para_a_proxima_execucao(scraper, api, monkeypatch):
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", True)
+    scraper.main([])
+    scraper.main(["--offline"])
+    assert scraper.MODO_OFFLINE is False and scraper.CACHE_LEITURA_ENABLED is True
+
+    # Sem cache, só a API tem as páginas: a execução seguinte precisa voltar a buscá-las
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", False)
+    api.requisicoes.clear()
+    scraper.main([])
+
+    assert len(api.paginas_de_dados()) == PAGINAS_POR_TRIBUNAL * len(TRIBUNAIS)
+    assert_saida_completa(scraper)
+
+
+def test_incremental_mescla_e_mantem_tribunais_em_dia(scraper, api, monkeypatch):
+    monkeypatch.setattr(scraper, "INCREMENTAL_FIM", FIM)
+    monkeypatch.setattr(scraper, "INCREMENTAL_LOOKBACK_DIAS", 1)
+    scraper.main(["--incremental"])
+    assert_saida_completa(scraper)
+
+    # TJAC já está em dia; TJAM busca o dia novo e revisita o último (look-back)
+    novo_fim = "2025-11-08"
+    marcas = ler_json(scraper.ESTADO_SYNC_FILE)
+    assert {sigla: marca["ultima_data_completa"] for sigla, marca in marcas.items()} == {"TJAM": FIM, "TJAC": FIM}
+    marcas["TJAC"]["ultima_data_completa"] = "2025-11-09"
+    Path(scraper.ESTADO_SYNC_FILE).write_text(json.dumps(marcas), encoding="utf-8")
+    monkeypatch.setattr(scraper, "INCREMENTAL_FIM", novo_fim)
+    api.requisicoes.clear()
+
+    scraper.main(["--incremental"])
+
+    assert {(p["siglaTribunal"], p["dataDisponibilizacaoInicio"]) for p in api.requisicoes} == {("TJAM", FIM)}
+    esperados = {"TJAM": ids_filtrados("TJAM", INICIO, novo_fim), "TJAC": ids_filtrados("TJAC", INICIO, FIM)}
+    consolidado = ler_json(Path(scraper.OUTPUT_DIR) / "consolidado.json")
+    for sigla, ids in esperados.items():
+        assert ids_gravados(scraper, sigla) == ids
+        assert {r["id"] for r in consolidado[sigla]["registros"]} == ids
+        assert consolidado[sigla]["total_registros"] == len(ids)
+    assert ler_json(scraper.ESTADO_SYNC_FILE)["TJAM"]["ultima_data_completa"] == novo_fim
+
+
+def test_incremental_ignora_o_cache_so_no_look_back(scraper, monkeypatch):
+    monkeypatch.setattr(scraper, "CACHE_ENABLED", True)
+    monkeypatch.setattr(scraper, "CACHE_REVALIDAR_ATE", {"TJAM": "2025-11-05"})
+    janelas = {"look_back": scraper.janela_busca("2025-11-05", FIM), "novos": scraper.janela_busca("2025-11-06", FIM)}
+    for janela in janelas.values():
+        scraper.salvar_cache(scraper.gerar_cache_key("TJAM", 1, janela=janela), {"status": "success", "count": 0, "items": []})
+
+    assert scraper.ler_cache(scraper.gerar_cache_key("TJAM", 1, janela=janelas["look_back"]), "TJAM", janelas["look_back"]) is None
+    assert scraper.ler_cache(scraper.gerar_cache_key("TJAM", 1, janela=janelas["novos"]), "TJAM", janelas["novos"]) is not None
+    scraper.fechar_cache()
+
+
+def test_incremental_nao_marca_o_dia_corrente(scraper, monkeypatch):
+    hoje = date.today()
+    monkeypatch.setattr(scraper, "SEARCH_PARAMS", scraper.janela_busca(hoje - timedelta(days=1), hoje))
+    monkeypatch.setattr(scraper, "INCREMENTAL_FIM", None)
+    scraper.main(["--incremental"])
+
+    marcas = ler_json(scraper.ESTADO_SYNC_FILE)
+    assert {marca["ultima_data_completa"] for marca in marcas.values()} == {(hoje - timedelta(days=1)).isoformat()}
@@ -0,0 +1,78 @@
+"""
+LimitadorHierarquico (limitador_taxa.py): bucket global + um filho por tribunal
+"""
+
+import asyncio
+import time
+
+from limitador_taxa import LimitadorHierarquico
+
+
+def test_limitador_429_desacelera_so_o_tribunal():
+    limitador = LimitadorHierarquico(taxa_global=50, limite_filho_padrao=20, controle_latencia=False)
+    limitador.filho("TJAC")
+
+    limitador.on_429("TJAM")
+
+    assert limitador.filho("TJAM").rate < 20
+    assert limitador.filho("TJAC").rate == 20
+    assert limitador.rate == 50
+    assert set(limitador.reduzidos()) == {"TJAM"}
+
+
+def test_limitador_429_em_varios_tribunais_desacelera_o_global():
+    limitador = LimitadorHierarquico(taxa_global=50, tribunais_429_global=2, controle_latencia=False)
+
+    limitador.on_429("TJAM")
+    assert limitador.rate == 50
+    limitador.on_429("TJAC")
+
+    assert limitador.rate < 50
+
+
+def test_limitador_pausa_so_o_tribunal_e_acquire_respeita_timeout():
+    limitador = LimitadorHierarquico(taxa_global=100, controle_latencia=False)
+    assert limitador.acquire("TJAM", timeout=1)
+
+    limitador.pausar("TJAM", 5)
+
+    inicio = time.monotonic()
+    assert not limitador.acquire("TJAM", timeout=0.1)
+    assert time.monotonic() - inicio < 1
+    assert limitador.acquire("TJAC", timeout=1)
+    assert limitador.tempo_pausado("TJAM") > 4
+    assert limitador.tempo_pausado() == 0.0
+
+
+def test_limitador_teto_do_filho():
+    limitador = LimitadorHierarquico(taxa_global=10, limites_filhos={"TJAM": 3, "TJSP": 50})
+
+    assert limitador.filho("TJAM").max_rate == 3
+    assert limitador.filho("TJSP").max_rate == 10  # nunca acima do global
+    assert limitador.filho("TJAC").max_rate == 10
+
+
+def test_limitador_devolve_token_do_tribunal_quando_o_global_nao_libera():
+    limitador = LimitadorHierarquico(taxa_global=100, limites_filhos={"TJAM": 1}, controle_latencia=False)
+    filho = limitador.filho("TJAM")
+    antes = filho.tokens
+    limitador.pausar(None, 5)
+
+    assert not limitador.acquire("TJAM", timeout=0.05)
+    assert filho.tokens >= antes
+
+    async def esperar():
+        return await limitador.acquire_async("TJAM", timeout=0.05)
+
+    assert not asyncio.run(esperar())
+    assert filho.tokens >= antes
+
+
+def test_limitador_informa_a_espera_sem_tirar_token():
+    limitador = LimitadorHierarquico(taxa_global=50, limites_filhos={"TJAM": 1}, controle_latencia=False)
+
+    assert limitador.segundos_para_token("TJAM") == 0.0
+    assert limitador.segundos_para_token("TJAM") == 0.0  # consultar não consome
+    assert limitador.acquire("TJAM")
+    assert 0.9 < limitador.segundos_para_token("TJAM") <= 1.0
+    assert limitador.segundos_para_token("TJAC") == 0.0
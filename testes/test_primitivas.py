@@ -0,0 +1,131 @@
+"""
+Peças de controle do main_api_otimizado.py usadas pelos motores, testadas sem rede
+"""
+
+import asyncio
+import threading
+import time
+
+import main_api_otimizado as m
+
+
+# ===== VooUnico =====
+
+def test_voo_unico_coalesce_chamadas_simultaneas():
+    voo = m.VooUnico()
+    liberar = threading.Event()
+    chamadas = []
+
+    def buscar(valor):
+        chamadas.append(valor)
+        liberar.wait(5)
+        return {"valor": valor}
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(voo.executar("k", buscar, 1))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while voo.coalescidas < 4:
+        time.sleep(0.01)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert chamadas == [1]
+    assert resultados == [{"valor": 1}] * 5
+    assert voo.em_voo == {}
+
+
+def test_voo_unico_repassa_excecao_aos_que_esperam():
+    voo = m.VooUnico()
+    liberar = threading.Event()
+
+    def falhar():
+        liberar.wait(5)
+        raise m.FalhaDefinitiva("HTTP 500")
+
+    erros = []
+
+    def chamar():
+        try:
+            voo.executar("k", falhar)
+        except m.FalhaDefinitiva as e:
+            erros.append(str(e))
+
+    threads = [threading.Thread(target=chamar) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while voo.coalescidas < 2:
+        time.sleep(0.01)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert erros == ["HTTP 500"] * 3
+    # Depois da falha a chave está livre: a próxima chamada busca de novo
+    assert voo.executar("k", lambda: "ok") == "ok"
+
+
+def test_voo_unico_async():
+    voo = m.VooUnico()
+    chamadas = []
+
+    async def buscar():
+        chamadas.append(1)
+        await asyncio.sleep(0.05)
+        return "pagina"
+
+    async def rodar():
+        return await asyncio.gather(*(voo.executar_async("k", buscar) for _ in range(4)))
+
+    assert asyncio.run(rodar()) == ["pagina"] * 4
+    assert chamadas == [1]
+    assert voo.coalescidas == 3
+
+
+# ===== FilaRetry / OrcamentoRetries =====
+
+def test_fila_retry_entrega_por_horario_e_ordem_de_chegada():
+    fila = m.FilaRetry()
+    fila.agendar("depois", 60)
+    fila.agendar("a", 0)
+    fila.agendar("b", 0)
+
+    assert fila.vencidas() == ["a", "b"]
+    assert len(fila) == 1
+    assert 59 < fila.segundos_para_proxima() <= 60
+
+
+def test_fila_retry_retirar_sem_esperar_backoff():
+    fila = m.FilaRetry()
+    for sigla, pagina in [("TJAM", 2), ("TJAC", 3), ("TJAM", 4)]:
+        fila.agendar({"sigla": sigla, "pagina": pagina}, 60)
+
+    saem = fila.retirar(lambda unidade: unidade["sigla"] == "TJAM")
+
+    assert sorted(u["pagina"] for u in saem) == [2, 4]
+    assert len(fila) == 1
+    assert m.FilaRetry().segundos_para_proxima() is None
+
+
+def test_orcamento_retries_limita_reagendamentos():
+    orcamento = m.OrcamentoRetries(2)
+    assert [orcamento.consumir() for _ in range(4)] == [True, True, False, False]
+    assert orcamento.resumo() == {"reagendados": 2, "orcamento": 2, "negados": 2}
+
+    sem_limite = m.OrcamentoRetries(None)
+    assert all(sem_limite.consumir() for _ in range(100))
+
+
+# ===== Prazo =====
+
+def test_prazo_limita_esperas_ao_que_resta():
+    prazo = m.Prazo(0.2)
+    assert not prazo.expirou()
+    assert prazo.limitar(30) <= 0.2
+    assert prazo.limitar(0.05) == 0.05
+
+    time.sleep(0.25)
+    assert prazo.expirou()
+    assert prazo.restante() == 0.0
+    assert prazo.limitar(30) == 0.01
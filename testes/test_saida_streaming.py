@@ -0,0 +1,69 @@
+"""
+Saída em streaming (saida_streaming.py): <sigla>.json.parcial publicado só no fechamento,
+mesclagem do --retry-failed e consolidado igual ao json.dump de antes
+"""
+
+import json
+
+from saida_streaming import EscritorTribunal, SaidaTribunais, escrever_consolidado
+
+REGISTROS = [{"id": 1, "texto": "Intimação"}, {"id": 2, "destinatarios": [{"nome": "Parte", "polo": "A"}]}]
+
+
+def test_escritor_grava_no_parcial_e_renomeia_ao_fechar(tmp_path):
+    caminho = tmp_path / "TJAM.json"
+    caminho.write_text("[]", encoding="utf-8")
+    escritor = EscritorTribunal(caminho)
+
+    escritor.adicionar(REGISTROS[:1])
+    escritor.adicionar(REGISTROS[1:])
+    # Durante a escrita o arquivo anterior continua no lugar
+    assert caminho.read_text(encoding="utf-8") == "[]"
+    assert (tmp_path / "TJAM.json.parcial").exists()
+
+    assert escritor.fechar() == 2
+    assert not (tmp_path / "TJAM.json.parcial").exists()
+    assert caminho.read_text(encoding="utf-8") == json.dumps(REGISTROS, ensure_ascii=False, indent=2)
+
+
+def test_escritor_sem_registros_ou_descartado_mantem_o_anterior(tmp_path):
+    caminho = tmp_path / "TJAM.json"
+    caminho.write_text("[]", encoding="utf-8")
+
+    assert EscritorTribunal(caminho).fechar() == 0
+    escritor = EscritorTribunal(caminho)
+    escritor.adicionar(REGISTROS)
+    escritor.descartar()
+
+    assert caminho.read_text(encoding="utf-8") == "[]"
+    assert list(tmp_path.iterdir()) == [caminho]
+
+
+def test_mesclar_nao_repete_ids(tmp_path):
+    saida = SaidaTribunais(tmp_path)
+    saida.adicionar("TJAM", REGISTROS)
+    saida.fechar("TJAM")
+
+    mescla = SaidaTribunais(tmp_path, mesclar=True)
+    mescla.adicionar("TJAM", [REGISTROS[1], {"id": 3}])
+
+    assert mescla.fechar("TJAM") == (3, 1)
+    with open(tmp_path / "TJAM.json", encoding="utf-8") as f:
+        assert [r["id"] for r in json.load(f)] == [1, 2, 3]
+
+
+def test_consolidado_igual_ao_json_dump(tmp_path):
+    saida = SaidaTribunais(tmp_path)
+    saida.adicionar("TJAM", REGISTROS)
+    saida.fechar("TJAM")
+    tribunais = {
+        "TJAM": {"tribunal": "Tribunal de Justiça do Amazonas", "total_registros": 2, "paginas_processadas": 1,
+                 "erros": [{"pagina": 2, "erro": "HTTP 503"}]},
+        "TJAC": {"tribunal": "Tribunal de Justiça do Acre", "total_registros": 0, "paginas_processadas": 0, "erros": []},
+    }
+
+    escrever_consolidado(tmp_path / "consolidado.json", tribunais, saida)
+
+    esperado = {sigla: {**dados, "registros": REGISTROS if sigla == "TJAM" else []} for sigla, dados in tribunais.items()}
+    assert (tmp_path / "consolidado.json").read_text(encoding="utf-8") == json.dumps(esperado, ensure_ascii=False, indent=2)
+    assert not (tmp_path / "consolidado.json.tmp").exists()